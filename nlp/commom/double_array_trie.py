@@ -5,29 +5,110 @@
 # 配套书籍：http://nlp.hankcs.com/book.php
 # 讨论答疑：https://bbs.hankcs.com/
 
-from pyhanlp import *
+from array import array
 from typing import Dict, Any, List, Tuple, Union
 
-from nlp.commom.tool import load_dictionary, trie_evaluate_speed
-
 
 class DoubleArrayTrie:
+    """
+    双数组字典树，直接由Python字典构建base/check数组，不依赖HanLP的Java实现
+    与HanLP(darts)的约定一致：
+        1、键按字典序排列，值按相同顺序保存在value中
+        2、字符c的编码为ord(c) + 1，编码0表示词语结尾
+        3、状态b经编码code转移到p = base[b] + code，转移成功当且仅当check[p] == base[b]
+        4、词语结尾状态的base为-index - 1，index为键的字典序
+    """
 
     __name__ = 'DoubleArrayTrie'
 
     def __init__(self, dic: dict) -> None:
-        m = JClass('java.util.TreeMap')()
-        for k, v in dic.items():
-            m[k] = v
-        DoubleArrayTrie = JClass('com.hankcs.hanlp.collection.trie.DoubleArrayTrie')
-        self.dat = DoubleArrayTrie(m)
-        self.base = list(self.dat.getBase())
-        self.check = list(self.dat.getCheck())
-        self.value = list(self.dat.getValueArray(['']))
+        keys = sorted(dic)
+        self.value = [dic[key] for key in keys]
+        self.base, self.check = self._build(keys)
+
+    @staticmethod
+    def _fetch(keys, left, right, depth):
+        """
+        取出keys[left:right]在第depth个字符上的所有分支，keys[left:right]的前depth个字符相同
+        :return: [(编码, 分支的起点, 分支的终点)]，编码递增
+        """
+        siblings = []
+        prev = -1
+        for i in range(left, right):
+            key = keys[i]
+            code = ord(key[depth]) + 1 if len(key) > depth else 0
+            if code != prev:
+                if siblings:
+                    siblings[-1][2] = i
+                siblings.append([code, i, right])
+                prev = code
+        return siblings
+
+    @staticmethod
+    def _build(keys):
+        """
+        构建base/check数组
+        按深度优先为每个状态的所有分支寻找起点begin，使check[begin + code]对全部编码都空闲，且begin未被其他状态使用；
+        next_check_pos之前的位置几乎全部被占用，寻找起点时直接从next_check_pos开始
+        :param keys: 按字典序排列且不重复的键
+        :return: (base, check)
+        """
+        size = 1 << 16
+        base = array('i', [0]) * size
+        check = array('i', [0]) * size
+        used = bytearray(size)
+        base[0] = 1
+        length = 1
+        next_check_pos = 0
+        # (状态, 键的起点, 键的终点, 深度)
+        stack = [(0, 0, len(keys), 0)] if keys else []
+        while stack:
+            state, left, right, depth = stack.pop()
+            siblings = DoubleArrayTrie._fetch(keys, left, right, depth)
+            first, last = siblings[0][0], siblings[-1][0]
+            pos = max(first + 1, next_check_pos) - 1
+            nonzero = 0
+            found_free = False
+            while True:
+                pos += 1
+                while pos + last - first >= size:
+                    grow = size
+                    size *= 2
+                    base.extend(array('i', [0]) * grow)
+                    check.extend(array('i', [0]) * grow)
+                    used.extend(bytearray(grow))
+                if check[pos]:
+                    nonzero += 1
+                    continue
+                if not found_free:
+                    next_check_pos = pos
+                    found_free = True
+                begin = pos - first
+                if used[begin]:
+                    continue
+                for code, _, _ in siblings:
+                    if check[begin + code]:
+                        break
+                else:
+                    break
+            # 扫描过的位置绝大部分已被占用时，下次从当前位置开始寻找
+            if nonzero / (pos - next_check_pos + 1) >= 0.95:
+                next_check_pos = pos
+            used[begin] = 1
+            base[state] = begin
+            length = max(length, begin + last + 1)
+            for code, sub_left, sub_right in siblings:
+                check[begin + code] = begin
+                if code:
+                    stack.append((begin + code, sub_left, sub_right, depth + 1))
+                else:
+                    # 编码为0的分支只包含以该状态结尾的一个键
+                    base[begin] = -sub_left - 1
+        return base[:length], check[:length]
 
     @staticmethod
     def char_hash(c) -> int:
-        return JClass('java.lang.Character')(c).hashCode()
+        return ord(c)
 
     def transition(self, c, b) -> int:
         """
@@ -37,7 +118,7 @@ class DoubleArrayTrie:
         :return: 转移后的状态，-1表示失败
         """
         p = self.base[b] + self.char_hash(c) + 1
-        if self.base[b] == self.check[p]:
+        if p < len(self.check) and self.base[b] == self.check[p]:
             return p
         else:
             return -1
@@ -46,12 +127,14 @@ class DoubleArrayTrie:
         b = 0
         for i in range(0, len(key)):  # len(key)次状态转移
             p = self.transition(key[i], b)
-            if p is not -1:
+            if p != -1:
                 b = p
             else:
                 return None
 
         p = self.base[b]  # 按字符'\0'进行状态转移
+        if p >= len(self.check):
+            return None
         n = self.base[p]  # 查询base
         if p == self.check[p] and n < 0:  # 状态转移成功且对应词语结尾
             index = -n - 1  # 取得字典序
@@ -94,6 +177,7 @@ class LongestSearcher:
         self._base = base
         self._check = check
         self._values = values
+        self._size = len(check)
 
     def next(self):
         """
@@ -106,10 +190,18 @@ class LongestSearcher:
         n = None
         p = None
         while True:
-            if self._i >= self._text_length:  # 指针到头了，将起点往前挪一个，重新开始，状态归零
-                return self.value is not None
+            if self._i >= self._text_length:  # 指针到头了
+                if self.value is not None:
+                    self._i = self.begin + self.length  # 输出已命中的最长词，从该词语的下一个位置恢复扫描
+                    return True
+                if self.begin + 1 >= self._text_length:
+                    return False
+                self.begin += 1  # 没有命中，将起点往前挪一个，重新开始，状态归零
+                self._i = self.begin
+                b = self._base[0]
+                continue
             p = b + ord(self.text[self._i]) + 1  # 状态转移 p = base[char[i-1]] + char[i] + 1
-            if b == self._check[p]:          # base[char[i-1]] == check[base[char[i-1]] + char[i] + 1]
+            if p < self._size and b == self._check[p]:          # base[char[i-1]] == check[base[char[i-1]] + char[i] + 1]
                 b = self._base[p]            # 转移成功
             else:
                 if self.begin == self._text_length:
@@ -121,8 +213,8 @@ class LongestSearcher:
                 self.begin += 1
                 b = self._base[0]
             p = b
-            n = self._base[p]
-            if b == self._check[p] and n < 0:  # base[p] == check[p] && base[p] < 0 查到一个词
+            n = self._base[p] if p < self._size else 0
+            if n < 0 and b == self._check[p]:  # base[p] == check[p] && base[p] < 0 查到一个词
                 self.length = self._i - self.begin + 1
                 self.index = -n - 1
                 self.value = self._values[self.index]
@@ -131,6 +223,8 @@ class LongestSearcher:
 
 
 if __name__ == '__main__':
+    from nlp.commom.tool import load_dictionary, trie_evaluate_speed
+
     dic = {'自然': 'nature', '自然人': 'human', '自然语言': 'language', '自语': 'talk	to oneself', '入门': 'introduction'}
     dat = DoubleArrayTrie(dic)
     assert dat['自然'] == 'nature'
@@ -0,0 +1,73 @@
+"""
+双数组字典树测试：查询、最长匹配，以及与字典树的结果对比
+用法：python -m pytest nlp/commom/test_double_array_trie.py
+"""
+import random
+import unittest
+from array import array
+
+from nlp.commom.double_array_trie import DoubleArrayTrie
+from nlp.commom.tool import load_medical_dictionary
+from nlp.commom.trie import Trie
+
+
+class DoubleArrayTrieTestCase(unittest.TestCase):
+
+    def test_lookup(self):
+        dat = DoubleArrayTrie({'自然': 'nature', '自然人': 'human', '自然语言': 'language', '自语': 'talk', '入门': 'introduction'})
+        self.assertEqual(dat.base.typecode, 'i')
+        self.assertEqual(dat.check.typecode, 'i')
+        self.assertEqual(dat['自然'], 'nature')
+        self.assertEqual(dat['自然语言'], 'language')
+        self.assertIsNone(dat['自然语'])
+        self.assertIsNone(dat['不存在'])
+        self.assertIsNone(dat['自然\0在'])
+        self.assertIsNone(dat[''])
+        self.assertEqual(dat.parse_longest('自然语言入门'),
+                         [('自然语言', 'language', 0, 3), ('入门', 'introduction', 4, 5)])
+
+    def test_parse_longest_at_end(self):
+        dat = DoubleArrayTrie({'ab': 1, 'abcd': 2, 'c': 3, 'x': 4})
+        # 文本末尾还有未完成的更长匹配时，输出已命中的词后继续扫描剩余的文本
+        self.assertEqual(dat.parse_longest('abc'), [('ab', 1, 0, 1), ('c', 3, 2, 2)])
+        self.assertEqual(dat.parse_longest('zabcx'), [('ab', 1, 1, 2), ('c', 3, 3, 3), ('x', 4, 4, 4)])
+        self.assertEqual(dat.parse_longest('abcd'), [('abcd', 2, 0, 3)])
+        # 没有命中时从下一个字符重新开始
+        self.assertEqual(dat.parse_longest('abx'), [('ab', 1, 0, 1), ('x', 4, 2, 2)])
+        self.assertEqual(dat.parse_longest('zzc'), [('c', 3, 2, 2)])
+        self.assertEqual(dat.parse_longest('ax'), [('x', 4, 1, 1)])
+        self.assertEqual(dat.parse_longest('a'), [])
+
+    def test_empty(self):
+        dat = DoubleArrayTrie({})
+        self.assertIsNone(dat['a'])
+        self.assertIsNone(dat[''])
+        self.assertEqual(dat.parse_longest('abc'), [])
+
+    def test_empty_key(self):
+        dat = DoubleArrayTrie({'': 'empty', 'a': 'a'})
+        self.assertEqual(dat[''], 'empty')
+        self.assertEqual(dat['a'], 'a')
+
+    def test_random(self):
+        rnd = random.Random(1)
+        for alphabet in ('ab', 'abc', '高血压糖', 'a\0b\U0001F600'):
+            dic = {''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(1, 7))): i for i in range(80)}
+            dat, trie = DoubleArrayTrie(dic), Trie(dic)
+            for key, value in dic.items():
+                self.assertEqual(dat[key], value)
+            for _ in range(100):
+                text = ''.join(rnd.choice(alphabet + 'z') for _ in range(rnd.randrange(0, 8)))
+                self.assertEqual(dat[text], dic.get(text))
+                self.assertEqual(dat.parse_longest(text), trie.parse_longest(text), text)
+
+    def test_medical_dictionary(self):
+        dic = load_medical_dictionary(['body_part', 'inspection', 'examination'])
+        dat = DoubleArrayTrie(dic)
+        self.assertIsInstance(dat.base, array)
+        for key, value in dic.items():
+            self.assertEqual(dat[key], value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+字典树测试：增删改查、最长匹配、全切分和模糊查询
+用法：python -m pytest nlp/commom/test_trie.py
+"""
+import random
+import unittest
+
+from nlp.commom.tool import levenshtein_distance, load_medical_dictionary
+from nlp.commom.trie import Trie
+
+
+class TrieTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = Trie({'自然': 'nature', '自然人': 'human', '自然语言': 'language', '自语': 'talk', '入门': 'introduction'})
+
+    def test_crud(self):
+        trie = self.trie
+        self.assertIn('自然', trie)
+        trie['自然'] = None
+        self.assertNotIn('自然', trie)
+        trie['自然语言'] = 'human language'
+        self.assertEqual(trie['自然语言'], 'human language')
+        del trie['入门']
+        self.assertIsNone(trie['入门'])
+        self.assertIsNone(trie['不存在'])
+
+    def test_parse(self):
+        self.assertEqual(self.trie.parse_longest('自然语言入门'),
+                         [('自然语言', 'language', 0, 3), ('入门', 'introduction', 4, 5)])
+        self.assertEqual(self.trie.parse_text('自然人'), [('自然', 'nature', 0, 1), ('自然人', 'human', 0, 2)])
+
+    def test_levenshtein_distance(self):
+        for source, target, distance in [('', '', 0), ('', 'abc', 3), ('kitten', 'sitting', 3),
+                                         ('高血压', '高血糖', 1), ('abc', 'acb', 2)]:
+            self.assertEqual(levenshtein_distance(source, target), distance)
+            self.assertEqual(levenshtein_distance(target, source), distance)
+
+    def test_fuzzy_search(self):
+        self.assertEqual(self.trie.fuzzy_search('自然语音', 1), [('自然语言', 'language', 1)])
+        self.assertEqual(self.trie.fuzzy_search('自然', 0), [('自然', 'nature', 0)])
+        # 被删除的词条不会出现在结果中
+        self.trie['自然'] = None
+        self.assertEqual(self.trie.fuzzy_search('自然', 1), [('自然人', 'human', 1), ('自语', 'talk', 1)])
+        with self.assertRaises(ValueError):
+            self.trie.fuzzy_search('自然', -1)
+
+    def test_fuzzy_search_brute_force(self):
+        rnd = random.Random(1)
+        for alphabet in ('ab', 'abc', '高血压糖'):
+            dic = {''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(1, 7))): i for i in range(60)}
+            trie = Trie(dic)
+            for _ in range(30):
+                word = ''.join(rnd.choice(alphabet + 'z') for _ in range(rnd.randrange(0, 8)))
+                for max_distance in range(4):
+                    expected = sorted(((key, value, levenshtein_distance(word, key)) for key, value in dic.items()
+                                       if levenshtein_distance(word, key) <= max_distance),
+                                      key=lambda item: (item[2], item[0]))
+                    self.assertEqual(trie.fuzzy_search(word, max_distance), expected, (word, max_distance))
+
+    def test_medical_dictionary(self):
+        dic = load_medical_dictionary(['crowd', 'unit', 'physical'])
+        self.assertTrue(dic)
+        trie = Trie(dic)
+        word = next(iter(dic))
+        self.assertIn((word, dic[word], 0), trie.fuzzy_search(word, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,9 @@
+import csv
+import glob
+import random
 import time
 import zipfile
 import os
-from pyhanlp import *
-
-from pyhanlp.static import download, remove_file, HANLP_DATA_PATH
 
 
 def load_dictionary():
@@ -11,12 +11,98 @@ def load_dictionary():
     加载HanLP中的mini词库
     :return: 一个set形式的词库
     """
+    # 导入pyhanlp会启动JVM，只在需要HanLP词库时导入
+    from pyhanlp import JClass, HanLP
     io_util = JClass('com.hankcs.hanlp.corpus.io.IOUtil')
     path = HanLP.Config.CoreDictionaryPath.replace('.txt', '.mini.txt')
     dic = io_util.loadDictionary([path])
     return set(dic.keySet())
 
 
+def load_medical_dictionary(names=None):
+    """
+    加载nlp/data/dictionary下的医疗词库，每行为(词条, 词性, 词频)
+    :param names: 词库名称列表，如['disease', 'medicine']，默认加载全部
+    :return: {词条: 词性}
+    """
+    root = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'dictionary')
+    if names is None:
+        paths = sorted(glob.glob(os.path.join(root, '*.csv')))
+    else:
+        paths = [os.path.join(root, name + '.csv') for name in names]
+    dic = {}
+    for path in paths:
+        with open(path, encoding='utf-8', newline='') as file:
+            for row in csv.reader(file):
+                if row and row[0]:
+                    dic[row[0]] = row[1]
+    return dic
+
+
+def levenshtein_distance(source: str, target: str):
+    """
+    编辑距离，逐行动态规划
+    :param source: 源字符串
+    :param target: 目标字符串
+    :return: 将source变为target所需的最少插入、删除、替换次数
+    """
+    previous = list(range(len(target) + 1))
+    for i, char in enumerate(source, 1):
+        current = [i]
+        for j, other in enumerate(target, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        previous = current
+    return previous[-1]
+
+
+def fuzzy_evaluate_speed(trie, dic, queries=10, max_distance=1, seed=1):
+    """
+    对比字典树模糊查询与逐个计算编辑距离的暴力查询
+    查询词为随机抽取的词条经过max_distance次随机的插入、删除、替换得到，两种方式的结果必须一致
+    :param trie: 实现了fuzzy_search的字典树
+    :param dic: 字典
+    :param queries: 查询次数
+    :param max_distance: 最大编辑距离
+    :param seed: 随机种子
+    :return:
+    """
+    rnd = random.Random(seed)
+    words = sorted(dic)
+    alphabet = ''.join(sorted(set(''.join(rnd.sample(words, min(len(words), 1000))))))
+    samples = []
+    for word in rnd.sample(words, queries):
+        for _ in range(max_distance):
+            i = rnd.randrange(len(word) + 1)
+            operation = rnd.randrange(3)
+            if operation == 0 or not word:
+                word = word[:i] + rnd.choice(alphabet) + word[i:]
+            elif operation == 1:
+                i = min(i, len(word) - 1)
+                word = word[:i] + word[i + 1:]
+            else:
+                i = min(i, len(word) - 1)
+                word = word[:i] + rnd.choice(alphabet) + word[i + 1:]
+        samples.append(word)
+
+    start_time = time.time()
+    trie_result = [trie.fuzzy_search(word, max_distance) for word in samples]
+    trie_elapsed = time.time() - start_time
+    start_time = time.time()
+    brute_result = []
+    for word in samples:
+        found = []
+        for key in words:
+            distance = levenshtein_distance(word, key)
+            if distance <= max_distance:
+                found.append((key, dic[key], distance))
+        found.sort(key=lambda item: (item[2], item[0]))
+        brute_result.append(found)
+    brute_elapsed = time.time() - start_time
+    assert trie_result == brute_result
+    print('{:>18} {:.2f} 次/秒'.format('fuzzy_search', queries / trie_elapsed))
+    print('{:>18} {:.2f} 次/秒'.format('brute force', queries / brute_elapsed))
+
+
 def count_single_char(word_list: list):
     """
     统计单字词数量
@@ -63,6 +149,7 @@ def test_data_path():
     获取测试数据路径，位于$root/data/test，根目录由配置文件指定。
     :return:
     """
+    from pyhanlp.static import HANLP_DATA_PATH
     data_path = os.path.join(HANLP_DATA_PATH, 'test')
     if not os.path.isdir(data_path):
         os.mkdir(data_path)
@@ -70,6 +157,7 @@ def test_data_path():
 
 
 def ensure_data(data_name, data_url):
+    from pyhanlp.static import download, remove_file
     root_path = test_data_path()
     dest_path = os.path.join(root_path, data_name)
     if os.path.exists(dest_path):
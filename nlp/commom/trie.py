@@ -2,7 +2,7 @@
 # Author: hankcs
 # Date: 2020-01-04 23:46
 from typing import Dict, Any, List, Tuple, Union
-from nlp.commom.tool import load_dictionary, trie_evaluate_speed
+from nlp.commom.tool import load_dictionary, trie_evaluate_speed, load_medical_dictionary, fuzzy_evaluate_speed
 
 
 class Node(object):
@@ -141,6 +141,52 @@ class Trie(Node):
             i += 1
         return found
 
+    def fuzzy_search(self, word: str, max_distance: int = 1) -> List[Tuple[str, Any, int]]:
+        """
+        模糊查询，返回与word的编辑距离(Levenshtein)不超过max_distance的所有词条
+        深度优先遍历字典树，每下降一个字符由父节点的编辑距离行递推出当前节点的一行，共享前缀的词条只计算一次；
+        第depth行只有下标在[depth - max_distance, depth + max_distance]内的格子可能不超过max_distance，
+        其余格子统一记为max_distance + 1；一行中的最小值超过max_distance时，子树中的词条都不会匹配，剪掉整个分支
+        :param word: 查询词
+        :param max_distance: 最大编辑距离
+        :return: [(词条, 值, 编辑距离)]，按编辑距离、词条升序排列
+        """
+        if max_distance < 0:
+            raise ValueError('max_distance must be non-negative, got {}'.format(max_distance))
+        columns = len(word) + 1
+        cap = max_distance + 1
+        found = []
+        # 根节点对应空前缀，第i格为删除word前i个字符的代价
+        stack = [(self, '', [i if i < cap else cap for i in range(columns)])]
+        while stack:
+            node, prefix, row = stack.pop()
+            depth = len(prefix) + 1
+            low = max(1, depth - max_distance)
+            high = min(columns, depth + cap)
+            for char, child in node._children.items():
+                current = [cap] * columns
+                if depth < cap:
+                    current[0] = depth
+                best = current[0]
+                for i in range(low, high):
+                    # 替换(字符相同时不计代价)、插入、删除三者取最小
+                    value = row[i - 1] if word[i - 1] == char else row[i - 1] + 1
+                    if row[i] + 1 < value:
+                        value = row[i] + 1
+                    if current[i - 1] + 1 < value:
+                        value = current[i - 1] + 1
+                    if value < cap:
+                        current[i] = value
+                        if value < best:
+                            best = value
+                key = prefix + char
+                if child._value is not None and current[-1] < cap:
+                    found.append((key, child._value, current[-1]))
+                if best < cap and child._children:
+                    stack.append((child, key, current))
+        found.sort(key=lambda item: (item[2], item[0]))
+        return found
+
 
 class TrieDict:
 
@@ -204,6 +250,9 @@ if __name__ == '__main__':
     assert trie['自然语言'] == 'human language'
     # 查
     assert trie['入门'] == 'introduction'
+    # 模糊查询
+    assert trie.fuzzy_search('自然语音', 1) == [('自然语言', 'human language', 1)]
+    print('模糊查询:', trie.fuzzy_search('自然', 2))
 
     # 分词速度评测
     dic = load_dictionary()
@@ -215,3 +264,7 @@ if __name__ == '__main__':
     print('----' * 50)
     print('分词速度评估')
     trie_evaluate_speed(trie, text)
+    print('----' * 50)
+    print('模糊查询速度评估')
+    medical_dic = load_medical_dictionary()
+    fuzzy_evaluate_speed(Trie(medical_dic), medical_dic, max_distance=1)
@@ -0,0 +1,633 @@
+from tree.base_tree import Tree
+from array import array
+from bisect import bisect_left
+import time
+import random
+
+
+class ArrayAverageBinaryTree(Tree):
+    """
+    基于数组的平衡二叉树，只支持int类型的值
+    每个节点不再是一个python对象，而是各列数组中的同一个下标：
+        keys:值，array('q')
+        lefts/rights:左右孩子的下标，array('i')
+        heights:子树高度，array('b')
+        sizes:子树中值的数量，array('i')
+    下标0作为空节点的哨兵，其高度恒为0；删除节点后的空闲下标通过lefts串成空闲链表重复利用
+    """
+    def __init__(self):
+        self._root = 0
+        self._count = 0
+        self._free = 0
+        self._keys = array('q', [0])
+        self._lefts = array('i', [0])
+        self._rights = array('i', [0])
+        self._heights = array('b', [0])
+        self._sizes = array('i', [0])
+        # 关联的数据只在使用put时才创建
+        self._datas = None
+
+    def _new_node(self, value: int, data=None):
+        """
+        分配一个节点，优先复用空闲链表中的下标
+        先写入keys：值不是int或超出int64范围时array抛出异常，此时空闲链表和各列数组都还没有修改
+        :param value: 值
+        :param data: 关联的数据
+        :return: 节点下标
+        """
+        if self._free:
+            index = self._free
+            self._keys[index] = value
+            self._free = self._lefts[index]
+            self._lefts[index] = 0
+            self._rights[index] = 0
+            self._heights[index] = 1
+            self._sizes[index] = 1
+        else:
+            index = len(self._keys)
+            self._keys.append(value)
+            self._lefts.append(0)
+            self._rights.append(0)
+            self._heights.append(1)
+            self._sizes.append(1)
+            if self._datas is not None:
+                self._datas.append(None)
+        if data is not None and self._datas is None:
+            self._datas = [None] * len(self._keys)
+        if self._datas is not None:
+            self._datas[index] = data
+        return index
+
+    def _free_node(self, index):
+        """
+        回收一个节点，将其下标加入空闲链表
+        :param index: 节点下标
+        """
+        self._lefts[index] = self._free
+        self._rights[index] = 0
+        self._heights[index] = 0
+        self._sizes[index] = 0
+        if self._datas is not None:
+            self._datas[index] = None
+        self._free = index
+
+    def _insert(self, value: int, data=None):
+        """
+        插入一个值，自顶向下记录路径，插入后自底向上修复高度和平衡
+        :param value: 值
+        :param data: 关联的数据
+        :return: value
+        """
+        keys, lefts, rights = self._keys, self._lefts, self._rights
+        path = []
+        node = self._root
+        while node:
+            key = keys[node]
+            if value < key:
+                path.append((node, True))
+                node = lefts[node]
+            elif value > key:
+                path.append((node, False))
+                node = rights[node]
+            else:
+                if data is not None or self._datas is not None:
+                    if self._datas is None:
+                        self._datas = [None] * len(keys)
+                    self._datas[node] = data
+                return
+        # 先分配节点，值无法写入keys时不会修改数量和子树大小
+        index = self._new_node(value, data)
+        self._count += 1
+        # 新值位于路径上每个节点的子树中
+        sizes = self._sizes
+        for node, is_left in path:
+            sizes[node] += 1
+        self._root = self._fix_path(path, index)
+
+    def _search(self, value: int):
+        """
+        查询一个节点
+        :param value:值
+        :return: value，不存在时返回None
+        """
+        index = self._find(value)
+        if index:
+            return self._keys[index]
+        return None
+
+    def _find(self, value: int):
+        """
+        查询值所在的下标
+        :param value: 值
+        :return: 节点下标，不存在时返回0
+        """
+        keys, lefts, rights = self._keys, self._lefts, self._rights
+        node = self._root
+        while node:
+            key = keys[node]
+            if value < key:
+                node = lefts[node]
+            elif value > key:
+                node = rights[node]
+            else:
+                return node
+        return 0
+
+    def _search_sorted(self, probes):
+        """
+        对有序的探测键做一次合并遍历，每个节点把区间内的键一分为二交给左右子树
+        :param probes: 有序的探测键列表
+        :return: 与probes并列的_search结果列表
+        """
+        keys, lefts, rights = self._keys, self._lefts, self._rights
+        result = [None] * len(probes)
+        stack = [(self._root, 0, len(probes))]
+        while stack:
+            node, lo, hi = stack.pop()
+            if not node:
+                continue
+            key = keys[node]
+            i = bisect_left(probes, key, lo, hi)
+            j = i
+            while j < hi and probes[j] == key:
+                result[j] = key
+                j += 1
+            if lo < i:
+                stack.append((lefts[node], lo, i))
+            if j < hi:
+                stack.append((rights[node], j, hi))
+        return result
+
+    def _get(self, key, default):
+        """
+        查询键关联的数据
+        :param key: 键
+        :param default: 键不存在时返回的默认值
+        :return: 关联的数据
+        """
+        index = self._find(key)
+        if not index:
+            return default
+        if self._datas is None:
+            return None
+        return self._datas[index]
+
+    def _delete(self, value: int):
+        """
+        删除一个节点
+        1、删除节点有两个子节点时，用前驱(左子树更高)或后继节点的值替换，转为删除前驱或后继节点
+        2、删除节点最多只有一个子节点时，用子节点替换删除节点
+        自底向上修复路径上的高度和平衡
+        :param value:值
+        :return: value
+        """
+        keys, lefts, rights, heights = self._keys, self._lefts, self._rights, self._heights
+        path = []
+        node = self._root
+        while node and keys[node] != value:
+            if value < keys[node]:
+                path.append((node, True))
+                node = lefts[node]
+            else:
+                path.append((node, False))
+                node = rights[node]
+        if not node:
+            return
+        self._count -= 1
+        if lefts[node] and rights[node]:
+            target = node
+            if heights[lefts[node]] >= heights[rights[node]]:
+                # 寻找前驱节点
+                path.append((node, True))
+                node = lefts[node]
+                while rights[node]:
+                    path.append((node, False))
+                    node = rights[node]
+                child = lefts[node]
+            else:
+                # 寻找后继节点
+                path.append((node, False))
+                node = rights[node]
+                while lefts[node]:
+                    path.append((node, True))
+                    node = lefts[node]
+                child = rights[node]
+            keys[target] = keys[node]
+            if self._datas is not None:
+                self._datas[target] = self._datas[node]
+        else:
+            child = lefts[node] or rights[node]
+        # 被回收的节点位于路径上每个节点的子树中
+        sizes = self._sizes
+        for parent, is_left in path:
+            sizes[parent] -= 1
+        self._free_node(node)
+        self._root = self._fix_path(path, child)
+
+    def _fix_path(self, path, child):
+        """
+        自底向上将子树挂回父节点并修复平衡，子树高度不再变化时提前结束
+        :param path: 根节点到子树父节点的路径[(下标, 是否为左孩子)]
+        :param child: 新的子树根节点
+        :return: 新的根节点
+        """
+        lefts, rights, heights = self._lefts, self._rights, self._heights
+        while path:
+            node, is_left = path.pop()
+            if is_left:
+                lefts[node] = child
+            else:
+                rights[node] = child
+            height = heights[node]
+            child = self._balance(node)
+            # 子树根节点和高度都没有变化时，祖先节点不受影响
+            if child == node and heights[node] == height:
+                return self._root
+        return child
+
+    def _update_height(self, node):
+        """更新节点高度"""
+        heights = self._heights
+        left, right = heights[self._lefts[node]], heights[self._rights[node]]
+        heights[node] = (left if left > right else right) + 1
+
+    def _factor(self, node):
+        """平衡因子"""
+        return self._heights[self._lefts[node]] - self._heights[self._rights[node]]
+
+    def _balance(self, node):
+        """
+        更新节点高度并在失衡时旋转
+        :param node: 节点下标
+        :return: 旋转后的子树根节点
+        """
+        self._update_height(node)
+        factor = self._factor(node)
+        if factor > 1:
+            # 左右型先对左孩子左旋
+            if self._factor(self._lefts[node]) < 0:
+                self._lefts[node] = self._left_rotate(self._lefts[node])
+            return self._right_rotate(node)
+        if factor < -1:
+            # 右左型先对右孩子右旋
+            if self._factor(self._rights[node]) > 0:
+                self._rights[node] = self._right_rotate(self._rights[node])
+            return self._left_rotate(node)
+        return node
+
+    def _right_rotate(self, node):
+        """右旋"""
+        if self._stats is not None:
+            self._stats.rotations += 1
+        lefts, rights, sizes = self._lefts, self._rights, self._sizes
+        left = lefts[node]
+        lefts[node] = rights[left]
+        rights[left] = node
+        self._update_height(node)
+        self._update_height(left)
+        sizes[left] = sizes[node]
+        sizes[node] = sizes[lefts[node]] + sizes[rights[node]] + 1
+        return left
+
+    def _left_rotate(self, node):
+        """左旋"""
+        if self._stats is not None:
+            self._stats.rotations += 1
+        lefts, rights, sizes = self._lefts, self._rights, self._sizes
+        right = rights[node]
+        rights[node] = lefts[right]
+        lefts[right] = node
+        self._update_height(node)
+        self._update_height(right)
+        sizes[right] = sizes[node]
+        sizes[node] = sizes[lefts[node]] + sizes[rights[node]] + 1
+        return right
+
+    def _rank(self, key, inclusive):
+        """
+        根据子树大小自顶向下统计排名
+        :param key: 键
+        :param inclusive: 是否统计等于key的值
+        :return: 小于(或等于)key的值的数量
+        """
+        keys, lefts, rights, sizes = self._keys, self._lefts, self._rights, self._sizes
+        rank = 0
+        node = self._root
+        while node:
+            if key < keys[node]:
+                node = lefts[node]
+            elif key > keys[node]:
+                rank += sizes[lefts[node]] + 1
+                node = rights[node]
+            else:
+                return rank + sizes[lefts[node]] + (1 if inclusive else 0)
+        return rank
+
+    def _select(self, k):
+        """
+        根据子树大小自顶向下查找第k小的值
+        :param k: 下标，0 <= k < len(self)
+        :return: value
+        """
+        lefts, rights, sizes = self._lefts, self._rights, self._sizes
+        node = self._root
+        while node:
+            left = sizes[lefts[node]]
+            if k < left:
+                node = lefts[node]
+            elif k > left:
+                k -= left + 1
+                node = rights[node]
+            else:
+                return self._keys[node]
+        raise IndexError('select index out of range')
+
+    def _mid_order(self, node, result):
+        """
+        中序遍历
+        :return: 值列表
+        """
+        result.extend(self.iter_in_order())
+        return result
+
+    def iter_in_order(self):
+        """
+        中序遍历生成器
+        :return: 生成器，按升序返回值
+        """
+        keys = self._keys
+        for node in self._iter_index():
+            yield keys[node]
+
+    def _iter_index(self):
+        """
+        中序遍历生成器，使用显式栈
+        :return: 生成器，按升序返回节点下标
+        """
+        lefts, rights = self._lefts, self._rights
+        stack = []
+        node = self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = lefts[node]
+            node = stack.pop()
+            yield node
+            node = rights[node]
+
+    def __iter__(self):
+        return self.iter_in_order()
+
+    def range(self, lo=None, hi=None):
+        """
+        范围扫描，按升序返回闭区间[lo, hi]内的值，跳过小于lo的节点及其左子树
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :return: 生成器
+        """
+        keys, lefts, rights = self._keys, self._lefts, self._rights
+        stack = []
+        node = self._root
+        while stack or node:
+            while node:
+                if lo is not None and keys[node] < lo:
+                    node = rights[node]
+                else:
+                    stack.append(node)
+                    node = lefts[node]
+            if not stack:
+                return
+            node = stack.pop()
+            if hi is not None and keys[node] > hi:
+                return
+            yield keys[node]
+            node = rights[node]
+
+    def __reversed__(self):
+        """按降序返回树中的值"""
+        keys, lefts, rights = self._keys, self._lefts, self._rights
+        stack = []
+        node = self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = rights[node]
+            node = stack.pop()
+            yield keys[node]
+            node = lefts[node]
+
+    def iter_pre_order(self):
+        """
+        先序遍历生成器
+        :return: 生成器，返回值
+        """
+        keys = self._keys
+        for node in super(ArrayAverageBinaryTree, self).iter_pre_order():
+            yield keys[node]
+
+    def iter_post_order(self):
+        """
+        后序遍历生成器
+        :return: 生成器，返回值
+        """
+        keys = self._keys
+        for node in super(ArrayAverageBinaryTree, self).iter_post_order():
+            yield keys[node]
+
+    def _children(self, node):
+        """节点下标的孩子节点下标"""
+        return [child for child in (self._lefts[node], self._rights[node]) if child]
+
+    def _count_visits(self, value):
+        """查询value时访问的节点数量"""
+        keys, lefts, rights = self._keys, self._lefts, self._rights
+        visits = 0
+        node = self._root
+        while node:
+            visits += 1
+            if keys[node] == value:
+                break
+            node = lefts[node] if keys[node] > value else rights[node]
+        return visits
+
+    def _insert_many(self, values):
+        """
+        批量插入，批次相对树的规模较大时，将中序序列与批次线性合并后重建各列数组，否则按键的顺序逐个插入
+        :param values: 有序且不重复的值列表
+        """
+        if not self._prefer_rebuild(len(values)):
+            return super(ArrayAverageBinaryTree, self)._insert_many(values)
+        keys, datas = self._keys, self._datas
+        pairs = ((keys[node], datas[node] if datas is not None else None) for node in self._iter_index())
+        self._rebuild(self._merge_values(pairs, values))
+
+    def _delete_many(self, values):
+        """
+        批量删除，批次相对树的规模较大时，过滤中序序列后重建各列数组，否则按键的顺序逐个删除
+        :param values: 有序且不重复的值列表
+        """
+        if not self._prefer_rebuild(len(values)):
+            return super(ArrayAverageBinaryTree, self)._delete_many(values)
+        removed = set(values)
+        keys, datas = self._keys, self._datas
+        self._rebuild([(keys[node], datas[node] if datas is not None else None)
+                       for node in self._iter_index() if keys[node] not in removed])
+
+    def _rebuild(self, pairs):
+        """
+        根据有序的(值, 关联的数据)列表重建完全平衡的树
+        :param pairs: 有序的(值, 关联的数据)列表
+        """
+        self._reset_columns(pairs)
+        self._root = self._link(1, len(pairs) + 1)
+
+    def _reset_columns(self, pairs):
+        """
+        根据有序的(值, 关联的数据)列表重新创建各列数组，节点下标按中序分配，keys本身即为有序数组，节点之间尚未连接
+        :param pairs: 有序的(值, 关联的数据)列表
+        """
+        n = len(pairs)
+        # 先创建keys，值无法写入时树保持不变
+        keys = array('q', [0])
+        keys.extend(value for value, data in pairs)
+        self._keys = keys
+        self._lefts = array('i', [0]) * (n + 1)
+        self._rights = array('i', [0]) * (n + 1)
+        self._heights = array('b', [0]) * (n + 1)
+        self._sizes = array('i', [0]) * (n + 1)
+        self._datas = None
+        if any(data is not None for value, data in pairs):
+            self._datas = [None]
+            self._datas.extend(data for value, data in pairs)
+        self._free = 0
+        self._count = n
+        self._root = 0
+
+    def _link(self, lo, hi):
+        """
+        以中间下标为根递归连接[lo, hi)内的节点，构建完全平衡的子树
+        :return: 子树根节点下标
+        """
+        if lo >= hi:
+            return 0
+        mid = (lo + hi) // 2
+        left = self._lefts[mid] = self._link(lo, mid)
+        right = self._rights[mid] = self._link(mid + 1, hi)
+        self._heights[mid] = max(self._heights[left], self._heights[right]) + 1
+        self._sizes[mid] = hi - lo
+        return mid
+
+    def _dump_items(self):
+        keys, datas = self._keys, self._datas
+        for node in self._iter_index():
+            yield keys[node], datas[node] if datas is not None else None
+
+    def _dump_meta(self):
+        """结构元数据：按中序排列的节点深度"""
+        lefts, rights = self._lefts, self._rights
+        depths = array('I')
+        stack = []
+        node, depth = self._root, 0
+        while stack or node:
+            while node:
+                stack.append((node, depth))
+                node, depth = lefts[node], depth + 1
+            node, depth = stack.pop()
+            depths.append(depth)
+            node, depth = rights[node], depth + 1
+        return self._pack_depths(depths)
+
+    def _load_state(self, pairs, meta):
+        """
+        根据中序序列和节点深度恢复树的形状，节点下标按中序分配，keys本身即为有序数组
+        :param pairs: 按中序排列的(值, 关联的数据)列表
+        :param meta: _dump_meta导出的结构元数据
+        """
+        depths, offset = self._unpack_depths(meta, len(pairs))
+        self._reset_columns(pairs)
+        lefts, rights = self._lefts, self._rights
+        stack = []
+        last = 0
+        for node in range(1, len(pairs) + 1):
+            depth = depths[node - 1]
+            last = 0
+            while stack and stack[-1][1] >= depth:
+                last = stack.pop()[0]
+                self._fix_loaded(last)
+            lefts[node] = last
+            if stack:
+                rights[stack[-1][0]] = node
+            stack.append((node, depth))
+        while stack:
+            last = stack.pop()[0]
+            self._fix_loaded(last)
+        self._root = last
+
+    def _fix_loaded(self, node):
+        """根据孩子节点修复高度和子树大小"""
+        self._update_height(node)
+        self._sizes[node] = self._sizes[self._lefts[node]] + self._sizes[self._rights[node]] + 1
+
+    def buffers(self):
+        """
+        导出树的全部结构，各列数组可以直接通过tobytes/tofile持久化，关联的数据为普通列表，需要另行序列化
+        :return: (根节点下标, 空闲链表头, keys, lefts, rights, heights, sizes, datas)，未使用put时datas为None
+        """
+        return (self._root, self._free, self._keys, self._lefts, self._rights, self._heights, self._sizes,
+                self._datas)
+
+    @classmethod
+    def from_buffers(cls, root, free, keys, lefts, rights, heights, sizes=None, datas=None):
+        """
+        根据buffers导出的结构恢复树
+        :param sizes: 子树大小，为None时通过后序遍历重新计算
+        :param datas: 与keys并列的关联数据，为None时所有值都没有关联的数据
+        :return: ArrayAverageBinaryTree对象
+        """
+        if datas is not None and len(datas) != len(keys):
+            raise ValueError('datas must be parallel to keys, got {} datas for {} keys'.format(len(datas), len(keys)))
+        tree = cls()
+        tree._datas = list(datas) if datas is not None else None
+        tree._root = root
+        tree._free = free
+        tree._keys = array('q', keys)
+        tree._lefts = array('i', lefts)
+        tree._rights = array('i', rights)
+        tree._heights = array('b', heights)
+        if sizes is not None:
+            tree._sizes = array('i', sizes)
+        else:
+            tree._sizes = array('i', [0]) * len(tree._keys)
+            for node in super(ArrayAverageBinaryTree, tree).iter_post_order():
+                tree._sizes[node] = tree._sizes[tree._lefts[node]] + tree._sizes[tree._rights[node]] + 1
+        # 已分配的下标减去空闲链表中的下标即为值的数量
+        free_count = 0
+        while free:
+            free_count += 1
+            free = tree._lefts[free]
+        tree._count = len(tree._keys) - 1 - free_count
+        return tree
+
+
+if __name__ == '__main__':
+    binary_tree = ArrayAverageBinaryTree()
+    start = time.time()
+    result = [num for num in range(1, 10001)]
+    random.seed(1)
+    random.shuffle(result)
+    for num in result:
+        binary_tree.put(num, num * 10)
+    print(time.time() - start)
+    print(binary_tree.search(100))
+    mid = binary_tree.mid_order()
+    print(mid[:20])
+    # 快照即各列数组的拷贝
+    snapshot = ArrayAverageBinaryTree.from_buffers(*binary_tree.buffers())
+    assert snapshot[100] == 1000
+    random.shuffle(result)
+    start = time.time()
+    for num in result:
+        binary_tree.delete(num)
+    print(time.time() - start)
+    print('最终结果：', binary_tree.mid_order())
+    print('快照：', len(snapshot.mid_order()))
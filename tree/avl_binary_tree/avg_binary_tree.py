@@ -1,4 +1,4 @@
-from tree.base_tree import Tree, IntNode
+from tree.base_tree import Tree, AvlNode
 import time
 import random
 import tqdm
@@ -6,35 +6,101 @@ import tqdm
 class AverageBinaryTree(Tree):
     """
     二叉搜索树
+    写时复制模式下，写入复制从根节点到修改位置的路径，新的根节点与旧树共享未修改的子树，替换根节点即完成发布，
+    读线程通过snapshot()获取快照后无需加锁；写入方之间仍需互斥
     """
-    def __init__(self):
+    def __init__(self, copy_on_write=False):
+        """
+        :param copy_on_write: 是否开启写时复制(路径复制)模式
+        """
         self._root = None
+        self._count = 0
+        if copy_on_write:
+            self._owned = set()
 
-    def _insert(self, value: int):
+    def _insert(self, value: int, data=None):
         """
-        插入一个值
+        插入一个值，自顶向下记录路径，插入后自底向上修复高度和平衡
         :param value: 值
+        :param data: 关联的数据
         :return: value
         """
-        self._root = self.__put(self._root, value)
+        path = []
+        node = self._root
+        while node:
+            if node.value > value:
+                path.append((node, True))
+                node = node.left
+            elif node.value < value:
+                path.append((node, False))
+                node = node.right
+            else:
+                break
+        if self._owned is not None:
+            path, node = self._copy_path(path, node)
+        if node:
+            node.value = value
+            node.data = data
+            self._publish(path[0][0] if path else node)
+            return
+        self._count += 1
+        # 新值位于路径上每个节点的子树中
+        for node, is_left in path:
+            node.size += 1
+        self._publish(self._fix_path(path, AvlNode(value, data)))
+
+    def _copy_path(self, path, child=None):
+        """
+        写时复制：复制路径上的节点并把副本逐个链接起来，路径以外的子树仍然与旧树共享
+        每次写入只在修改前调用一次，此时路径上的节点都还没有被复制过
+        :param path: 根节点到子树父节点的路径[(节点, 是否为左孩子)]
+        :param child: 路径末端的子树根节点，为None时不复制
+        :return: (由副本组成的路径, 子树根节点的副本)
+        """
+        owned = self._owned
+        copied = []
+        parent, parent_left = None, False
+        for node, is_left in path if child is None else path + [(child, None)]:
+            node = node.copy()
+            owned.add(id(node))
+            if parent is not None:
+                if parent_left:
+                    parent.left = node
+                else:
+                    parent.right = node
+            copied.append((node, is_left))
+            parent, parent_left = node, is_left
+        if child is not None:
+            child = copied.pop()[0]
+        return copied, child
 
-    def __put(self, node, new_value):
+    def _fix_path(self, path, child):
         """
-        放置一个新的节点
-        :param node:
-        :param new_node:
+        自底向上将子树挂回父节点并修复平衡，子树根节点和高度都不再变化时提前结束
+        :param path: 根节点到子树父节点的路径[(节点, 是否为左孩子)]
+        :param child: 新的子树根节点
         :return: 新的根节点
         """
-        # 先将新值插入
-        if node is None:
-            return IntNode(new_value)
-        if node.value > new_value:
-            node.left = self.__put(node.left, new_value)
-        elif node.value < new_value:
-            node.right = self.__put(node.right, new_value)
-        else:
-            node.value = new_value
+        root = path[0][0] if path else child
+        while path:
+            node, is_left = path.pop()
+            if is_left:
+                node.left = child
+            else:
+                node.right = child
+            height = node.height
+            child = self._balance(node)
+            # 祖先节点的平衡因子只依赖子树高度，此时无需继续向上修复
+            if child is node and node.height == height:
+                return root
+        return child
 
+    def _balance(self, node):
+        """
+        更新节点高度，并在失衡时进行旋转
+        :param node: 节点
+        :return: 旋转后的子树根节点
+        """
         # 更新高度
         node.height = max(self.height(node.left), self.height(node.right)) + 1
         # 平衡因子
@@ -79,69 +145,104 @@ class AverageBinaryTree(Tree):
         删除一个节点
         1、删除节点为叶子节点
         2、删除节点有一个子节点
-        3、删除节点有两个子节点
-        递归更新树的高度，并维持新的平衡
+        3、删除节点有两个子节点，用前驱(左子树更高时)或后继节点的值替换，转为删除前驱或后继节点
+        自底向上更新路径上的高度，并维持新的平衡
         :param value:值
         :return: value
         """
-        self._root = self.__delete_node(self._root, value)
-
-    def __delete_node(self, node, value):
-        """
-        递归删除一个节点
-        :param node: 当前节点
-        :param value: 删除的值
-        :return:
-        """
+        path = []
+        node = self._root
+        while node and node.value != value:
+            if node.value > value:
+                path.append((node, True))
+                node = node.left
+            else:
+                path.append((node, False))
+                node = node.right
         if node is None:
-            return None
-        if node.value > value:
-            node.left = self.__delete_node(node.left, value)
-        elif node.value < value:
-            node.right = self.__delete_node(node.right, value)
-        elif node.value == value:
-            if node.left and node.right:
-                # 获取删除节点的平衡因子
-                factor = self.balance_factor(node)
-                # 当左子树的高度大于右子树时,将当前节点的前驱节点作为新的节点返回，否则将当前节点的后继节点返回
-                if factor >= 0:
-                    pre_node = self.find_right_last_node(node)
-                    self.remove_prev_node(node)
-                    node.value = pre_node.value
-                    return node
-                else:
-                    after_node = self.find_left_last_node(node)
-                    self.remove_after_node(node)
-                    node.value = after_node.value
-                    return node
-            elif node.left:
-                return node.left
+            return
+        self._count -= 1
+        target = None
+        if node.left and node.right:
+            # 被删除节点在路径中的位置，写时复制模式下路径上的节点会被替换为副本
+            target = len(path)
+            # 当左子树的高度大于右子树时,将当前节点的前驱节点作为新的节点，否则将当前节点的后继节点作为新的节点
+            if self.balance_factor(node) >= 0:
+                path.append((node, True))
+                node = node.left
+                while node.right:
+                    path.append((node, False))
+                    node = node.right
+                child = node.left
             else:
-                return node.right
+                path.append((node, False))
+                node = node.right
+                while node.left:
+                    path.append((node, True))
+                    node = node.left
+                child = node.right
+        else:
+            child = node.left if node.left else node.right
+        if self._owned is not None:
+            path, _ = self._copy_path(path)
+        if target is not None:
+            target = path[target][0]
+            target.value = node.value
+            target.data = node.data
+        # 被摘除的节点位于路径上每个节点的子树中
+        for node, is_left in path:
+            node.size -= 1
+        self._publish(self._fix_path(path, child))
 
-        # 更新高度
-        node.height = max(self.height(node.left), self.height(node.right)) + 1
-        # 平衡因子
-        factor = self.balance_factor(node)
+    def _insert_many(self, values):
+        """
+        批量插入，批次相对树的规模较大时，将中序序列与批次线性合并后重建完全平衡的树，否则按键的顺序逐个插入
+        :param values: 有序且不重复的值列表
+        """
+        if not self._prefer_rebuild(len(values)):
+            return super(AverageBinaryTree, self)._insert_many(values)
+        self._rebuild(self._merge_values(((node.value, node.data) for node in self.iter_in_order()), values))
 
-        # 判定是否需要右旋
-        if factor > 1 and self.balance_factor(node.left) >= 0:
-            return self.right_rotate(node)
-        # 判定是否需要左旋+右旋
-        if factor > 1 and self.balance_factor(node.left) < 0:
-            node.left = self.left_rotate(node.left)
-            return self.right_rotate(node)
+    def _delete_many(self, values):
+        """
+        批量删除，批次相对树的规模较大时，过滤中序序列后重建完全平衡的树，否则按键的顺序逐个删除
+        :param values: 有序且不重复的值列表
+        """
+        if not self._prefer_rebuild(len(values)):
+            return super(AverageBinaryTree, self)._delete_many(values)
+        removed = set(values)
+        self._rebuild([(node.value, node.data) for node in self.iter_in_order() if node.value not in removed])
 
-        # 判定是否需要左旋
-        if factor < -1 and self.balance_factor(node.right) <= 0:
-            return self.left_rotate(node)
-        # 判定是否需要右旋+左旋
-        if factor < -1 and self.balance_factor(node.right) > 0:
-            node.right = self.right_rotate(node.right)
-            return self.left_rotate(node)
+    def _rebuild(self, pairs):
+        """
+        根据有序的(值, 关联的数据)列表重建整棵树
+        :param pairs: 有序的(值, 关联的数据)列表
+        """
+        self._publish(self._build(pairs, 0, len(pairs)))
+        self._count = len(pairs)
 
+    def _build(self, pairs, lo, hi):
+        """
+        以中间值为根递归构建完全平衡的子树，递归深度为树的高度
+        :return: 子树根节点
+        """
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        node = AvlNode(*pairs[mid])
+        node.left = self._build(pairs, lo, mid)
+        node.right = self._build(pairs, mid + 1, hi)
+        node.height = max(self.height(node.left), self.height(node.right)) + 1
+        node.size = hi - lo
         return node
 
+    def _load_node(self, value, data, flag):
+        return AvlNode(value, data)
+
+    def _load_fix(self, node):
+        """根据孩子节点修复高度和子树大小"""
+        node.height = max(self.height(node.left), self.height(node.right)) + 1
+        node.size = self.size(node.left) + self.size(node.right) + 1
 
 
 if __name__ == '__main__':
@@ -150,10 +251,9 @@ if __name__ == '__main__':
     start = time.time()
     result = [num for num in range(1, 10001)]
     random.seed(1)
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.insert(num)
-        result.remove(num)
     print(time.time() - start)
     start = time.time()
     print(binary_tree.search(100))
@@ -165,10 +265,9 @@ if __name__ == '__main__':
     result = [num for num in range(1, 10001)]
     random.seed(1)
     bar = tqdm.trange(len(mid))
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.delete(num)
-        result.remove(num)
         # print(num)
         # print(binary_tree.mid_order())
         bar.update()
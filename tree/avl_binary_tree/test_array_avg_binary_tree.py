@@ -0,0 +1,107 @@
+"""
+基于数组的平衡二叉树测试：与对象版本一致、空闲链表复用、非法值不修改树、buffers导出与恢复
+用法：python -m pytest tree/avl_binary_tree/test_array_avg_binary_tree.py
+"""
+import random
+import unittest
+
+from tree.avl_binary_tree.array_avg_binary_tree import ArrayAverageBinaryTree
+from tree.avl_binary_tree.avg_binary_tree import AverageBinaryTree
+
+
+class ArrayAverageBinaryTreeTestCase(unittest.TestCase):
+
+    def check_balanced(self, tree):
+        """校验AVL平衡、高度和子树大小"""
+        keys, lefts, rights, heights, sizes = tree._keys, tree._lefts, tree._rights, tree._heights, tree._sizes
+        for node in tree._iter_index():
+            left, right = lefts[node], rights[node]
+            self.assertLessEqual(abs(heights[left] - heights[right]), 1)
+            self.assertEqual(heights[node], max(heights[left], heights[right]) + 1)
+            self.assertEqual(sizes[node], sizes[left] + sizes[right] + 1)
+        self.assertEqual(sizes[tree._root], len(tree))
+
+    def test_matches_object_tree(self):
+        rnd = random.Random(1)
+        array_tree, object_tree = ArrayAverageBinaryTree(), AverageBinaryTree()
+        for _ in range(3000):
+            key = rnd.randrange(500)
+            if rnd.random() < 0.6:
+                array_tree.insert(key)
+                object_tree.insert(key)
+            else:
+                array_tree.delete(key)
+                object_tree.delete(key)
+        self.assertEqual(list(array_tree), list(object_tree))
+        self.assertEqual(list(reversed(array_tree)), list(reversed(object_tree)))
+        self.check_balanced(array_tree)
+
+    def test_free_list_reuse(self):
+        tree = ArrayAverageBinaryTree()
+        tree.insert_many(range(100))
+        allocated = len(tree._keys)
+        for key in range(0, 100, 2):
+            tree.delete(key)
+        for key in range(1000, 1050):
+            tree.insert(key)
+        self.assertEqual(len(tree._keys), allocated)
+        self.check_balanced(tree)
+
+    def test_rejects_bad_key(self):
+        tree = ArrayAverageBinaryTree()
+        for key in range(10):
+            tree.insert(key)
+        # 删除后空闲链表不为空，覆盖复用下标的分配路径
+        tree.delete(3)
+        for bad, error in [(2.5, TypeError), (1 << 63, OverflowError), ('x', TypeError)]:
+            free = tree._free
+            with self.assertRaises(error):
+                tree.insert(bad)
+            self.assertEqual(tree._free, free)
+        keys = [0, 1, 2, 4, 5, 6, 7, 8, 9]
+        self.assertEqual(len(tree), 9)
+        self.assertEqual(list(tree), keys)
+        self.assertEqual(tree.rank(100), 9)
+        self.assertEqual(tree.select(8), 9)
+        self.check_balanced(tree)
+        # 批量插入走重建路径时同样保持不变
+        tree.insert_many(range(100, 120))
+        with self.assertRaises(TypeError):
+            tree.insert_many([1.5] + list(range(200, 240)))
+        self.assertEqual(list(tree), keys + list(range(100, 120)))
+        self.check_balanced(tree)
+
+    def test_buffers_round_trip(self):
+        tree = ArrayAverageBinaryTree()
+        for key in range(50):
+            tree.put(key, 'data-{}'.format(key))
+        for key in range(0, 50, 5):
+            tree.delete(key)
+        for with_sizes in (True, False):
+            buffers = list(tree.buffers())
+            if not with_sizes:
+                buffers[6] = None
+            restored = ArrayAverageBinaryTree.from_buffers(*buffers)
+            self.assertEqual(len(restored), len(tree))
+            self.assertEqual(list(restored), list(tree))
+            for key in tree:
+                self.assertEqual(restored[key], 'data-{}'.format(key))
+            self.check_balanced(restored)
+            # 恢复后的树与原来的树互不影响
+            restored.put(1, 'changed')
+            restored.insert(1000)
+            self.assertEqual(tree[1], 'data-1')
+            self.assertNotIn(1000, tree)
+
+    def test_buffers_without_data(self):
+        tree = ArrayAverageBinaryTree()
+        tree.insert_many(range(10))
+        restored = ArrayAverageBinaryTree.from_buffers(*tree.buffers())
+        self.assertIsNone(restored.get(3))
+        with self.assertRaises(ValueError):
+            root, free, keys, lefts, rights, heights, sizes, datas = tree.buffers()
+            ArrayAverageBinaryTree.from_buffers(root, free, keys, lefts, rights, heights, sizes, [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
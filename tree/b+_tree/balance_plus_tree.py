@@ -1,4 +1,5 @@
-from tree.base_tree import Tree, BNode, Node
+from tree.base_tree import Tree, BNode
+from bisect import bisect_left, bisect_right
 import time
 import random
 import tqdm
@@ -6,7 +7,8 @@ import math
 
 class BalancePlusTree(Tree):
     """
-    红黑树
+    B+树，值全部保存在叶子节点中，叶子节点通过左右指针串成有序链表，索引节点只保存左侧子树的最大值用于路由
+    每个节点维护子树中值的数量，支持rank/select
     """
     def __init__(self, m=5):
         """
@@ -14,15 +16,124 @@ class BalancePlusTree(Tree):
         """
         self._m = m
         self._root = None
+        self._count = 0
         self._leaf_head = None
 
-    def _insert(self, value: int):
+    @classmethod
+    def from_sorted(cls, iterable, m=5, fill_factor=1.0, with_data=False):
+        """
+        根据有序序列自底向上批量构建B+树
+        1、顺序消费输入，按填充率将值装入叶子节点，同时维护叶子节点的左右链表
+        2、逐层为下一层节点生成索引节点，索引值为左侧子树的最大值，直到只剩一个根节点
+        :param iterable: 递增的值序列，可以是生成器，重复值会被忽略
+        :param m: 阶数
+        :param fill_factor: 节点填充率，取值范围(0, 1]
+        :param with_data: 为True时iterable中的元素为(值, 关联的数据)
+        :return: BalancePlusTree对象
+        """
+        if not 0 < fill_factor <= 1:
+            raise ValueError('fill_factor must be in (0, 1]')
+        tree = cls(m=m)
+        # 叶子节点最多容纳m-1个值，非根节点最少容纳ceil(m/2)-1个值
+        min_values = max(math.ceil(m / 2) - 1, 1)
+        leaf_size = min(max(int((m - 1) * fill_factor), min_values), m - 1)
+        leafs = []
+        prev = None
+        for items in cls._group(cls._check_sorted(iterable, with_data), leaf_size, min_values, m - 1):
+            leaf = BNode()
+            leaf.values = [value for value, data in items]
+            leaf.datas = [data for value, data in items]
+            leaf.size = len(items)
+            # 维护叶子节点的左右关系
+            if prev:
+                prev.right = leaf
+                leaf.left = prev
+            prev = leaf
+            leafs.append(leaf)
+            tree._count += len(items)
+        if not leafs:
+            return tree
+        tree._leaf_head = leafs[0]
+
+        # 索引节点最多拥有m个孩子，非根节点最少拥有ceil(m/2)个孩子
+        min_childs = max(math.ceil(m / 2), 2)
+        child_size = min(max(int(m * fill_factor), min_childs), m)
+        level = [(leaf, leaf.values[-1]) for leaf in leafs]
+        while len(level) > 1:
+            upper = []
+            for group in cls._group(level, child_size, min_childs, m):
+                node = BNode()
+                node.values = [max_value for child, max_value in group[:-1]]
+                node.childs = [child for child, max_value in group]
+                node.size = sum(child.size for child in node.childs)
+                upper.append((node, group[-1][1]))
+            level = upper
+        tree._root = level[0][0]
+        return tree
+
+    @staticmethod
+    def _check_sorted(iterable, with_data=False):
+        """
+        校验输入是否递增，并跳过重复值
+        :param iterable: 值序列
+        :param with_data: 为True时iterable中的元素为(值, 关联的数据)
+        :return: 生成器，每次返回(值, 关联的数据)
+        """
+        first = True
+        prev = None
+        for item in iterable:
+            if with_data:
+                value, data = item
+            else:
+                value, data = item, None
+            if not first:
+                if value == prev:
+                    continue
+                if value < prev:
+                    raise ValueError('from_sorted requires ascending input, got {} after {}'.format(value, prev))
+            first = False
+            prev = value
+            yield value, data
+
+    @staticmethod
+    def _group(iterable, size, min_size, max_size):
+        """
+        将序列按指定大小分组，最后一组数量不足min_size时与前一组合并或平分
+        :param iterable: 序列
+        :param size: 每组数量
+        :param min_size: 每组最少数量
+        :param max_size: 每组最多数量
+        :return: 生成器，每次返回一个分组列表
+        """
+        pending = None
+        current = []
+        for item in iterable:
+            current.append(item)
+            if len(current) >= size:
+                if pending:
+                    yield pending
+                pending = current
+                current = []
+        if current and pending and len(current) < min_size:
+            merged = pending + current
+            if len(merged) <= max_size:
+                pending, current = merged, []
+            else:
+                mid = len(merged) // 2
+                pending, current = merged[:mid], merged[mid:]
+        if pending:
+            yield pending
+        if current:
+            yield current
+
+    def _insert(self, value: int, data=None):
         """
         插入一个值
         :param value: 值
+        :param data: 关联的数据
         :return: value
         """
-        self._root = self.__put(self._root, value)
+        self._root = self.__put(self._root, value, data)
         # 当根节点阶数满时进行拆分
         if len(self._root.values) >= self._m and len(self._root.values)>2:
             self._split(None, self._root)
@@ -31,38 +142,135 @@ class BalancePlusTree(Tree):
             self._leaf_head = self._root
             self._leaf_head.left = None
 
-    def __put(self, node, new_value):
+    def __put(self, node, new_value, data):
         """
         放置一个新的节点
         :param node:
         :param new_node:
+        :param data: 关联的数据
         :return: 新的根节点
         """
         if not node:
-            return BNode(new_value)
-        # 遍历节点值
-        for k, v in enumerate(node.values):
-            # 如果当前节点为叶子节点，则直接添加
-            if node.is_leaf():
-                # 当叶子节点不包含当前值时添加进去
-                if new_value not in node.values:
-                    node.add_val(new_value)
-                break
+            self._count += 1
+            return BNode(new_value, data)
+        # 二分查找第一个大于或等于插入值的位置
+        k = bisect_left(node.values, new_value)
+        # 如果当前节点为叶子节点，当叶子节点不包含当前值时添加进去，否则只更新关联的数据
+        if node.is_leaf():
+            if k == len(node.values) or node.values[k] != new_value:
+                node.values.insert(k, new_value)
+                node.datas.insert(k, data)
+                node.size += 1
+                self._count += 1
             else:
-                # 当为非叶子节点且当前值小于或等于遍历值时，向下递归
-                if new_value <= v:
-                    node.childs[k] = self.__put(node.childs[k], new_value)
-                    break
-        else:
-            # 此时满足新插入的值大于当前节点中所有的值且当前节点不是叶子节点，此时直接递归put当前节点的最大子节点
-            node.childs[-1] = self.__put(node.childs[-1], new_value)
+                node.datas[k] = data
+            return node
+        # 当为非叶子节点时，向第k个孩子节点递归，新插入的值大于所有值时k即为最大子节点
+        count = self._count
+        child = self.__put(node.childs[k], new_value, data)
+        node.childs[k] = child
+        # 插入了新值时子树大小加一
+        if self._count != count:
+            node.size += 1
 
-        # 1、判定当前节点是否任一节点因为插入导致出现了满阶的情况，如果出现则进行拆分节点
-        for k, child in enumerate(node.childs):
-            if len(child.values) >= self._m:
-                self._split(node, child)
+        # 1、判定孩子节点是否因为插入导致出现了满阶的情况，如果出现则进行拆分节点
+        if len(child.values) >= self._m:
+            self._split(node, child)
         return node
 
+    def _insert_many(self, values):
+        """
+        批量插入，有序的批次沿树共享下降路径
+        1、按索引值把批次切分给各孩子节点，每个节点只访问一次
+        2、叶子节点线性合并批次，溢出的节点一次拆分成多个节点
+        :param values: 有序且不重复的值列表
+        """
+        if not self._root:
+            self._root = BNode()
+            self._leaf_head = self._root
+        self._count += self.__put_many(self._root, values, 0, len(values))
+        # 根节点溢出时放到新的根节点下拆分，直到根节点不再溢出
+        while len(self._root.values) >= self._m:
+            root = BNode()
+            root.childs = [self._root]
+            root.size = self._root.size
+            self._split_many(root, 0)
+            self._root = root
+
+    def __put_many(self, node, values, lo, hi):
+        """
+        将有序值序列的[lo, hi)部分放置到子树中
+        :param node: 子树根节点
+        :param values: 有序且不重复的值列表
+        :return: 新增值的数量
+        """
+        if node.is_leaf():
+            return node.merge_values(values, lo, hi)
+        added = 0
+        end = hi
+        # 从右向左处理孩子节点，拆分产生的新节点不会影响左侧孩子节点的下标
+        for k in range(len(node.childs) - 1, -1, -1):
+            start = bisect_right(values, node.values[k - 1], lo, end) if k else lo
+            if start < end:
+                added += self.__put_many(node.childs[k], values, start, end)
+                if len(node.childs[k].values) >= self._m:
+                    self._split_many(node, k)
+            end = start
+        node.size += added
+        return added
+
+    def _split_many(self, parent, k):
+        """
+        将溢出的孩子节点一次拆分为多个节点
+        叶子节点按值平分，索引值为左侧分组的最大值；索引节点按孩子节点平分，分组之间的值上升到父节点
+        :param parent: 父节点
+        :param k: 溢出的孩子节点所在的下标
+        """
+        child = parent.childs[k]
+        values, datas, childs = child.values, child.datas, child.childs
+        pieces = []
+        if child.is_leaf():
+            n = len(values)
+            parts = -(-n // (self._m - 1))
+            bounds = [n * i // parts for i in range(parts + 1)]
+            tail = child.right
+            prev = child
+            for i in range(1, parts):
+                piece = BNode()
+                piece.values = values[bounds[i]:bounds[i + 1]]
+                piece.datas = datas[bounds[i]:bounds[i + 1]]
+                piece.size = len(piece.values)
+                # 维护叶子节点的左右关系
+                piece.left = prev
+                prev.right = piece
+                prev = piece
+                pieces.append(piece)
+            prev.right = tail
+            if tail:
+                tail.left = prev
+            separators = [values[bound - 1] for bound in bounds[1:-1]]
+            del values[bounds[1]:]
+            del datas[bounds[1]:]
+        else:
+            n = len(childs)
+            parts = -(-n // self._m)
+            bounds = [n * i // parts for i in range(parts + 1)]
+            for i in range(1, parts):
+                piece = BNode()
+                piece.values = values[bounds[i]:bounds[i + 1] - 1]
+                piece.childs = childs[bounds[i]:bounds[i + 1]]
+                self._resize(piece)
+                pieces.append(piece)
+            separators = [values[bound - 1] for bound in bounds[1:-1]]
+            del values[bounds[1] - 1:]
+            del childs[bounds[1]:]
+        # 父节点的子树大小不变
+        parent.values[k:k] = separators
+        parent.childs[k + 1:k + 1] = pieces
+        if self._stats is not None:
+            self._stats.splits += len(pieces)
+        self._resize(child)
+
     def _split(self, parent, child):
         """
         拆分节点
@@ -70,34 +278,36 @@ class BalancePlusTree(Tree):
         :param child: 当前拆分节点
         :return:
         """
+        if self._stats is not None:
+            self._stats.splits += 1
         # 寻找中间节点
         mid = len(child.values) // 2
         current_value = child.values[mid]
         # 生成兄弟节点，此处为后继节点
         right = BNode()
-        # 拆分值
-        for k, v in enumerate(child.values[mid+1:]):
-            right.add_val(v)
-        # 拆分子节点
-        for k, c in enumerate(child.childs[mid+1:]):
-            right.add_child(c)
-        child.values = child.values[:mid]
-        child.childs = child.childs[:mid+1]
-        # 中间值的上升
+        # 拆分值和子节点
+        right.values = child.values[mid+1:]
+        right.childs = child.childs[mid+1:]
+        if child.is_leaf():
+            # 当分裂节点为叶子节点时，只上浮关键字，中间值保留在叶子节点中
+            right.datas = child.datas[mid+1:]
+            del child.values[mid+1:]
+            del child.datas[mid+1:]
+        else:
+            del child.values[mid:]
+            del child.childs[mid+1:]
+        self._resize(child)
+        self._resize(right)
+        # 中间值的上升，兄弟节点位于中间值的右侧，父节点的子树大小不变
         if parent:
-            parent.add_val(current_value)
-            parent.add_child(right)
-            # 当分裂节点为叶子节点时，只上浮关键字
-            if child.is_leaf():
-                child.add_val(current_value)
+            k = parent.add_val(current_value)
+            parent.childs.insert(k + 1, right)
         else:
-            # 当传入的parent为空时说明传入的是根节点
+            # 当传入的parent为空时说明传入的是根节点，索引节点不保存关联的数据
             self._root = BNode()
-            self._root.add_val(current_value)
-            self._root.add_child(child)
-            self._root.add_child(right)
-            if child.is_leaf():
-                child.add_val(current_value)
+            self._root.values = [current_value]
+            self._root.childs = [child, right]
+            self._resize(self._root)
         # 当孩子节点为叶子节点时，分裂后需保持左右叶子节点关系
         if child.is_leaf():
             right.right = child.right
@@ -106,6 +316,13 @@ class BalancePlusTree(Tree):
             child.right = right
             right.left = child
 
+    def _resize(self, node):
+        """重新计算子树大小，值只保存在叶子节点中"""
+        if node.is_leaf():
+            node.size = len(node.values)
+        else:
+            node.size = sum(child.size for child in node.childs)
+
     def _search(self, value: int):
         """
         查询一个节点
@@ -114,22 +331,62 @@ class BalancePlusTree(Tree):
         """
         current = self._root
         while current:
-            for k, v in enumerate(current.values):
-                if current.is_leaf() and v == value:
-                    return v
-                if value <= v:
-                    if not current.is_leaf():
-                        current = current.childs[k]
-                    else:
-                        current = None
-                    break
+            values = current.values
+            k = bisect_left(values, value)
+            if not current.is_leaf():
+                current = current.childs[k]
+            elif k < len(values) and values[k] == value:
+                return values[k]
             else:
-                if not current.is_leaf():
-                    current = current.childs[-1]
-                else:
-                    current = None
+                current = None
         return None
 
+    def _search_sorted(self, probes):
+        """
+        与叶子节点链表做归并：只为第一个探测键下降一次，之后逐个叶子节点消费不大于其最大值的探测键；
+        下一个探测键不在右侧相邻的叶子节点中时，说明中间跨过的叶子节点较多，重新从根节点下降
+        :param probes: 有序的探测键列表
+        :return: 与probes并列的_search结果列表
+        """
+        result = [None] * len(probes)
+        n = len(probes)
+        i = 0
+        leaf, descended = self._find_leaf(probes[0]), True
+        while i < n:
+            values = leaf.values
+            j = bisect_right(probes, values[-1], i) if values else i
+            if descended:
+                # 下降到的叶子节点就是probes[i]应在的位置，即使它大于叶子节点的最大值
+                j = max(j, i + 1)
+            k = 0
+            for p in range(i, j):
+                k = bisect_left(values, probes[p], k)
+                if k < len(values) and values[k] == probes[p]:
+                    result[p] = values[k]
+            i = j
+            right = leaf.right
+            if i == n or right is None:
+                break
+            if right.values and probes[i] <= right.values[-1]:
+                leaf, descended = right, False
+            else:
+                leaf, descended = self._find_leaf(probes[i]), True
+        return result
+
+    def _get(self, key, default):
+        """
+        查询键关联的数据，数据保存在叶子节点中与值并列的datas中
+        :param key: 键
+        :param default: 键不存在时返回的默认值
+        :return: 关联的数据
+        """
+        leaf = self._find_leaf(key)
+        if leaf:
+            k = bisect_left(leaf.values, key)
+            if k < len(leaf.values) and leaf.values[k] == key:
+                return leaf.datas[k]
+        return default
+
     def _mid_order(self, node, result):
         """B树中序遍历"""
         current = self._leaf_head
@@ -138,16 +395,240 @@ class BalancePlusTree(Tree):
             current = current.right
         return result
 
+    def _find_leaf(self, value):
+        """
+        从根节点下降到值所在(或应插入)的叶子节点
+        :param value: 值
+        :return: 叶子节点
+        """
+        current = self._root
+        while current and not current.is_leaf():
+            current = current.childs[bisect_left(current.values, value)]
+        return current
+
+    def _last_leaf(self):
+        """
+        获取最右侧的叶子节点
+        :return: 叶子节点
+        """
+        current = self._root
+        while current and not current.is_leaf():
+            current = current.childs[-1]
+        return current
+
+    def seek(self, value=None, reverse=False):
+        """
+        游标，只从根节点下降一次，之后沿叶子节点链表逐个返回值
+        :param value: 起始值，升序时从第一个大于或等于value的值开始，降序时从最后一个小于或等于value的值开始，为None时从头(尾)开始
+        :param reverse: 是否降序
+        :return: 生成器
+        """
+        return self._seek(value, reverse)
+
+    def _seek(self, value, reverse):
+        """seek的实现，range/min/max等内部读取直接使用，子类可以只包装公开的seek"""
+        if not reverse:
+            if value is None:
+                leaf, k = self._leaf_head, 0
+            else:
+                leaf = self._find_leaf(value)
+                k = bisect_left(leaf.values, value) if leaf else 0
+            while leaf:
+                values = leaf.values
+                for i in range(k, len(values)):
+                    yield values[i]
+                leaf, k = leaf.right, 0
+        else:
+            if value is None:
+                leaf = self._last_leaf()
+                k = len(leaf.values) if leaf else 0
+            else:
+                leaf = self._find_leaf(value)
+                k = bisect_right(leaf.values, value) if leaf else 0
+            while leaf:
+                values = leaf.values
+                for i in range(k - 1, -1, -1):
+                    yield values[i]
+                leaf = leaf.left
+                if leaf:
+                    k = len(leaf.values)
+
+    def iter_in_order(self):
+        """
+        中序遍历生成器，沿叶子节点链表按升序返回值
+        :return: 生成器
+        """
+        return self.seek()
+
+    def __iter__(self):
+        return self.seek()
+
+    def __reversed__(self):
+        return self.seek(reverse=True)
+
+    def _children(self, node):
+        """B+树节点的孩子节点"""
+        return node.childs
+
+    def _count_fill(self, parent, k):
+        """统计一次修复是借值还是合并，与_fill_node的判定条件相同"""
+        brother = parent.childs[k + 1] if len(parent.childs) > k + 1 else parent.childs[k - 1]
+        if len(brother.values) > math.ceil(self._m / 2) - 1:
+            self._stats.borrows += 1
+        else:
+            self._stats.merges += 1
+
+    def _node_capacity(self):
+        return self._m - 1
+
+    def _count_visits(self, value):
+        """查询value时访问的节点数量，B+树总是下降到叶子节点"""
+        visits = 0
+        node = self._root
+        while node:
+            visits += 1
+            node = node.childs[bisect_left(node.values, value)] if node.childs else None
+        return visits
+
+    def _dump_params(self):
+        return {'m': self._m}
+
+    def _dump_items(self):
+        """沿叶子节点链表按升序返回(值, 关联的数据)"""
+        leaf = self._leaf_head
+        while leaf:
+            for item in zip(leaf.values, leaf.datas):
+                yield item
+            leaf = leaf.right
+
+    def _dump_meta(self):
+        """索引节点可以由叶子节点重新生成，不需要结构元数据"""
+        return b''
+
+    def _load_state(self, pairs, meta):
+        """通过from_sorted自底向上批量构建"""
+        bulk = BalancePlusTree.from_sorted(pairs, m=self._m, with_data=True)
+        self._root, self._leaf_head, self._count = bulk._root, bulk._leaf_head, bulk._count
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        范围扫描，返回闭区间[lo, hi]内的值
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :param reverse: 是否降序
+        :return: 生成器
+        """
+        if not reverse:
+            for value in self._seek(lo, False):
+                if hi is not None and value > hi:
+                    return
+                yield value
+        else:
+            for value in self._seek(hi, True):
+                if lo is not None and value < lo:
+                    return
+                yield value
+
+    def count_range(self, lo=None, hi=None):
+        """
+        统计闭区间[lo, hi]内值的数量，整段落在区间内的叶子节点直接累加长度
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :return: 数量
+        """
+        if lo is None:
+            leaf, k = self._leaf_head, 0
+        else:
+            leaf = self._find_leaf(lo)
+            k = bisect_left(leaf.values, lo) if leaf else 0
+        count = 0
+        while leaf:
+            values = leaf.values
+            if values and hi is not None and values[-1] > hi:
+                return count + max(bisect_right(values, hi) - k, 0)
+            count += len(values) - k
+            leaf, k = leaf.right, 0
+        return count
+
+    def min(self):
+        """
+        最小值
+        :return: value，树为空时返回None
+        """
+        for value in self._seek(None, False):
+            return value
+        return None
+
+    def max(self):
+        """
+        最大值
+        :return: value，树为空时返回None
+        """
+        for value in self._seek(None, True):
+            return value
+        return None
+
     def _delete(self, value: int):
         """
         删除一个节点
         :param value:值
         :return: value
         """
+        if not self._root:
+            return
         self._root = self.__delete_node(self._root, value)
         if not self._root.values and self._root.childs:
             self._root = self._root.childs[0]
 
+    def _delete_many(self, values):
+        """
+        批量删除，有序的批次沿树共享下降路径，每个节点只访问一次
+        孩子节点全部处理完后再统一修复失衡，避免借值移动的值错过切分给兄弟节点的批次
+        :param values: 有序且不重复的值列表
+        """
+        self._count -= self.__delete_many(self._root, values, 0, len(values))
+        while not self._root.values and self._root.childs:
+            self._root = self._root.childs[0]
+
+    def __delete_many(self, node, values, lo, hi):
+        """
+        从子树中删除有序值序列[lo, hi)部分包含的值
+        :param node: 子树根节点
+        :param values: 有序且不重复的值列表
+        :return: 删除值的数量
+        """
+        if node.is_leaf():
+            return node.remove_values(values, lo, hi)
+        removed = 0
+        end = hi
+        for k in range(len(node.childs) - 1, -1, -1):
+            start = bisect_right(values, node.values[k - 1], lo, end) if k else lo
+            if start < end:
+                removed += self.__delete_many(node.childs[k], values, start, end)
+            end = start
+        node.size -= removed
+        self.__fill_childs(node)
+        return removed
+
+    def __fill_childs(self, node):
+        """
+        从右向左修复失衡的孩子节点，借值只会从值富余的兄弟节点借走一个值，不会使右侧已修复的节点失衡
+        孩子节点只剩一个时无法在当前层修复，由上一层借值或合并后，对接收它的节点再次修复
+        :param node: 父节点
+        """
+        min_values = math.ceil(self._m / 2) - 1
+        k = len(node.childs) - 1
+        while k >= 0 and len(node.childs) > 1:
+            k = min(k, len(node.childs) - 1)
+            child = node.childs[k]
+            if len(child.values) < min_values:
+                self._fill_node(node, child, k)
+                if not child.is_leaf():
+                    for brother in node.childs[max(k - 1, 0):k + 1]:
+                        self.__fill_childs(brother)
+            else:
+                k -= 1
+
     def __delete_node(self, node, value):
         """
         递归删除一个节点
@@ -157,28 +638,24 @@ class BalancePlusTree(Tree):
         """
         if not node:
             return None
-        # 遍历节点值
-        for k, v in enumerate(node.values):
-            # 当前节点为叶子节点且值命中时直接删除掉
-            if node.is_leaf():
-                if value == v:
-                    del node.values[k]
-                    break
-            else:
-                if value <= v:
-                    node.childs[k] = self.__delete_node(node.childs[k], value)
-                    break
-        else:
-            # 当前节点为叶子节点时放弃继续删除，说明在树中不存在
-            if not node.is_leaf():
-                node.childs[-1] = self.__delete_node(node.childs[-1], value)
-
-        # 1、判定当前节点是否因删除节点导致节点阶数小于限制的阶数,若小于则触发修复动作
-        # print('修复前：当前node：{},孩子节点数量：{}'.format(node.values, node.childs))
-        for k, child in enumerate(node.childs):
-            if len(child.values) < math.ceil(self._m/2)-1:
-                self._fill_node(node, child, k)
-        # print('修复后：当前node：{},孩子节点数量：{}'.format(node.values, node.childs))
+        k = bisect_left(node.values, value)
+        # 当前节点为叶子节点且值命中时直接删除掉，未命中说明在树中不存在
+        if node.is_leaf():
+            if k < len(node.values) and node.values[k] == value:
+                del node.values[k]
+                del node.datas[k]
+                node.size -= 1
+                self._count -= 1
+            return node
+        count = self._count
+        node.childs[k] = self.__delete_node(node.childs[k], value)
+        # 删除了值时子树大小减一
+        if self._count != count:
+            node.size -= 1
+
+        # 1、判定孩子节点是否因删除节点导致节点阶数小于限制的阶数,若小于则触发修复动作
+        if len(node.childs[k].values) < math.ceil(self._m/2)-1:
+            self._fill_node(node, node.childs[k], k)
         return node
 
     def _fill_node(self, parent, child, k):
@@ -189,6 +666,8 @@ class BalancePlusTree(Tree):
         :param k: 孩子节点所在的下标
         :return:
         """
+        if self._stats is not None:
+            self._count_fill(parent, k)
         # 当前child是parent最后一个孩子时向前找，否则向后找
         if len(parent.childs) > k + 1:
             brother = parent.childs[k + 1]
@@ -196,14 +675,16 @@ class BalancePlusTree(Tree):
             if len(brother.values) > math.ceil(self._m / 2) - 1:
                 # 当前节点为叶子节点时，将兄弟节点的值同时更新到索引节点和当前节点中，否则按照B树的逻辑走
                 if child.is_leaf():
-                    child.add_val(brother.values[0])
+                    child.values.append(brother.values[0])
+                    child.datas.append(brother.datas[0])
                     parent.values[k] = brother.values[0]
+                    del brother.datas[0]
                 else:
-                    child.add_val(parent.values[k])
+                    child.values.append(parent.values[k])
                     parent.values[k] = brother.values[0]
                 del brother.values[0]
                 if not brother.is_leaf():
-                    child.add_child(brother.childs[0])
+                    child.childs.append(brother.childs[0])
                     del brother.childs[0]
 
             else:
@@ -217,17 +698,14 @@ class BalancePlusTree(Tree):
                         child.left.right = brother
                     else:
                         self._leaf_head = brother
-                    for v in child.values:
-                        brother.add_val(v)
+                    brother.values[0:0] = child.values
+                    brother.datas[0:0] = child.datas
                     del parent.values[k]
                     del parent.childs[k]
                 else:
-                    for v in child.values:
-                        brother.add_val(v)
-                    for c in child.childs:
-                        brother.add_child(c)
                     # 添加父节点值
-                    brother.add_val(parent.values[k])
+                    brother.values[0:0] = child.values + [parent.values[k]]
+                    brother.childs[0:0] = child.childs
                     del parent.values[k]
                     del parent.childs[k]
         else:
@@ -235,19 +713,17 @@ class BalancePlusTree(Tree):
             # 当兄弟节点的阶数大于最小限制阶数时，从兄弟节点借一个作为新的父节点，老的父节点下沉到失衡的节点
             if len(brother.values) > math.ceil(self._m / 2) - 1:
                 if child.is_leaf():
-                    # 当要借的节点和索引节点一样时，则应从兄弟节点中再选一个不一样的节点作为索引节点
-                    if parent.values[-1] == brother.values[-1]:
-                        child.add_val(brother.values[-1])
-                        parent.values[-1] = brother.values[-2]
-                    else:
-                        child.add_val(brother.values[-1])
-                        parent.values[-1] = brother.values[-1]
+                    # 借走兄弟节点的最大值后，索引节点应更新为兄弟节点新的最大值
+                    child.values.insert(0, brother.values[-1])
+                    child.datas.insert(0, brother.datas[-1])
+                    parent.values[-1] = brother.values[-2]
+                    del brother.datas[-1]
                 else:
-                    child.add_val(parent.values[-1])
+                    child.values.insert(0, parent.values[-1])
                     parent.values[-1] = brother.values[-1]
                 del brother.values[-1]
                 if not brother.is_leaf():
-                    child.add_child(brother.childs[-1])
+                    child.childs.insert(0, brother.childs[-1])
                     del brother.childs[-1]
             else:
                 # 当兄弟节点的阶数小于或等于阶数时，合并两个兄弟节点和父节点
@@ -256,19 +732,57 @@ class BalancePlusTree(Tree):
                     brother.right = child.right
                     if child.right:
                         child.right.left = brother
-                    for v in child.values:
-                        brother.add_val(v)
+                    brother.values.extend(child.values)
+                    brother.datas.extend(child.datas)
                     del parent.values[-1]
                     del parent.childs[k]
                 else:
-                    for v in child.values:
-                        brother.add_val(v)
-                    for c in child.childs:
-                        brother.add_child(c)
                     # 添加父节点值
-                    brother.add_val(parent.values[-1])
+                    brother.values.append(parent.values[-1])
+                    brother.values.extend(child.values)
+                    brother.childs.extend(child.childs)
                     del parent.values[-1]
                     del parent.childs[k]
+        # 借值或合并只在两个兄弟节点之间移动值，父节点的子树大小不变
+        self._resize(child)
+        self._resize(brother)
+
+    def _rank(self, key, inclusive):
+        """
+        根据子树大小自顶向下统计排名，左侧孩子节点整棵子树直接累加
+        :param key: 键
+        :param inclusive: 是否统计等于key的值
+        :return: 小于(或等于)key的值的数量
+        """
+        rank = 0
+        node = self._root
+        while node and not node.is_leaf():
+            k = bisect_left(node.values, key)
+            for child in node.childs[:k]:
+                rank += child.size
+            node = node.childs[k]
+        if node:
+            rank += bisect_right(node.values, key) if inclusive else bisect_left(node.values, key)
+        return rank
+
+    def _select(self, k):
+        """
+        根据子树大小自顶向下查找第k小的值
+        :param k: 下标，0 <= k < len(self)
+        :return: value
+        """
+        node = self._root
+        while node and not node.is_leaf():
+            for child in node.childs:
+                if k < child.size:
+                    node = child
+                    break
+                k -= child.size
+            else:
+                raise IndexError('select index out of range')
+        if node is None or k >= len(node.values):
+            raise IndexError('select index out of range')
+        return node.values[k]
 
 
 if __name__ == '__main__':
@@ -277,10 +791,9 @@ if __name__ == '__main__':
     start = time.time()
     result = [num for num in range(1, 10001)]
     random.seed(1)
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.insert(num)
-        result.remove(num)
     print(time.time()-start)
     start = time.time()
     print(binary_tree.search(1))
@@ -292,12 +805,27 @@ if __name__ == '__main__':
     result = [num for num in range(1, 10001)]
     random.seed(1)
     bar = tqdm.trange(len(mid))
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.delete(num)
-        result.remove(num)
         # print(num)
         # print(binary_tree.mid_order())
         bar.update()
     bar.close()
     print('最终结果：', binary_tree.mid_order())
+
+    # 批量构建
+    start = time.time()
+    bulk_tree = BalancePlusTree.from_sorted(range(1, 10001), m=3)
+    print('批量构建：', time.time() - start)
+    print(bulk_tree.search(100))
+
+    # 范围查询
+    print('范围扫描：', list(bulk_tree.range(100, 110)))
+    print('降序扫描：', list(bulk_tree.range(100, 110, reverse=True)))
+    print('区间数量：', bulk_tree.count_range(100, 2000))
+    print('最小值：{}，最大值：{}'.format(bulk_tree.min(), bulk_tree.max()))
+
+    # 键值对
+    bulk_tree.put(100, 'record-100')
+    print('关联数据：', bulk_tree[100], bulk_tree.get(10001, 'missing'))
@@ -0,0 +1,540 @@
+from tree.base_tree import Tree, BNode
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+import importlib
+import os
+import tempfile
+import threading
+import time
+import random
+
+# b+_tree不是合法的标识符，只能通过importlib导入
+BalancePlusTree = importlib.import_module('tree.b+_tree.balance_plus_tree').BalancePlusTree
+
+
+class Latch:
+    """
+    节点读写锁，允许多个读线程或一个写线程同时持有
+    有写线程等待时新的读线程也需等待，避免写线程饥饿；不可重入
+    """
+    __slots__ = ('_cond', '_readers', '_writer', '_waiting')
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class LatchNode(BNode):
+    """
+    带读写锁的B+树节点对象
+        latch:节点的读写锁
+    """
+    __slots__ = ('latch',)
+
+    def __init__(self):
+        super(LatchNode, self).__init__()
+        self.latch = Latch()
+
+
+class ConcurrentBalancePlusTree(Tree):
+    """
+    线程安全的B+树，多个线程可以并发地插入、删除、查询和范围扫描
+    1、每个节点带有读写锁，下降时先获取孩子节点的锁再释放父节点的锁(latch crabbing)，最多同时持有两层节点的锁
+    2、插入和删除先对索引节点加读锁乐观下降，只对叶子节点加写锁；叶子节点已满时以写锁重新下降
+    3、以写锁下降时自顶向下预先拆分：遇到满节点立即拆分，父节点一定不满，拆分不会再向上传递，父节点的锁可以马上释放
+    4、删除采用惰性删除，只从叶子节点中移除值，不做借值与合并，节点只会向右拆分
+    节点不维护子树大小，rank/select/count_between沿叶子节点链表逐个计数，耗时与左侧的值的数量成正比；
+    有并发写入时结果与range一样只保证每个叶子节点内部一致；多线程下运行统计的计数器为近似值
+    """
+    def __init__(self, m=5):
+        """
+        :param m: 阶数，节点最多保存m-1个值，预先拆分要求满节点拆分后两侧都不为空，因此m至少为4
+        """
+        if m < 4:
+            raise ValueError('m must be at least 4')
+        self._m = m
+        self._root = LatchNode()
+        self._leaf_head = self._root
+        self._count = 0
+        # 保护根节点的替换
+        self._root_latch = Latch()
+        self._count_lock = threading.Lock()
+
+    def _add_count(self, delta):
+        with self._count_lock:
+            self._count += delta
+
+    def _is_full(self, node):
+        """节点已满时再插入一个值(或孩子节点)就会溢出"""
+        return len(node.values) >= self._m - 1
+
+    def _find_leaf(self, value, write=False):
+        """
+        对索引节点加读锁逐层下降到叶子节点，持有孩子节点的锁之后才释放父节点的锁
+        叶子节点不会变为索引节点，因此加锁前就可以判定孩子节点是否为叶子节点
+        :param value: 值
+        :param write: 为True时对叶子节点加写锁，否则加读锁
+        :return: 已加锁的叶子节点
+        """
+        self._root_latch.acquire_read()
+        node = self._root
+        if write and node.is_leaf():
+            node.latch.acquire_write()
+        else:
+            node.latch.acquire_read()
+        self._root_latch.release_read()
+        while not node.is_leaf():
+            try:
+                child = node.childs[bisect_left(node.values, value)]
+            except BaseException:
+                node.latch.release_read()
+                raise
+            if write and child.is_leaf():
+                child.latch.acquire_write()
+            else:
+                child.latch.acquire_read()
+            node.latch.release_read()
+            node = child
+        return node
+
+    def _insert(self, value, data=None):
+        """
+        插入一个值，叶子节点未满时只需乐观下降，否则以写锁重新下降并预先拆分
+        :param value: 值
+        :param data: 关联的数据
+        """
+        leaf = self._find_leaf(value, write=True)
+        try:
+            if self._put_leaf(leaf, value, data):
+                return
+        finally:
+            leaf.latch.release_write()
+        self._insert_split(value, data)
+
+    def _put_leaf(self, leaf, value, data):
+        """
+        向持有写锁的叶子节点中放置一个值
+        :return: 值已存在或叶子节点未满时放置并返回True，叶子节点已满时返回False
+        """
+        values = leaf.values
+        k = bisect_left(values, value)
+        if k < len(values) and values[k] == value:
+            leaf.datas[k] = data
+            return True
+        if self._is_full(leaf):
+            return False
+        values.insert(k, value)
+        leaf.datas.insert(k, data)
+        self._add_count(1)
+        return True
+
+    def _insert_split(self, value, data):
+        """
+        以写锁自顶向下下降，沿途拆分满节点，到达叶子节点时一定有空位
+        :param value: 值
+        :param data: 关联的数据
+        """
+        root_latch = self._root_latch
+        root_latch.acquire_write()
+        try:
+            node = self._root
+            node.latch.acquire_write()
+            if self._is_full(node):
+                # 新的根节点在发布前其他线程不可见
+                root = LatchNode()
+                root.childs = [node]
+                root.latch.acquire_write()
+                self._split(root, 0)
+                node.latch.release_write()
+                self._root = node = root
+        finally:
+            root_latch.release_write()
+        try:
+            while not node.is_leaf():
+                k = bisect_left(node.values, value)
+                child = node.childs[k]
+                child.latch.acquire_write()
+                if self._is_full(child):
+                    self._split(node, k)
+                    if value > node.values[k]:
+                        child.latch.release_write()
+                        child = node.childs[k + 1]
+                        child.latch.acquire_write()
+                # 孩子节点不满，之后的拆分不会影响父节点
+                node.latch.release_write()
+                node = child
+            self._put_leaf(node, value, data)
+        finally:
+            node.latch.release_write()
+
+    def _split(self, parent, k):
+        """
+        拆分孩子节点，调用方持有父节点和孩子节点的写锁，且父节点未满
+        新的右侧节点只能通过父节点和孩子节点访问到，因此不需要加锁
+        :param parent: 父节点
+        :param k: 孩子节点的下标
+        """
+        if self._stats is not None:
+            self._stats.splits += 1
+        child = parent.childs[k]
+        values = child.values
+        right = LatchNode()
+        if child.is_leaf():
+            # 中间值保留在左侧叶子节点中，作为左侧叶子节点的最大值上升
+            mid = (len(values) - 1) // 2
+            separator = values[mid]
+            right.values = values[mid + 1:]
+            right.datas = child.datas[mid + 1:]
+            del values[mid + 1:]
+            del child.datas[mid + 1:]
+            # 先链接右侧节点再发布，向右扫描的线程不会看到不完整的链表
+            right.right = child.right
+            child.right = right
+        else:
+            mid = len(values) // 2
+            separator = values[mid]
+            right.values = values[mid + 1:]
+            right.childs = child.childs[mid + 1:]
+            del values[mid:]
+            del child.childs[mid + 1:]
+        parent.values.insert(k, separator)
+        parent.childs.insert(k + 1, right)
+
+    def _delete(self, value):
+        """
+        惰性删除一个值，只从叶子节点中移除，不做借值与合并
+        :param value: 值
+        """
+        leaf = self._find_leaf(value, write=True)
+        try:
+            values = leaf.values
+            k = bisect_left(values, value)
+            if k < len(values) and values[k] == value:
+                del values[k]
+                del leaf.datas[k]
+                self._add_count(-1)
+        finally:
+            leaf.latch.release_write()
+
+    def _search(self, value):
+        """
+        查询一个值
+        :param value: 值
+        :return: value，不存在时返回None
+        """
+        leaf = self._find_leaf(value)
+        try:
+            values = leaf.values
+            k = bisect_left(values, value)
+            if k < len(values) and values[k] == value:
+                return values[k]
+        finally:
+            leaf.latch.release_read()
+        return None
+
+    def _search_sorted(self, probes):
+        """
+        有序的探测键逐个叶子节点处理：在叶子节点的读锁内消费所有不大于其最大值的探测键，
+        持有读锁期间叶子节点不会被拆分，这些键如果存在一定在该叶子节点中；剩余的键重新下降
+        :param probes: 有序的探测键列表
+        :return: 与probes并列的_search结果列表
+        """
+        result = [None] * len(probes)
+        n = len(probes)
+        i = 0
+        while i < n:
+            leaf = self._find_leaf(probes[i])
+            try:
+                values = leaf.values
+                # 叶子节点为空或最大值小于探测键时，该键不存在
+                j = bisect_right(probes, values[-1], i) if values else i
+                j = max(j, i + 1)
+                k = 0
+                for p in range(i, j):
+                    k = bisect_left(values, probes[p], k)
+                    if k < len(values) and values[k] == probes[p]:
+                        result[p] = values[k]
+            finally:
+                leaf.latch.release_read()
+            i = j
+        return result
+
+    def _get(self, key, default):
+        """
+        查询键关联的数据
+        :param key: 键
+        :param default: 键不存在时返回的默认值
+        :return: 关联的数据
+        """
+        leaf = self._find_leaf(key)
+        try:
+            values = leaf.values
+            k = bisect_left(values, key)
+            if k < len(values) and values[k] == key:
+                return leaf.datas[k]
+        finally:
+            leaf.latch.release_read()
+        return default
+
+    def range(self, lo=None, hi=None):
+        """
+        升序范围扫描，返回闭区间[lo, hi]内的值
+        每个叶子节点在读锁内复制出区间内的值，释放锁之后再返回，yield期间不持有任何锁
+        节点只会向右拆分，拆分出的节点位于原节点与其右侧节点之间，只包含已经扫描过的值或扫描开始后插入的值，
+        因此沿链表向右移动不会遗漏或重复返回扫描开始前已存在的值
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :return: 生成器
+        """
+        if lo is None:
+            leaf = self._leaf_head
+            leaf.latch.acquire_read()
+        else:
+            leaf = self._find_leaf(lo)
+        while True:
+            try:
+                values = leaf.values
+                start = 0 if lo is None else bisect_left(values, lo)
+                end = len(values) if hi is None else bisect_right(values, hi)
+                chunk = values[start:end]
+                right = leaf.right if end == len(values) else None
+            finally:
+                leaf.latch.release_read()
+            for value in chunk:
+                yield value
+            if right is None:
+                return
+            leaf = right
+            leaf.latch.acquire_read()
+
+    def seek(self, value=None):
+        """
+        游标，升序返回第一个大于或等于value的值开始的所有值
+        :param value: 起始值，为None时从头开始
+        :return: 生成器
+        """
+        return self.range(value)
+
+    def min(self):
+        """
+        最小值
+        :return: value，树为空时返回None
+        """
+        for value in self.range():
+            return value
+        return None
+
+    def iter_in_order(self):
+        """
+        中序遍历生成器，沿叶子节点链表按升序返回值
+        :return: 生成器
+        """
+        return self.range()
+
+    def __iter__(self):
+        return self.range()
+
+    def __reversed__(self):
+        """叶子节点只维护向右的链表，降序遍历需要先完成一次升序扫描"""
+        return reversed(list(self.range()))
+
+    def _mid_order(self, node, result):
+        """B+树中序遍历"""
+        result.extend(self.range())
+        return result
+
+    def _rank(self, key, inclusive):
+        """
+        节点不保存子树大小，沿叶子节点链表累加左侧叶子节点的值的数量
+        每个叶子节点在读锁内计数，释放锁之后再移动到右侧节点，有并发写入时与range的一致性相同
+        :param key: 键
+        :param inclusive: 是否统计等于key的值
+        :return: 小于(或等于)key的值的数量
+        """
+        rank = 0
+        leaf = self._leaf_head
+        leaf.latch.acquire_read()
+        while True:
+            try:
+                values = leaf.values
+                k = bisect_right(values, key) if inclusive else bisect_left(values, key)
+                rank += k
+                right = leaf.right if k == len(values) else None
+            finally:
+                leaf.latch.release_read()
+            if right is None:
+                return rank
+            leaf = right
+            leaf.latch.acquire_read()
+
+    def _select(self, k):
+        """
+        节点不保存子树大小，沿叶子节点链表跳过整个叶子节点查找第k小的值
+        :param k: 下标，0 <= k < len(self)
+        :return: value
+        """
+        leaf = self._leaf_head
+        while leaf is not None:
+            leaf.latch.acquire_read()
+            try:
+                values = leaf.values
+                if k < len(values):
+                    return values[k]
+                k -= len(values)
+                right = leaf.right
+            finally:
+                leaf.latch.release_read()
+            leaf = right
+        # 有并发删除时，检查下标之后树可能变小
+        raise IndexError('select index out of range')
+
+    def dump(self, path):
+        """
+        先逐个叶子节点复制出全部(值, 关联的数据)再写入，值的数量以复制的结果为准
+        有并发写入时，每个叶子节点内部是一致的，整体与range的语义相同
+        :param path: 文件路径
+        """
+        pairs = list(self._dump_items())
+        self._write_dump(path, len(pairs), pairs)
+
+    def _dump_params(self):
+        return {'m': self._m}
+
+    def _dump_items(self):
+        """沿叶子节点链表按升序返回(值, 关联的数据)，每个叶子节点在读锁内复制，yield期间不持有任何锁"""
+        leaf = self._leaf_head
+        while leaf is not None:
+            leaf.latch.acquire_read()
+            try:
+                chunk = list(zip(leaf.values, leaf.datas))
+                right = leaf.right
+            finally:
+                leaf.latch.release_read()
+            for item in chunk:
+                yield item
+            leaf = right
+
+    def _dump_meta(self):
+        """索引节点可以由叶子节点重新生成，不需要结构元数据"""
+        return b''
+
+    def _load_state(self, pairs, meta):
+        """
+        自底向上批量构建，叶子节点装满m-1个值，索引值为左侧子树的最大值，与插入时拆分上升的值一致
+        加载完成之前树对其他线程不可见，因此不需要加锁
+        :param pairs: 按升序排列的(值, 关联的数据)列表
+        :param meta: 结构元数据，不使用
+        """
+        m = self._m
+        leafs = []
+        for items in BalancePlusTree._group(pairs, m - 1, 1, m - 1):
+            leaf = LatchNode()
+            leaf.values = [value for value, data in items]
+            leaf.datas = [data for value, data in items]
+            if leafs:
+                leafs[-1].right = leaf
+            leafs.append(leaf)
+        self._count = len(pairs)
+        if not leafs:
+            return
+        self._leaf_head = leafs[0]
+        level = [(leaf, leaf.values[-1]) for leaf in leafs]
+        while len(level) > 1:
+            upper = []
+            for group in BalancePlusTree._group(level, m, 2, m):
+                node = LatchNode()
+                node.values = [max_value for child, max_value in group[:-1]]
+                node.childs = [child for child, max_value in group]
+                upper.append((node, group[-1][1]))
+            level = upper
+        self._root = level[0][0]
+
+    def _children(self, node):
+        """B+树节点的孩子节点，前序/后序遍历不加锁，只能在没有并发写入时使用"""
+        return node.childs
+
+    def _node_capacity(self):
+        return self._m - 1
+
+    def _count_visits(self, value):
+        """
+        查询value时访问的节点数量，所有叶子节点深度相同，即为树的高度
+        沿最左侧下降不需要加锁：索引节点的孩子节点列表不会为空，叶子节点也不会变为索引节点
+        """
+        visits = 1
+        node = self._root
+        while not node.is_leaf():
+            visits += 1
+            node = node.childs[0]
+        return visits
+
+
+if __name__ == '__main__':
+    tree = ConcurrentBalancePlusTree(m=16)
+    nums = list(range(1, 100001))
+    random.seed(1)
+    random.shuffle(nums)
+    chunks = [nums[i::8] for i in range(8)]
+
+    def ingest(chunk):
+        for num in chunk:
+            tree.put(num, num * 10)
+
+    def scan():
+        # 扫描期间有并发写入，每次扫描的结果都必须有序
+        scans = 0
+        while len(tree) < len(nums):
+            result = list(tree.range(1000, 2000))
+            assert result == sorted(result)
+            scans += 1
+        return scans
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        scanners = [pool.submit(scan) for _ in range(2)]
+        for future in [pool.submit(ingest, chunk) for chunk in chunks]:
+            future.result()
+        print('并发扫描次数：', [future.result() for future in scanners])
+    print('8线程插入：', time.time() - start)
+    assert len(tree) == len(nums)
+    assert list(tree) == list(range(1, 100001))
+    print(tree.search(100), tree[100], list(tree.range(100, 110)))
+
+    # 并发删除与查询
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda chunk: [tree.delete(num) for num in chunk if num % 2], chunks))
+    print('删除后：', len(tree), tree.min(), list(tree.range(1, 10)))
+
+    # 保存与加载
+    path = os.path.join(tempfile.mkdtemp(), 'tree.dump')
+    tree.dump(path)
+    loaded = ConcurrentBalancePlusTree.load(path)
+    assert list(loaded) == list(tree) and loaded[100] == 1000
+    print('加载后：', len(loaded), loaded.freeze().search(100))
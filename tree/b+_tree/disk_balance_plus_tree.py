@@ -0,0 +1,739 @@
+from tree.base_tree import Tree
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+import importlib
+import os
+import struct
+import tempfile
+import time
+import random
+
+# b+_tree不是合法的标识符，只能通过importlib导入
+BalancePlusTree = importlib.import_module('tree.b+_tree.balance_plus_tree').BalancePlusTree
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+def _check_int64(value, name='value'):
+    """
+    检查能否以int64保存在页中，页只在淘汰或写回时才编码，必须在修改任何页之前检查，否则错误会延迟到写回时才出现
+    :param value: 值
+    :param name: 错误信息中的名称
+    """
+    if not isinstance(value, int):
+        raise TypeError('{} must be an int, got {}'.format(name, type(value).__name__))
+    if not _INT64_MIN <= value <= _INT64_MAX:
+        raise OverflowError('{} {} is out of int64 range'.format(name, value))
+
+
+class DiskNode:
+    """
+    磁盘B+树节点对象，每个节点对应文件中一个固定大小的页
+        page_id:页号，0号页为超级块，因此0同时表示空页
+        leaf:是否为叶子节点
+        values:有序的值列表(int64)
+        datas:与values并列的关联数据列表(int64或None，只有叶子节点保存)
+        childs:孩子节点的页号列表
+        left:左侧叶子节点的页号
+        right:右侧叶子节点的页号
+    """
+    __slots__ = ('page_id', 'leaf', 'values', 'datas', 'childs', 'left', 'right')
+
+    def __init__(self, page_id, leaf):
+        self.page_id = page_id
+        self.leaf = leaf
+        self.values = []
+        self.datas = []
+        self.childs = []
+        self.left = 0
+        self.right = 0
+
+    def is_leaf(self):
+        return self.leaf
+
+    def __str__(self):
+        return str(self.values)
+
+    def __repr__(self):
+        return str(self.values)
+
+
+class Pager:
+    """
+    页管理器，负责页的编解码、读写和LRU缓冲池
+    页格式：是否为叶子节点(1字节)、填充(1字节)、值的数量(2字节)、左右叶子节点页号(各8字节)，
+    之后是值列表，叶子节点再跟关联数据列表，索引节点再跟孩子节点页号列表，均为小端int64；
+    叶子节点最后是空值位图，每个值占1位，关联的数据为None时置1，对应的关联数据保存为0
+    超级块位于0号页：魔数、页大小、阶数、根节点页号、叶子节点链表头页号、值的数量、页数量
+    """
+    SUPER = struct.Struct('<8sIIqqqq')
+    HEADER = struct.Struct('<?xHqq')
+    MAGIC = b'BPTREE02'
+
+    def __init__(self, path, page_size=4096, pool_size=256):
+        """
+        :param path: 文件路径，不存在时创建
+        :param page_size: 页大小，打开已有文件时以超级块中记录的为准
+        :param pool_size: 缓冲池最多缓存的页数量
+        """
+        if pool_size < 1:
+            raise ValueError('pool_size must be positive')
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.page_size = page_size
+        self.pool_size = pool_size
+        self.page_count = 1
+        self._pool = OrderedDict()
+        self._dirty = set()
+        # 统计读写的页数量
+        self.reads = 0
+        self.writes = 0
+        meta = self.read_super()
+        if meta:
+            self.page_size = meta[0]
+            self.page_count = meta[-1]
+
+    @classmethod
+    def max_order(cls, page_size):
+        """
+        页能容纳的最大阶数，索引节点最多保存m-1个值和m个孩子节点页号，
+        叶子节点最多保存m-1个值、m-1个关联数据和空值位图
+        :param page_size: 页大小
+        :return: 阶数
+        """
+        m = (page_size - cls.HEADER.size + 8) // 16
+        while cls.HEADER.size + 16 * (m - 1) + (m + 6) // 8 > page_size:
+            m -= 1
+        return m
+
+    def read_super(self):
+        """
+        读取超级块
+        :return: (页大小, 阶数, 根节点页号, 叶子节点链表头页号, 值的数量, 页数量)，新文件返回None
+        """
+        raw = os.pread(self._fd, self.SUPER.size, 0)
+        if len(raw) < self.SUPER.size:
+            return None
+        magic, page_size, m, root, leaf_head, count, page_count = self.SUPER.unpack(raw)
+        if magic != self.MAGIC:
+            raise ValueError('not a disk b+ tree file')
+        return page_size, m, root, leaf_head, count, page_count
+
+    def write_super(self, m, root, leaf_head, count):
+        """写入超级块"""
+        buf = bytearray(self.page_size)
+        self.SUPER.pack_into(buf, 0, self.MAGIC, self.page_size, m, root, leaf_head, count, self.page_count)
+        os.pwrite(self._fd, buf, 0)
+
+    def allocate(self, leaf):
+        """
+        在文件末尾分配一个新页，新页放入缓冲池并标记为脏页
+        :param leaf: 是否为叶子节点
+        :return: DiskNode对象
+        """
+        node = DiskNode(self.page_count, leaf)
+        self.page_count += 1
+        self.mark_dirty(node)
+        return node
+
+    def get(self, page_id):
+        """
+        获取一个页，缓冲池未命中时从文件读取
+        :param page_id: 页号
+        :return: DiskNode对象
+        """
+        node = self._pool.get(page_id)
+        if node is not None:
+            self._pool.move_to_end(page_id)
+            return node
+        node = self._decode(page_id, os.pread(self._fd, self.page_size, page_id * self.page_size))
+        self.reads += 1
+        self._pool[page_id] = node
+        return node
+
+    def mark_dirty(self, node):
+        """标记脏页，已被淘汰的页重新放回缓冲池"""
+        self._pool[node.page_id] = node
+        self._pool.move_to_end(node.page_id)
+        self._dirty.add(node.page_id)
+
+    def evict(self):
+        """
+        按LRU淘汰超出缓冲池大小的页，脏页淘汰前写回
+        淘汰只在每次操作结束后进行，保证操作过程中持有的节点不会被淘汰后重复加载
+        """
+        pool = self._pool
+        while len(pool) > self.pool_size:
+            page_id, node = pool.popitem(last=False)
+            if page_id in self._dirty:
+                self._write(node)
+                self._dirty.discard(page_id)
+
+    def flush(self):
+        """写回全部脏页"""
+        for page_id in sorted(self._dirty):
+            self._write(self._pool[page_id])
+        self._dirty.clear()
+
+    def sync(self):
+        os.fsync(self._fd)
+
+    def close(self):
+        os.close(self._fd)
+
+    def _write(self, node):
+        os.pwrite(self._fd, self._encode(node), node.page_id * self.page_size)
+        self.writes += 1
+
+    def _encode(self, node):
+        """将节点编码为页"""
+        n = len(node.values)
+        buf = bytearray(self.page_size)
+        offset = self.HEADER.size
+        self.HEADER.pack_into(buf, 0, node.leaf, n, node.left, node.right)
+        struct.pack_into('<%dq' % n, buf, offset, *node.values)
+        offset += 8 * n
+        if node.leaf:
+            datas = node.datas
+            struct.pack_into('<%dq' % n, buf, offset, *[0 if data is None else data for data in datas])
+            offset += 8 * n
+            nulls = 0
+            for i, data in enumerate(datas):
+                if data is None:
+                    nulls |= 1 << i
+            buf[offset:offset + (n + 7) // 8] = nulls.to_bytes((n + 7) // 8, 'little')
+        else:
+            struct.pack_into('<%dq' % (n + 1), buf, offset, *node.childs)
+        return buf
+
+    def _decode(self, page_id, buf):
+        """将页解码为节点"""
+        leaf, n, left, right = self.HEADER.unpack_from(buf, 0)
+        offset = self.HEADER.size
+        node = DiskNode(page_id, leaf)
+        node.left, node.right = left, right
+        node.values = list(struct.unpack_from('<%dq' % n, buf, offset))
+        offset += 8 * n
+        if leaf:
+            datas = list(struct.unpack_from('<%dq' % n, buf, offset))
+            offset += 8 * n
+            nulls = int.from_bytes(buf[offset:offset + (n + 7) // 8], 'little')
+            if nulls:
+                datas = [None if nulls >> i & 1 else data for i, data in enumerate(datas)]
+            node.datas = datas
+        else:
+            node.childs = list(struct.unpack_from('<%dq' % (n + 1), buf, offset))
+        return node
+
+
+class DiskBalancePlusTree(Tree):
+    """
+    基于页的磁盘B+树，值只支持int64，关联数据只支持int64或None
+    每个节点对应文件中一个固定大小的页，通过LRU缓冲池访问，脏页在淘汰或flush时写回
+    删除采用惰性删除，只从叶子节点中移除值，不做借值与合并：删空的叶子节点仍留在链表和索引中，
+    页也不会回收，文件大小只增不减，大量删除后需要通过dump/load或from_sorted重建来收缩文件
+    """
+    def __init__(self, path, m=None, page_size=4096, pool_size=256):
+        """
+        :param path: 文件路径，已存在时打开已有的树
+        :param m: 阶数，为None时取页能容纳的最大阶数，打开已有文件时以超级块中记录的为准
+        :param page_size: 页大小
+        :param pool_size: 缓冲池最多缓存的页数量
+        """
+        self._pager = Pager(path, page_size, pool_size)
+        meta = self._pager.read_super()
+        if meta:
+            page_size, self._m, self._root, self._leaf_head, self._count, page_count = meta
+            return
+        max_m = Pager.max_order(page_size)
+        if m is None:
+            m = max_m
+        if not 3 <= m <= max_m:
+            raise ValueError('m must be in [3, {}] for page_size {}'.format(max_m, page_size))
+        self._m = m
+        self._count = 0
+        root = self._pager.allocate(True)
+        self._root = self._leaf_head = root.page_id
+        self.flush()
+
+    @classmethod
+    def from_sorted(cls, path, iterable, m=None, fill_factor=1.0, with_data=False, page_size=4096, pool_size=256):
+        """
+        根据有序序列自底向上批量构建磁盘B+树，叶子节点按顺序分配在连续的页中
+        :param path: 文件路径，必须是新文件或空树
+        :param iterable: 递增的值序列，可以是生成器，重复值会被忽略
+        :param fill_factor: 节点填充率，取值范围(0, 1]
+        :param with_data: 为True时iterable中的元素为(值, 关联的数据)
+        :return: DiskBalancePlusTree对象
+        """
+        if not 0 < fill_factor <= 1:
+            raise ValueError('fill_factor must be in (0, 1]')
+        tree = cls(path, m=m, page_size=page_size, pool_size=pool_size)
+        if tree._count or tree._root != tree._leaf_head:
+            raise ValueError('from_sorted requires an empty tree')
+        pager, m = tree._pager, tree._m
+        min_values = max((m + 1) // 2 - 1, 1)
+        leaf_size = min(max(int((m - 1) * fill_factor), min_values), m - 1)
+        # 空树的根节点即为第一个叶子节点，之后的叶子节点依次分配
+        level = []
+        prev = None
+        items_iter = BalancePlusTree._check_sorted(iterable, with_data)
+        for items in BalancePlusTree._group(items_iter, leaf_size, min_values, m - 1):
+            for value, data in items:
+                _check_int64(value)
+                if data is not None:
+                    _check_int64(data, 'data')
+            leaf = pager.allocate(True) if prev else pager.get(tree._root)
+            leaf.values = [value for value, data in items]
+            leaf.datas = [data for value, data in items]
+            if prev:
+                prev.right = leaf.page_id
+                leaf.left = prev.page_id
+                pager.mark_dirty(prev)
+            pager.mark_dirty(leaf)
+            prev = leaf
+            level.append((leaf.page_id, leaf.values[-1]))
+            tree._count += len(items)
+            pager.evict()
+        min_childs = max((m + 1) // 2, 2)
+        child_size = min(max(int(m * fill_factor), min_childs), m)
+        while len(level) > 1:
+            upper = []
+            for group in BalancePlusTree._group(level, child_size, min_childs, m):
+                node = pager.allocate(False)
+                node.values = [max_value for page_id, max_value in group[:-1]]
+                node.childs = [page_id for page_id, max_value in group]
+                upper.append((node.page_id, group[-1][1]))
+                pager.evict()
+            level = upper
+        if level:
+            tree._root = level[0][0]
+        tree.flush()
+        return tree
+
+    @classmethod
+    def load(cls, path, target, pool_size=256):
+        """
+        读取dump保存的文件，批量构建到新的磁盘文件中
+        :param path: dump文件路径
+        :param target: 磁盘B+树的文件路径
+        :param pool_size: 缓冲池最多缓存的页数量
+        :return: DiskBalancePlusTree对象
+        """
+        params, pairs, meta = cls._read_dump(path)
+        return cls.from_sorted(target, pairs, m=params['m'], with_data=True,
+                               page_size=params['page_size'], pool_size=pool_size)
+
+    def _dump_params(self):
+        return {'m': self._m, 'page_size': self._pager.page_size}
+
+    def _dump_items(self):
+        """沿叶子节点的页号链表按升序返回(值, 关联的数据)"""
+        pager = self._pager
+        page_id = self._leaf_head
+        while page_id:
+            leaf = pager.get(page_id)
+            for item in zip(leaf.values, leaf.datas):
+                yield item
+            page_id = leaf.right
+            pager.evict()
+
+    def _dump_meta(self):
+        return b''
+
+    def flush(self):
+        """写回全部脏页和超级块，并同步到磁盘"""
+        self._pager.flush()
+        self._pager.write_super(self._m, self._root, self._leaf_head, self._count)
+        self._pager.sync()
+
+    def close(self):
+        """写回后关闭文件"""
+        self.flush()
+        self._pager.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _insert(self, value: int, data=None):
+        """
+        插入一个值，自顶向下记录路径，叶子节点溢出时自底向上拆分
+        :param value: 值
+        :param data: 关联的数据
+        :return: value
+        """
+        _check_int64(value)
+        if data is not None:
+            _check_int64(data, 'data')
+        pager = self._pager
+        path = []
+        node = pager.get(self._root)
+        while not node.leaf:
+            k = bisect_left(node.values, value)
+            path.append((node, k))
+            node = pager.get(node.childs[k])
+        k = bisect_left(node.values, value)
+        if k < len(node.values) and node.values[k] == value:
+            node.datas[k] = data
+            pager.mark_dirty(node)
+        else:
+            node.values.insert(k, value)
+            node.datas.insert(k, data)
+            pager.mark_dirty(node)
+            self._count += 1
+            # 节点满阶时拆分，中间值上升到父节点，父节点满阶时继续向上拆分
+            while len(node.values) >= self._m:
+                right, separator = self._split(node)
+                if not path:
+                    root = pager.allocate(False)
+                    root.values = [separator]
+                    root.childs = [node.page_id, right.page_id]
+                    self._root = root.page_id
+                    break
+                node, k = path.pop()
+                node.values.insert(k, separator)
+                node.childs.insert(k + 1, right.page_id)
+                pager.mark_dirty(node)
+        pager.evict()
+
+    def _split(self, node):
+        """
+        拆分节点，叶子节点只上浮关键字，中间值保留在叶子节点中
+        :param node: 当前拆分节点
+        :return: (右侧兄弟节点, 上升到父节点的值)
+        """
+        if self._stats is not None:
+            self._stats.splits += 1
+        pager = self._pager
+        mid = len(node.values) // 2
+        separator = node.values[mid]
+        right = pager.allocate(node.leaf)
+        right.values = node.values[mid+1:]
+        if node.leaf:
+            right.datas = node.datas[mid+1:]
+            del node.values[mid+1:]
+            del node.datas[mid+1:]
+            # 维护叶子节点的左右关系
+            right.left = node.page_id
+            right.right = node.right
+            if node.right:
+                neighbour = pager.get(node.right)
+                neighbour.left = right.page_id
+                pager.mark_dirty(neighbour)
+            node.right = right.page_id
+        else:
+            right.childs = node.childs[mid+1:]
+            del node.values[mid:]
+            del node.childs[mid+1:]
+        pager.mark_dirty(node)
+        return right, separator
+
+    def _find_leaf(self, value):
+        """
+        从根节点下降到值所在(或应插入)的叶子节点
+        :param value: 值
+        :return: 叶子节点
+        """
+        pager = self._pager
+        node = pager.get(self._root)
+        while not node.leaf:
+            node = pager.get(node.childs[bisect_left(node.values, value)])
+        return node
+
+    def _last_leaf(self):
+        """获取最右侧的叶子节点"""
+        pager = self._pager
+        node = pager.get(self._root)
+        while not node.leaf:
+            node = pager.get(node.childs[-1])
+        return node
+
+    def _search(self, value: int):
+        """
+        查询一个节点
+        :param value:值
+        :return: value
+        """
+        leaf = self._find_leaf(value)
+        k = bisect_left(leaf.values, value)
+        self._pager.evict()
+        if k < len(leaf.values) and leaf.values[k] == value:
+            return value
+        return None
+
+    def _search_sorted(self, probes):
+        """
+        与叶子节点链表做归并，右侧相邻的叶子节点直接按页号读取，否则重新从根节点下降
+        惰性删除可能留下空的叶子节点，因此下降到的叶子节点总是消费至少一个探测键
+        每处理完一个叶子节点淘汰一次缓冲池，批次再大缓冲池也不会超出太多
+        :param probes: 有序的探测键列表
+        :return: 与probes并列的_search结果列表
+        """
+        pager = self._pager
+        result = [None] * len(probes)
+        n = len(probes)
+        i = 0
+        leaf, descended = self._find_leaf(probes[0]), True
+        while i < n:
+            values = leaf.values
+            j = bisect_right(probes, values[-1], i) if values else i
+            if descended:
+                j = max(j, i + 1)
+            k = 0
+            for p in range(i, j):
+                k = bisect_left(values, probes[p], k)
+                if k < len(values) and values[k] == probes[p]:
+                    result[p] = probes[p]
+            i = j
+            if i == n or not leaf.right:
+                break
+            pager.evict()
+            right = pager.get(leaf.right)
+            if right.values and probes[i] <= right.values[-1]:
+                leaf, descended = right, False
+            else:
+                leaf, descended = self._find_leaf(probes[i]), True
+        pager.evict()
+        return result
+
+    def _get(self, key, default):
+        """
+        查询键关联的数据
+        :param key: 键
+        :param default: 键不存在时返回的默认值
+        :return: 关联的数据
+        """
+        leaf = self._find_leaf(key)
+        k = bisect_left(leaf.values, key)
+        self._pager.evict()
+        if k < len(leaf.values) and leaf.values[k] == key:
+            return leaf.datas[k]
+        return default
+
+    def _delete(self, value: int):
+        """
+        惰性删除一个值，只从叶子节点中移除，不做借值与合并，叶子节点为空时仍保留在链表中
+        :param value:值
+        :return: value
+        """
+        leaf = self._find_leaf(value)
+        k = bisect_left(leaf.values, value)
+        if k < len(leaf.values) and leaf.values[k] == value:
+            del leaf.values[k]
+            del leaf.datas[k]
+            self._pager.mark_dirty(leaf)
+            self._count -= 1
+        self._pager.evict()
+
+    def seek(self, value=None, reverse=False):
+        """
+        游标，只从根节点下降一次，之后沿叶子节点的页号链表逐个返回值
+        :param value: 起始值，升序时从第一个大于或等于value的值开始，降序时从最后一个小于或等于value的值开始，为None时从头(尾)开始
+        :param reverse: 是否降序
+        :return: 生成器
+        """
+        pager = self._pager
+        if not reverse:
+            if value is None:
+                leaf, k = pager.get(self._leaf_head), 0
+            else:
+                leaf = self._find_leaf(value)
+                k = bisect_left(leaf.values, value)
+            while True:
+                values = leaf.values
+                for i in range(k, len(values)):
+                    yield values[i]
+                if not leaf.right:
+                    return
+                leaf, k = pager.get(leaf.right), 0
+                pager.evict()
+        else:
+            if value is None:
+                leaf = self._last_leaf()
+                k = len(leaf.values)
+            else:
+                leaf = self._find_leaf(value)
+                k = bisect_right(leaf.values, value)
+            while True:
+                values = leaf.values
+                for i in range(k - 1, -1, -1):
+                    yield values[i]
+                if not leaf.left:
+                    return
+                leaf = pager.get(leaf.left)
+                k = len(leaf.values)
+                pager.evict()
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        范围扫描，返回闭区间[lo, hi]内的值
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :param reverse: 是否降序
+        :return: 生成器
+        """
+        if not reverse:
+            for value in self.seek(lo):
+                if hi is not None and value > hi:
+                    return
+                yield value
+        else:
+            for value in self.seek(hi, reverse=True):
+                if lo is not None and value < lo:
+                    return
+                yield value
+
+    def min(self):
+        """
+        最小值
+        :return: value，树为空时返回None
+        """
+        for value in self.seek():
+            return value
+        return None
+
+    def max(self):
+        """
+        最大值
+        :return: value，树为空时返回None
+        """
+        for value in self.seek(reverse=True):
+            return value
+        return None
+
+    def iter_in_order(self):
+        """
+        中序遍历生成器，沿叶子节点链表按升序返回值
+        :return: 生成器
+        """
+        return self.seek()
+
+    def __iter__(self):
+        return self.seek()
+
+    def __reversed__(self):
+        return self.seek(reverse=True)
+
+    def iter_pre_order(self):
+        """
+        先序遍历生成器，返回DiskNode对象，每返回一个节点按缓冲池大小淘汰一次
+        :return: 生成器
+        """
+        for node in super(DiskBalancePlusTree, self).iter_pre_order():
+            yield node
+            self._pager.evict()
+
+    def iter_post_order(self):
+        """
+        后序遍历生成器，返回DiskNode对象，每返回一个节点按缓冲池大小淘汰一次
+        :return: 生成器
+        """
+        for node in super(DiskBalancePlusTree, self).iter_post_order():
+            yield node
+            self._pager.evict()
+
+    def _rank(self, key, inclusive):
+        """
+        页中不保存子树大小，沿叶子节点链表累加左侧叶子节点的值的数量，读取的页数量与左侧叶子节点数量成正比
+        :param key: 键
+        :param inclusive: 是否统计等于key的值
+        :return: 小于(或等于)key的值的数量
+        """
+        pager = self._pager
+        rank = 0
+        page_id = self._leaf_head
+        while page_id:
+            leaf = pager.get(page_id)
+            values = leaf.values
+            if values and (values[-1] > key or (values[-1] == key and not inclusive)):
+                rank += bisect_right(values, key) if inclusive else bisect_left(values, key)
+                break
+            rank += len(values)
+            page_id = leaf.right
+            pager.evict()
+        pager.evict()
+        return rank
+
+    def _select(self, k):
+        """
+        页中不保存子树大小，沿叶子节点链表跳过整页查找第k小的值
+        :param k: 下标，0 <= k < len(self)
+        :return: value
+        """
+        pager = self._pager
+        page_id = self._leaf_head
+        while page_id:
+            leaf = pager.get(page_id)
+            if k < len(leaf.values):
+                pager.evict()
+                return leaf.values[k]
+            k -= len(leaf.values)
+            page_id = leaf.right
+            pager.evict()
+        raise IndexError('select index out of range')
+
+    def _mid_order(self, node, result):
+        """B+树中序遍历"""
+        result.extend(self.seek())
+        return result
+
+    def _children(self, node):
+        """B+树节点的孩子节点"""
+        return [self._pager.get(page_id) for page_id in node.childs]
+
+    def _root_node(self):
+        return self._pager.get(self._root)
+
+    def _node_capacity(self):
+        return self._m - 1
+
+    def _structure_stats(self):
+        """按层遍历会读取全部页，结束后按缓冲池大小淘汰"""
+        result = super(DiskBalancePlusTree, self)._structure_stats()
+        self._pager.evict()
+        return result
+
+    def _count_visits(self, value):
+        """查询value时读取的页数量，所有叶子节点深度相同，即为树的高度"""
+        pager = self._pager
+        visits = 1
+        node = pager.get(self._root)
+        while not node.leaf:
+            visits += 1
+            node = pager.get(node.childs[0])
+        pager.evict()
+        return visits
+
+
+if __name__ == '__main__':
+    path = os.path.join(tempfile.mkdtemp(), 'index.db')
+    tree = DiskBalancePlusTree(path, page_size=1024, pool_size=16)
+    result = [num for num in range(1, 10001)]
+    random.seed(1)
+    random.shuffle(result)
+    start = time.time()
+    for num in result:
+        tree.put(num, num * 10)
+    print(time.time() - start)
+    print(tree.search(100), tree[100])
+    print('范围扫描：', list(tree.range(100, 110)))
+    print('页读写：', tree._pager.reads, tree._pager.writes)
+    tree.close()
+
+    # 重新打开
+    with DiskBalancePlusTree(path) as reopened:
+        print('重新打开：', len(reopened), reopened.min(), reopened.max())
+        for num in range(1, 5001):
+            reopened.delete(num)
+        print('删除后：', len(reopened), list(reopened.range(4990, 5010)))
+
+    # 批量构建，叶子节点位于连续的页中
+    bulk_path = os.path.join(tempfile.mkdtemp(), 'bulk.db')
+    start = time.time()
+    bulk = DiskBalancePlusTree.from_sorted(bulk_path, range(1, 100001), page_size=1024, pool_size=16)
+    print('批量构建：', time.time() - start)
+    print(bulk.search(100), bulk.max(), len(list(bulk.range(500, 1500))))
+    bulk.close()
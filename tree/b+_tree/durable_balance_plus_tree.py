@@ -0,0 +1,509 @@
+from tree.codec import pack, unpack
+import importlib
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+# b+_tree不是合法的标识符，只能通过importlib导入
+BalancePlusTree = importlib.import_module('tree.b+_tree.balance_plus_tree').BalancePlusTree
+
+
+class DurableBalancePlusTree(BalancePlusTree):
+    """
+    持久化的B+树，在内存B+树之上增加预写日志和检查点
+    1、insert/put/delete把一条二进制记录追加到日志缓冲区，等记录落盘后才返回
+    2、后台刷盘线程把max_delay内到达的记录合并为一次write+fsync(组提交)，并发写入共享同一次fsync；
+       fsync成功后才按日志顺序把这批修改应用到内存中的树上，其他线程读不到尚未落盘的写入
+    3、刷盘失败时这批修改不会应用到树上，日志截断回写入前的长度，之后的写入都抛出IOError
+    4、检查点先把缓冲区刷盘，再按叶子节点链表的顺序保存全部键值，写入后截断日志，日志超过checkpoint_bytes时自动触发
+    5、打开时从检查点批量构建树，再重放日志；检查点保存的恰好是重放完日志后的状态，日志记录都是覆盖或删除，
+       在检查点写入后、日志截断前崩溃时，把同一段日志重放到包含它的状态上结果不变
+    日志记录格式：长度(4字节)、crc32(4字节)、操作类型(I插入/D删除)、编码后的键和关联数据
+    """
+    RECORD = struct.Struct('<II')
+    CHECKPOINT_MAGIC = b'BPCKPT01'
+    COUNT = struct.Struct('<q')
+    CRC = struct.Struct('<I')
+
+    def __init__(self, path, m=5, max_delay=0.005, max_batch_bytes=1 << 20, checkpoint_bytes=64 << 20):
+        """
+        :param path: 文件路径前缀，日志为path.wal，检查点为path.ckpt
+        :param m: 阶数
+        :param max_delay: 记录进入缓冲区后最多等待多久开始刷盘(秒)
+        :param max_batch_bytes: 缓冲区达到该大小时立即刷盘
+        :param checkpoint_bytes: 日志达到该大小时自动写检查点
+        """
+        super(DurableBalancePlusTree, self).__init__(m=m)
+        self._wal_path = path + '.wal'
+        self._checkpoint_path = path + '.ckpt'
+        self._max_delay = max_delay
+        self._max_batch_bytes = max_batch_bytes
+        self._checkpoint_bytes = checkpoint_bytes
+        self._lock = threading.Lock()
+        # 刷盘线程等待新记录，写入方等待记录落盘
+        self._has_pending = threading.Condition(self._lock)
+        self._durable = threading.Condition(self._lock)
+        # 检查点与刷盘互斥，避免检查点之前的记录在日志截断之后才写入
+        self._io_lock = threading.Lock()
+        self._pending = bytearray()
+        # 缓冲区中的记录对应的修改，落盘后按顺序应用到树上
+        self._ops = []
+        # 树中的最小值或第一个写入的值，写日志前用它确认新值可以比较，避免无法应用的记录进入日志
+        self._sample = None
+        self._pending_since = 0.0
+        self._lsn = 0
+        self._synced_lsn = 0
+        self._error = None
+        self._closing = False
+        self._recover()
+        self._flusher = threading.Thread(target=self._flush_loop, name='wal-flusher', daemon=True)
+        self._flusher.start()
+
+    def _recover(self):
+        """从检查点批量构建树，再重放日志，日志末尾不完整或校验失败的记录被截断"""
+        pairs = self._read_checkpoint()
+        if pairs:
+            bulk = BalancePlusTree.from_sorted(pairs, m=self._m, with_data=True)
+            self._root, self._leaf_head, self._count = bulk._root, bulk._leaf_head, bulk._count
+        valid = self._replay()
+        self._log = open(self._wal_path, 'ab')
+        if self._log.tell() > valid:
+            self._log.truncate(valid)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def _read_checkpoint(self):
+        """
+        读取检查点
+        :return: 有序的(值, 关联的数据)列表，检查点不存在时返回None
+        """
+        if not os.path.exists(self._checkpoint_path):
+            return None
+        with open(self._checkpoint_path, 'rb') as f:
+            raw = f.read()
+        magic_size = len(self.CHECKPOINT_MAGIC)
+        if raw[:magic_size] != self.CHECKPOINT_MAGIC or len(raw) < magic_size + self.COUNT.size + self.CRC.size:
+            raise ValueError('not a checkpoint file: {}'.format(self._checkpoint_path))
+        body = memoryview(raw)[:-self.CRC.size]
+        if zlib.crc32(body) != self.CRC.unpack_from(raw, len(raw) - self.CRC.size)[0]:
+            raise ValueError('checkpoint checksum mismatch: {}'.format(self._checkpoint_path))
+        count = self.COUNT.unpack_from(raw, magic_size)[0]
+        offset = magic_size + self.COUNT.size
+        pairs = []
+        for _ in range(count):
+            value, offset = unpack(body, offset)
+            data, offset = unpack(body, offset)
+            pairs.append((value, data))
+        return pairs
+
+    def _replay(self):
+        """
+        重放日志
+        :return: 完整记录的总长度
+        """
+        if not os.path.exists(self._wal_path):
+            return 0
+        with open(self._wal_path, 'rb') as f:
+            raw = memoryview(f.read())
+        offset = 0
+        header = self.RECORD.size
+        while offset + header <= len(raw):
+            length, crc = self.RECORD.unpack_from(raw, offset)
+            body = raw[offset + header:offset + header + length]
+            # 崩溃时写了一半的记录
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            value, position = unpack(body, 1)
+            if body[0] == 0x49:  # I
+                data, position = unpack(body, position)
+                super(DurableBalancePlusTree, self)._insert(value, data)
+            else:
+                super(DurableBalancePlusTree, self)._delete(value)
+            offset += header + length
+        return offset
+
+    def _append(self, body):
+        """
+        把一条记录追加到日志缓冲区，调用方需持有锁
+        :param body: 记录内容
+        :return: 记录的序号
+        """
+        if not self._pending:
+            self._pending_since = time.monotonic()
+            self._has_pending.notify()
+        self._pending += self.RECORD.pack(len(body), zlib.crc32(body))
+        self._pending += body
+        if len(self._pending) >= self._max_batch_bytes:
+            self._has_pending.notify()
+        self._lsn += 1
+        return self._lsn
+
+    def _check_key(self, value):
+        """确认值可以与树中的值比较，调用方需持有锁"""
+        if self._sample is None:
+            self._sample = BalancePlusTree.min(self)
+            if self._sample is None:
+                self._sample = value
+                return
+        # 无法比较时抛出TypeError
+        value < self._sample
+
+    def _wait(self, lsn):
+        """等待序号不超过lsn的记录全部落盘"""
+        with self._lock:
+            while self._synced_lsn < lsn and self._error is None:
+                self._durable.wait()
+            if self._error is not None:
+                raise IOError('write-ahead log flush failed') from self._error
+
+    def _check_open(self):
+        if self._closing:
+            raise ValueError('tree is closed')
+        if self._error is not None:
+            raise IOError('write-ahead log flush failed') from self._error
+
+    def _insert(self, value, data=None):
+        """
+        插入一个值，写入日志并等待落盘，落盘后才应用到树上
+        :param value: 值
+        :param data: 关联的数据
+        """
+        with self._lock:
+            self._check_open()
+            self._check_key(value)
+            lsn = self._append(b'I' + pack(value) + pack(data))
+            self._ops.append((BalancePlusTree._insert, (value, data)))
+        self._wait(lsn)
+
+    def _delete(self, value):
+        """
+        删除一个值，写入日志并等待落盘，值不存在且没有未落盘的修改时直接返回
+        :param value: 值
+        """
+        with self._lock:
+            self._check_open()
+            if not self._ops and BalancePlusTree._search(self, value) is None:
+                return
+            self._check_key(value)
+            lsn = self._append(b'D' + pack(value))
+            self._ops.append((BalancePlusTree._delete, (value,)))
+        self._wait(lsn)
+
+    def _insert_many(self, values):
+        """
+        批量插入，整个批次只等待一次落盘
+        :param values: 有序且不重复的值列表
+        """
+        with self._lock:
+            self._check_open()
+            self._check_key(values[0])
+            self._check_key(values[-1])
+            none = pack(None)
+            for value in values:
+                lsn = self._append(b'I' + pack(value) + none)
+            self._ops.append((BalancePlusTree._insert_many, (values,)))
+        self._wait(lsn)
+
+    def _delete_many(self, values):
+        """
+        批量删除，整个批次只等待一次落盘
+        :param values: 有序且不重复的值列表
+        """
+        with self._lock:
+            self._check_open()
+            self._check_key(values[0])
+            self._check_key(values[-1])
+            for value in values:
+                lsn = self._append(b'D' + pack(value))
+            self._ops.append((DurableBalancePlusTree._apply_delete_many, (values,)))
+        self._wait(lsn)
+
+    def _apply_delete_many(self, values):
+        """批量删除落盘后应用到树上，此时树可能已经为空"""
+        if self._count:
+            BalancePlusTree._delete_many(self, values)
+
+    def _search(self, value):
+        with self._lock:
+            return super(DurableBalancePlusTree, self)._search(value)
+
+    def _search_sorted(self, probes):
+        with self._lock:
+            return super(DurableBalancePlusTree, self)._search_sorted(probes)
+
+    def _get(self, key, default):
+        with self._lock:
+            return super(DurableBalancePlusTree, self)._get(key, default)
+
+    def seek(self, value=None, reverse=False):
+        """
+        游标，在锁内复制出从value开始的全部值后再返回，迭代期间不持有锁，结果为调用时的快照
+        :param value: 起始值，为None时从头(尾)开始
+        :param reverse: 是否降序
+        :return: 迭代器
+        """
+        with self._lock:
+            values = list(self._seek(value, reverse))
+        return iter(values)
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        范围扫描，在锁内复制出闭区间[lo, hi]内的值后再返回，迭代期间不持有锁，结果为调用时的快照
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :param reverse: 是否降序
+        :return: 迭代器
+        """
+        with self._lock:
+            values = list(super(DurableBalancePlusTree, self).range(lo, hi, reverse))
+        return iter(values)
+
+    def count_range(self, lo=None, hi=None):
+        with self._lock:
+            return super(DurableBalancePlusTree, self).count_range(lo, hi)
+
+    def min(self):
+        with self._lock:
+            return super(DurableBalancePlusTree, self).min()
+
+    def max(self):
+        with self._lock:
+            return super(DurableBalancePlusTree, self).max()
+
+    def rank(self, key):
+        with self._lock:
+            return super(DurableBalancePlusTree, self).rank(key)
+
+    def select(self, k):
+        with self._lock:
+            return super(DurableBalancePlusTree, self).select(k)
+
+    def count_between(self, lo, hi):
+        with self._lock:
+            return super(DurableBalancePlusTree, self).count_between(lo, hi)
+
+    def _mid_order(self, node, result):
+        with self._lock:
+            return super(DurableBalancePlusTree, self)._mid_order(node, result)
+
+    def freeze(self):
+        with self._lock:
+            return super(DurableBalancePlusTree, self).freeze()
+
+    def dump(self, path):
+        """
+        在锁内复制出全部(值, 关联的数据)后再写入，写入期间不阻塞其他线程
+        :param path: 文件路径
+        """
+        with self._lock:
+            pairs = list(self._dump_items())
+        self._write_dump(path, len(pairs), pairs)
+
+    def sync(self):
+        """等待当前已写入的全部记录落盘"""
+        with self._lock:
+            lsn = self._lsn
+        self._wait(lsn)
+
+    def _flush_loop(self):
+        """刷盘线程，组提交日志缓冲区中的记录"""
+        while True:
+            with self._lock:
+                while not self._pending and not self._closing:
+                    self._has_pending.wait()
+                if not self._pending:
+                    return
+                # 等待更多记录，直到最早的记录等待了max_delay或缓冲区写满
+                deadline = self._pending_since + self._max_delay
+                while not self._closing and len(self._pending) < self._max_batch_bytes:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._has_pending.wait(remaining)
+            with self._io_lock:
+                flushed = self._flush_pending()
+                need_checkpoint = flushed and self._log.tell() >= self._checkpoint_bytes
+            if not flushed:
+                return
+            if need_checkpoint:
+                self.checkpoint()
+
+    def _flush_pending(self):
+        """
+        把缓冲区中的记录写入日志并fsync，成功后按日志顺序把对应的修改应用到树上，调用方需持有_io_lock
+        失败时修改不会应用到树上，并把日志截断回写入前的长度
+        :return: 是否成功
+        """
+        with self._lock:
+            if self._error is not None:
+                return False
+            buf, ops, lsn = self._pending, self._ops, self._lsn
+            self._pending, self._ops = bytearray(), []
+        error = None
+        if buf:
+            size = self._log.tell()
+            try:
+                self._log.write(buf)
+                self._log.flush()
+                os.fsync(self._log.fileno())
+            except OSError as exc:
+                error = exc
+                try:
+                    self._log.truncate(size)
+                except OSError:
+                    pass
+        with self._lock:
+            if error is None:
+                try:
+                    for apply, args in ops:
+                        apply(self, *args)
+                except Exception as exc:
+                    error = exc
+            if error is None:
+                self._synced_lsn = max(self._synced_lsn, lsn)
+            else:
+                self._error = error
+            self._durable.notify_all()
+        return error is None
+
+    def checkpoint(self):
+        """
+        写检查点并截断日志
+        先把缓冲区刷盘，再在锁内复制叶子节点链表，此时树恰好是重放完日志后的状态；
+        之后的写入只进入缓冲区，不会应用到树上，等日志截断后再刷盘
+        """
+        with self._io_lock:
+            if not self._flush_pending():
+                raise IOError('write-ahead log flush failed') from self._error
+            with self._lock:
+                pairs = list(self._dump_items())
+            self._write_checkpoint(pairs)
+            self._log.truncate(0)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def _write_checkpoint(self, pairs):
+        """先写临时文件再原子替换，保证检查点要么是旧的要么是新的"""
+        tmp_path = self._checkpoint_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            head = self.CHECKPOINT_MAGIC + self.COUNT.pack(len(pairs))
+            crc = zlib.crc32(head)
+            f.write(head)
+            for value, data in pairs:
+                raw = pack(value) + pack(data)
+                crc = zlib.crc32(raw, crc)
+                f.write(raw)
+            f.write(self.CRC.pack(crc))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._checkpoint_path)
+        # 同步目录项，保证替换后的文件名落盘
+        directory = os.open(os.path.dirname(os.path.abspath(self._checkpoint_path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    @classmethod
+    def from_sorted(cls, path, iterable, m=5, fill_factor=1.0, with_data=False, **kwargs):
+        """
+        根据有序序列批量构建，构建后立即写检查点
+        :param path: 文件路径前缀，必须是新的或为空的树
+        :param iterable: 递增的值序列，可以是生成器，重复值会被忽略
+        :param m: 阶数
+        :param fill_factor: 节点填充率，取值范围(0, 1]
+        :param with_data: 为True时iterable中的元素为(值, 关联的数据)
+        :param kwargs: 其他构造参数
+        :return: DurableBalancePlusTree对象
+        """
+        tree = cls(path, m=m, **kwargs)
+        try:
+            if tree._count:
+                raise ValueError('from_sorted requires an empty tree')
+            bulk = BalancePlusTree.from_sorted(iterable, m=m, fill_factor=fill_factor, with_data=with_data)
+        except BaseException:
+            tree.close()
+            raise
+        tree._replace_state(bulk._root, bulk._leaf_head, bulk._count)
+        return tree
+
+    @classmethod
+    def load(cls, path, target, **kwargs):
+        """
+        读取dump保存的文件，批量构建后立即写检查点
+        :param path: dump文件路径
+        :param target: 持久化文件路径前缀
+        :param kwargs: 覆盖文件中保存的构造参数
+        :return: DurableBalancePlusTree对象
+        """
+        params, pairs, meta = cls._read_dump(path)
+        params.update(kwargs)
+        tree = cls(target, **params)
+        bulk = BalancePlusTree.from_sorted(pairs, m=tree._m, with_data=True)
+        tree._replace_state(bulk._root, bulk._leaf_head, bulk._count)
+        return tree
+
+    def _replace_state(self, root, leaf_head, count):
+        """
+        整体替换树的内容并写检查点
+        日志不为空时先写一次检查点清空日志，否则新检查点写入后、日志截断前崩溃会把旧日志重放到新的内容上
+        """
+        if self._log.tell():
+            self.checkpoint()
+        with self._lock:
+            self._root, self._leaf_head, self._count = root, leaf_head, count
+            self._sample = None
+        self.checkpoint()
+
+    def close(self):
+        """刷盘后停止刷盘线程并关闭日志"""
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+            self._has_pending.notify()
+        self._flusher.join()
+        self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+if __name__ == '__main__':
+    path = os.path.join(tempfile.mkdtemp(), 'index')
+    tree = DurableBalancePlusTree(path, m=64)
+
+    # 单线程每次插入都要等待一次组提交
+    start = time.time()
+    for num in range(200):
+        tree.put(num, 'record-{}'.format(num))
+    print('单线程持久化插入：{:.0f}/s'.format(200 / (time.time() - start)))
+
+    # 多线程并发插入，共享fsync
+    def worker(offset, count):
+        for num in range(offset, offset + count):
+            tree.insert(num)
+
+    threads = [threading.Thread(target=worker, args=(1000 + i * 1000, 1000)) for i in range(32)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print('32线程持久化插入：{:.0f}/s'.format(32000 / (time.time() - start)))
+
+    tree.delete(100)
+    tree.checkpoint()
+    tree.delete(101)
+    tree.close()
+
+    # 重新打开：检查点+日志重放
+    start = time.time()
+    with DurableBalancePlusTree(path, m=64) as reopened:
+        print('恢复：', time.time() - start, len(reopened), reopened[5], 100 in reopened, 101 in reopened)
@@ -0,0 +1,158 @@
+"""
+并发B+树测试：多线程写入后的一致性、扫描有序、dump/load、freeze和顺序统计
+用法：python -m pytest "tree/b+_tree/test_concurrent_balance_plus_tree.py"
+"""
+import importlib
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+# b+_tree不是合法的标识符，只能通过importlib导入
+ConcurrentBalancePlusTree = importlib.import_module(
+    'tree.b+_tree.concurrent_balance_plus_tree').ConcurrentBalancePlusTree
+
+
+class ConcurrentBalancePlusTreeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tree.dump')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_requires_m(self):
+        with self.assertRaises(ValueError):
+            ConcurrentBalancePlusTree(m=3)
+
+    def test_concurrent_writes(self):
+        tree = ConcurrentBalancePlusTree(m=4)
+        nums = list(range(5000))
+        random.Random(1).shuffle(nums)
+        chunks = [nums[i::8] for i in range(8)]
+        errors = []
+        done = threading.Event()
+
+        def scan():
+            while not done.is_set():
+                values = list(tree.range(1000, 2000))
+                if values != sorted(values):
+                    errors.append(values)
+
+        scanner = threading.Thread(target=scan)
+        scanner.start()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda chunk: [tree.put(num, num * 10) for num in chunk], chunks))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda chunk: [tree.delete(num) for num in chunk if num % 3 == 0], chunks))
+        done.set()
+        scanner.join()
+        self.assertEqual(errors, [])
+        expected = [num for num in range(5000) if num % 3]
+        self.assertEqual(len(tree), len(expected))
+        self.assertEqual(list(tree), expected)
+        self.assertEqual(list(reversed(tree)), expected[::-1])
+        self.assertEqual(tree.min(), 1)
+        self.assertEqual(tree[4], 40)
+        probes = list(range(-5, 5010))
+        self.assertEqual(tree.search_many(probes), [tree.search(key) for key in probes])
+
+    def test_dump_load(self):
+        for n in (0, 1, 3, 4, 100, 1000):
+            for m in (4, 5, 16):
+                tree = ConcurrentBalancePlusTree(m=m)
+                for num in random.Random(n).sample(range(n), n):
+                    tree.put(num, str(num))
+                tree.dump(self.path)
+                loaded = ConcurrentBalancePlusTree.load(self.path)
+                self.assertEqual(loaded._m, m)
+                self.assertEqual(len(loaded), n)
+                self.assertEqual(list(loaded), list(range(n)))
+                self.assertEqual([loaded[num] for num in range(n)], [str(num) for num in range(n)])
+                # 加载后的树可以继续写入和拆分
+                for num in range(n, n + 50):
+                    loaded.insert(num)
+                for num in range(0, n, 2):
+                    loaded.delete(num)
+                self.assertEqual(list(loaded), [num for num in range(n + 50) if num >= n or num % 2])
+
+    def test_dump_during_writes(self):
+        tree = ConcurrentBalancePlusTree(m=8)
+        stop = threading.Event()
+
+        def writer(seed):
+            rnd = random.Random(seed)
+            while not stop.is_set():
+                tree.insert(rnd.randrange(100000))
+
+        threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(3)]
+        for thread in threads:
+            thread.start()
+        try:
+            for _ in range(10):
+                tree.dump(self.path)
+                values = list(ConcurrentBalancePlusTree.load(self.path))
+                self.assertEqual(values, sorted(set(values)))
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def test_freeze(self):
+        tree = ConcurrentBalancePlusTree()
+        for num in range(0, 300, 3):
+            tree.put(num, -num)
+        frozen = tree.freeze()
+        self.assertEqual(list(frozen), list(range(0, 300, 3)))
+        self.assertEqual(frozen[99], -99)
+
+    def test_order_statistics(self):
+        tree = ConcurrentBalancePlusTree()
+        self.assertEqual(tree.rank(3), 0)
+        with self.assertRaises(IndexError):
+            tree.select(0)
+        for num in random.Random(2).sample(range(0, 600, 2), 300):
+            tree.insert(num)
+        # 惰性删除留下空的叶子节点，计数时需要跳过
+        for num in range(100, 300, 2):
+            tree.delete(num)
+        keys = list(tree)
+        for key in range(-3, 605):
+            self.assertEqual(tree.rank(key), bisect_left(keys, key), key)
+        for lo, hi in [(0, 599), (99, 301), (150, 250), (10, 10), (20, 10)]:
+            self.assertEqual(tree.count_between(lo, hi), max(bisect_right(keys, hi) - bisect_left(keys, lo), 0))
+        self.assertEqual([tree.select(k) for k in range(-len(keys), len(keys))], keys + keys)
+        with self.assertRaises(IndexError):
+            tree.select(len(keys))
+
+    def test_order_statistics_during_writes(self):
+        tree = ConcurrentBalancePlusTree(m=6)
+        for num in range(0, 2000, 2):
+            tree.insert(num)
+        stop = threading.Event()
+
+        def writer():
+            rnd = random.Random(3)
+            while not stop.is_set():
+                tree.insert(rnd.randrange(1, 2000, 2))
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(50):
+                # 偶数在写入期间保持不变，排名只会因奇数的插入而增大
+                rank = tree.rank(1000)
+                self.assertGreaterEqual(rank, 500)
+                self.assertLessEqual(rank, 1000)
+                self.assertGreaterEqual(tree.count_between(0, 1998), 1000)
+        finally:
+            stop.set()
+            thread.join()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+"""
+磁盘B+树测试：重新打开、缓冲池淘汰、int64校验、空的关联数据、顺序统计、遍历、批量构建和dump/load
+用法：python -m pytest "tree/b+_tree/test_disk_balance_plus_tree.py"
+"""
+import importlib
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from bisect import bisect_left, bisect_right
+
+# b+_tree不是合法的标识符，只能通过importlib导入
+disk_balance_plus_tree = importlib.import_module('tree.b+_tree.disk_balance_plus_tree')
+DiskBalancePlusTree, Pager = disk_balance_plus_tree.DiskBalancePlusTree, disk_balance_plus_tree.Pager
+BalancePlusTree = importlib.import_module('tree.b+_tree.balance_plus_tree').BalancePlusTree
+
+
+class DiskBalancePlusTreeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'index.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def open(self, **kwargs):
+        # 页很小、缓冲池很小，少量数据就会产生多层索引和频繁的淘汰
+        kwargs.setdefault('page_size', 256)
+        kwargs.setdefault('pool_size', 4)
+        return DiskBalancePlusTree(self.path, **kwargs)
+
+    def check_tree(self, tree, expected):
+        keys = sorted(expected)
+        self.assertEqual(len(tree), len(keys))
+        self.assertEqual(list(tree), keys)
+        self.assertEqual(list(reversed(tree)), keys[::-1])
+        self.assertEqual(tree.min(), keys[0] if keys else None)
+        self.assertEqual(tree.max(), keys[-1] if keys else None)
+        for key in range(-3, 1010, 7):
+            self.assertEqual(tree.search(key), key if key in expected else None)
+            self.assertEqual(tree.get(key, 'missing'), expected.get(key, 'missing'))
+        self.assertEqual(list(tree.range(100, 300)), [key for key in keys if 100 <= key <= 300])
+        self.assertEqual(list(tree.range(100, 300, reverse=True)), [key for key in keys if 100 <= key <= 300][::-1])
+
+    def test_reopen(self):
+        rnd = random.Random(1)
+        expected = {}
+        tree = self.open()
+        for _ in range(2000):
+            key = rnd.randrange(1000)
+            if rnd.random() < 0.7:
+                tree.put(key, key * 10)
+                expected[key] = key * 10
+            else:
+                tree.delete(key)
+                expected.pop(key, None)
+        self.check_tree(tree, expected)
+        tree.close()
+        with DiskBalancePlusTree(self.path) as reopened:
+            self.check_tree(reopened, expected)
+            # 插入时未指定关联的数据与其他树一样为None
+            reopened.insert(5000)
+            self.assertIsNone(reopened[5000])
+
+    def test_rejects_non_int64(self):
+        tree = self.open()
+        for key in range(50):
+            tree.put(key, key)
+        tree.flush()
+        for key, data, error in [(1, 'abc', TypeError), (2.5, None, TypeError), ('a', None, TypeError),
+                                 (1 << 63, None, OverflowError), (-(1 << 63) - 1, None, OverflowError),
+                                 (3, 1 << 64, OverflowError)]:
+            with self.assertRaises(error):
+                tree.put(key, data)
+        with self.assertRaises(TypeError):
+            tree.insert_many([1.5])
+        self.assertEqual(tree[1], 1)
+        tree.close()
+        # 被拒绝的写入没有修改任何页，之前写入的数据完整保留
+        with DiskBalancePlusTree(self.path) as reopened:
+            self.check_tree(reopened, {key: key for key in range(50)})
+
+    def test_int64_bounds(self):
+        with self.open() as tree:
+            tree.put(-(1 << 63), (1 << 63) - 1)
+            tree.put((1 << 63) - 1, -(1 << 63))
+        with DiskBalancePlusTree(self.path) as reopened:
+            self.assertEqual(list(reopened), [-(1 << 63), (1 << 63) - 1])
+            self.assertEqual(reopened[-(1 << 63)], (1 << 63) - 1)
+
+    def test_null_data(self):
+        rnd = random.Random(4)
+        expected = {}
+        with self.open() as tree:
+            for key in rnd.sample(range(1000), 600):
+                data = rnd.choice([None, 0, key, -key])
+                tree.put(key, data)
+                expected[key] = data
+            tree.insert(1000)
+            expected[1000] = None
+            # 覆盖为None和从None覆盖为整数
+            for key in list(expected)[:50]:
+                data = None if expected[key] is not None else 7
+                tree.put(key, data)
+                expected[key] = data
+            self.check_tree(tree, expected)
+        with DiskBalancePlusTree(self.path) as reopened:
+            self.check_tree(reopened, expected)
+            self.assertEqual(dict(reopened._dump_items()), expected)
+            dump_path = os.path.join(self.directory, 'tree.dump')
+            reopened.dump(dump_path)
+        with DiskBalancePlusTree.load(dump_path, os.path.join(self.directory, 'loaded.db')) as loaded:
+            self.check_tree(loaded, expected)
+
+    def test_full_leaf_with_nulls(self):
+        # 装满的叶子节点加上空值位图仍能放入页中
+        for page_size in (256, 512, 4096):
+            path = os.path.join(self.directory, 'full-{}.db'.format(page_size))
+            with DiskBalancePlusTree.from_sorted(path, ((key, None) for key in range(3000)), with_data=True,
+                                                 page_size=page_size, pool_size=2) as tree:
+                self.assertEqual(tree._m, Pager.max_order(page_size))
+            with DiskBalancePlusTree(path) as reopened:
+                self.assertEqual(len(reopened), 3000)
+                self.assertEqual(reopened.get(2999, 'missing'), None)
+
+    def test_order_statistics(self):
+        rnd = random.Random(2)
+        tree = self.open()
+        keys = rnd.sample(range(1000), 300)
+        tree.insert_many(keys)
+        # 惰性删除会留下空的叶子节点
+        tree.delete_many(keys[:150])
+        keys = sorted(keys[150:])
+        for key in range(-5, 1005, 3):
+            self.assertEqual(tree.rank(key), bisect_left(keys, key))
+        for k in range(-len(keys), len(keys)):
+            self.assertEqual(tree.select(k), keys[k])
+        with self.assertRaises(IndexError):
+            tree.select(len(keys))
+        for lo, hi in [(0, 1000), (100, 200), (500, 500), (300, 100)]:
+            self.assertEqual(tree.count_between(lo, hi), max(bisect_right(keys, hi) - bisect_left(keys, lo), 0))
+        tree.close()
+
+    def test_traversal(self):
+        tree = self.open()
+        tree.insert_many(range(500))
+        pre, post = tree.pre_order(), tree.follow_order()
+        self.assertEqual(pre[0].page_id, tree._root)
+        self.assertEqual(post[-1].page_id, tree._root)
+        self.assertEqual(sorted(node.page_id for node in pre), sorted(node.page_id for node in post))
+        self.assertEqual(sorted(value for node in pre if node.leaf for value in node.values), list(range(500)))
+        # 遍历结束后缓冲池不会超过上限太多
+        self.assertLessEqual(len(tree._pager._pool), tree._pager.pool_size + 1)
+        tree.close()
+
+    def test_batch_search(self):
+        tree = self.open()
+        tree.insert_many(range(0, 1000, 2))
+        tree.delete_many(range(0, 400, 4))
+        probes = list(range(-10, 1010))
+        self.assertEqual(tree.search_many(probes), [tree.search(key) for key in probes])
+        tree.close()
+
+    def test_from_sorted(self):
+        tree = DiskBalancePlusTree.from_sorted(self.path, ((key, -key) for key in range(1000)), m=8, with_data=True,
+                                               fill_factor=0.7, page_size=256, pool_size=4)
+        tree.close()
+        with DiskBalancePlusTree(self.path) as reopened:
+            self.check_tree(reopened, {key: -key for key in range(1000)})
+            with self.assertRaises(ValueError):
+                DiskBalancePlusTree.from_sorted(self.path, [1])
+
+    def test_dump_load(self):
+        expected = {key: key * 3 for key in range(0, 700, 3)}
+        with self.open() as tree:
+            for key, data in expected.items():
+                tree.put(key, data)
+            dump_path = os.path.join(self.directory, 'tree.dump')
+            tree.dump(dump_path)
+        loaded = DiskBalancePlusTree.load(dump_path, os.path.join(self.directory, 'loaded.db'), pool_size=4)
+        self.check_tree(loaded, expected)
+        loaded.close()
+
+    def test_matches_memory_tree(self):
+        rnd = random.Random(3)
+        disk, memory = self.open(m=4), BalancePlusTree(m=4)
+        for _ in range(3000):
+            key = rnd.randrange(800)
+            if rnd.random() < 0.6:
+                disk.insert(key)
+                memory.insert(key)
+            else:
+                disk.delete(key)
+                memory.delete(key)
+        self.assertEqual(list(disk), list(memory))
+        self.assertEqual(len(disk), len(memory))
+        disk.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
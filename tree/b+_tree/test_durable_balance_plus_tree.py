@@ -0,0 +1,238 @@
+"""
+持久化B+树测试：日志重放、检查点、并发读写时读取接口的一致性、批量构建和dump/load
+用法：python -m pytest "tree/b+_tree/test_durable_balance_plus_tree.py"
+"""
+import importlib
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from bisect import bisect_left
+from unittest import mock
+
+# b+_tree不是合法的标识符，只能通过importlib导入
+DurableBalancePlusTree = importlib.import_module('tree.b+_tree.durable_balance_plus_tree').DurableBalancePlusTree
+
+
+class DurableBalancePlusTreeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'index')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def open(self, path=None, **kwargs):
+        kwargs.setdefault('m', 5)
+        kwargs.setdefault('max_delay', 0.001)
+        return DurableBalancePlusTree(path or self.path, **kwargs)
+
+    def check_tree(self, tree, expected):
+        keys = sorted(expected)
+        self.assertEqual(len(tree), len(keys))
+        self.assertEqual(list(tree), keys)
+        for key, data in expected.items():
+            self.assertEqual(tree[key], data)
+        self.assertEqual(tree.min(), keys[0] if keys else None)
+        self.assertEqual(tree.max(), keys[-1] if keys else None)
+
+    def apply(self, tree, expected, seed, n=300):
+        rnd = random.Random(seed)
+        for _ in range(n):
+            key = rnd.randrange(200)
+            if rnd.random() < 0.7:
+                tree.put(key, 'record-{}'.format(rnd.randrange(100)))
+                expected[key] = tree[key]
+            else:
+                tree.delete(key)
+                expected.pop(key, None)
+
+    def test_replay(self):
+        expected = {}
+        with self.open() as tree:
+            self.apply(tree, expected, 1)
+        with self.open() as reopened:
+            self.check_tree(reopened, expected)
+
+    def test_checkpoint_then_log(self):
+        expected = {}
+        with self.open() as tree:
+            self.apply(tree, expected, 2)
+            tree.checkpoint()
+            self.apply(tree, expected, 3)
+            tree.insert_many(range(500, 520))
+            tree.delete_many(range(505, 510))
+            expected.update((key, None) for key in range(500, 520) if not 505 <= key < 510)
+        with self.open() as reopened:
+            self.check_tree(reopened, expected)
+
+    def test_automatic_checkpoint(self):
+        expected = {}
+        with self.open(checkpoint_bytes=512) as tree:
+            self.apply(tree, expected, 4)
+        self.assertTrue(os.path.exists(self.path + '.ckpt'))
+        with self.open() as reopened:
+            self.check_tree(reopened, expected)
+
+    def test_torn_log_tail(self):
+        expected = {}
+        with self.open() as tree:
+            self.apply(tree, expected, 5)
+        # 日志末尾写了一半的记录在恢复时被截断
+        with open(self.path + '.wal', 'ab') as f:
+            f.write(b'\x20\x00\x00\x00\x01\x02')
+        with self.open() as reopened:
+            self.check_tree(reopened, expected)
+
+    def test_readers_during_writes(self):
+        tree = self.open()
+        stop = threading.Event()
+        errors = []
+
+        def writer(seed):
+            rnd = random.Random(seed)
+            while not stop.is_set():
+                key = rnd.randrange(3000)
+                if rnd.random() < 0.6:
+                    tree.insert(key)
+                else:
+                    tree.delete(key)
+
+        def reader():
+            try:
+                while not stop.is_set():
+                    for values in (list(tree.range(0, 2000)), list(tree), list(tree.seek(100))):
+                        if values != sorted(set(values)):
+                            errors.append(values)
+                    values = list(reversed(tree))
+                    if values != sorted(set(values), reverse=True):
+                        errors.append(values)
+                    tree.min(), tree.max(), tree.rank(1500), tree.count_between(10, 500), tree.count_range(10, 500)
+                    tree.mid_order(), tree.freeze()
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        stop.wait(1.5)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        keys = list(tree)
+        self.assertEqual([tree.select(k) for k in range(len(keys))], keys)
+        self.assertEqual([tree.rank(key) for key in keys], list(range(len(keys))))
+        tree.close()
+
+    def test_from_sorted(self):
+        tree = DurableBalancePlusTree.from_sorted(self.path, [(key, key * 2) for key in range(100)], m=6,
+                                                  with_data=True, max_delay=0.001)
+        tree.put(200, 1)
+        tree.close()
+        with self.open(m=6) as reopened:
+            self.check_tree(reopened, dict([(key, key * 2) for key in range(100)] + [(200, 1)]))
+            self.assertEqual(reopened.rank(50), bisect_left(list(reopened), 50))
+        with self.assertRaises(ValueError):
+            DurableBalancePlusTree.from_sorted(self.path, range(3))
+
+    def test_dump_load(self):
+        expected = {}
+        with self.open() as tree:
+            self.apply(tree, expected, 6)
+            dump_path = os.path.join(self.directory, 'tree.dump')
+            tree.dump(dump_path)
+        target = os.path.join(self.directory, 'loaded')
+        with DurableBalancePlusTree.load(dump_path, target, max_delay=0.001) as loaded:
+            self.check_tree(loaded, expected)
+        with self.open(target) as reopened:
+            self.check_tree(reopened, expected)
+
+    def test_crash_before_log_truncate(self):
+        tree = self.open()
+        tree.insert(5)
+        tree.delete(5)
+        # 检查点开始时insert(5)、insert(7)还在缓冲区中
+        tree._max_delay = 60
+        writers = [threading.Thread(target=tree.insert, args=(key,)) for key in (5, 7)]
+        for lsn, writer in enumerate(writers, 3):
+            writer.start()
+            while tree._lsn < lsn:
+                time.sleep(0.001)
+        saved = []
+        write_checkpoint = tree._write_checkpoint
+
+        def crash_before_truncate(pairs):
+            write_checkpoint(pairs)
+            with open(self.path + '.wal', 'rb') as f:
+                saved.append(f.read())
+
+        tree._write_checkpoint = crash_before_truncate
+        tree.checkpoint()
+        for writer in writers:
+            writer.join()
+        tree.close()
+        # 模拟检查点替换完成、日志还没有截断时崩溃
+        with open(self.path + '.wal', 'wb') as f:
+            f.write(saved[0])
+        with self.open() as reopened:
+            self.check_tree(reopened, {5: None, 7: None})
+
+    def test_flush_failure(self):
+        tree = self.open()
+        tree.put(1, 'one')
+        with mock.patch('os.fsync', side_effect=OSError('disk full')):
+            with self.assertRaises(IOError):
+                tree.put(2, 'two')
+        # 未落盘的修改没有应用到树上，之后的写入都失败
+        self.check_tree(tree, {1: 'one'})
+        with self.assertRaises(IOError):
+            tree.insert(3)
+        with self.assertRaises(IOError):
+            tree.checkpoint()
+        tree.close()
+        with self.open() as reopened:
+            self.check_tree(reopened, {1: 'one'})
+
+    def test_unwritten_changes_invisible(self):
+        tree = self.open()
+        tree.insert(1)
+        tree._max_delay = 60
+        writer = threading.Thread(target=tree.insert, args=(2,))
+        writer.start()
+        while tree._lsn < 2:
+            time.sleep(0.001)
+        # 记录还在缓冲区中，其他线程读不到
+        self.assertNotIn(2, tree)
+        self.assertEqual(list(tree), [1])
+        tree.close()
+        writer.join()
+        self.assertIn(2, tree)
+        with self.open() as reopened:
+            self.check_tree(reopened, {1: None, 2: None})
+
+    def test_rejects_bad_write(self):
+        with self.open() as tree:
+            tree.insert(1)
+            with self.assertRaises(TypeError):
+                tree.insert('x')
+            with self.assertRaises(TypeError):
+                tree.put(3, [3])
+            tree.insert(2)
+        with self.open() as reopened:
+            self.check_tree(reopened, {1: None, 2: None})
+
+    def test_closed(self):
+        tree = self.open()
+        tree.close()
+        with self.assertRaises(ValueError):
+            tree.insert(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
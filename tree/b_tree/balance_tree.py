@@ -1,4 +1,6 @@
-from tree.base_tree import Tree, BNode, Node
+from tree.base_tree import Tree, BNode
+from bisect import bisect_left, bisect_right
+from array import array
 import time
 import random
 import tqdm
@@ -14,53 +16,135 @@ class BalanceTree(Tree):
         """
         self._m = m
         self._root = None
+        self._count = 0
 
-    def _insert(self, value: int):
+    def _insert(self, value: int, data=None):
         """
         插入一个值
         :param value: 值
+        :param data: 关联的数据
         :return: value
         """
-        self._root = self.__put(self._root, value)
+        self._root = self.__put(self._root, value, data)
         # 当根节点阶数满时进行拆分
         if len(self._root.values) >= self._m and len(self._root.values)>2:
             self._split(None, self._root)
 
-    def __put(self, node, new_value):
+    def __put(self, node, new_value, data):
         """
         放置一个新的节点
         :param node:
         :param new_node:
+        :param data: 关联的数据
         :return: 新的根节点
         """
         if not node:
-            return BNode(new_value)
-        # 遍历节点值
-        for k, v in enumerate(node.values):
-            # 如果当前节点为叶子节点，则直接添加
-            if node.is_leaf():
-                # 当叶子节点不包含当前值时添加进去
-                if new_value not in node.values:
-                    node.add_val(new_value)
-                break
-            else:
-                # 当为非叶子节点且当前值小于遍历值时，向下递归
-                if new_value < v:
-                    node.childs[k] = self.__put(node.childs[k], new_value)
-                    break
-                # 当前值和插入值一样时不做操作
-                elif new_value == v:
-                    break
-        else:
-            # 此时满足新插入的值大于当前节点中所有的值且当前节点不是叶子节点，此时直接递归put当前节点的最大子节点
-            node.childs[-1] = self.__put(node.childs[-1], new_value)
+            self._count += 1
+            return BNode(new_value, data)
+        # 二分查找插入位置
+        k = bisect_left(node.values, new_value)
+        # 当前值和插入值一样时只更新关联的数据
+        if k < len(node.values) and node.values[k] == new_value:
+            node.datas[k] = data
+            return node
+        # 如果当前节点为叶子节点，则直接添加
+        if node.is_leaf():
+            node.values.insert(k, new_value)
+            node.datas.insert(k, data)
+            node.size += 1
+            self._count += 1
+            return node
+        # 当为非叶子节点时，向第k个孩子节点递归，新插入的值大于所有值时k即为最大子节点
+        count = self._count
+        child = self.__put(node.childs[k], new_value, data)
+        node.childs[k] = child
+        # 插入了新值时子树大小加一
+        if self._count != count:
+            node.size += 1
 
-        # 1、判定当前节点是否任一节点因为插入导致出现了满阶的情况，如果出现则进行拆分节点
-        for k, child in enumerate(node.childs):
-            if len(child.values) >= self._m:
-                self._split(node, child)
+        # 1、判定孩子节点是否因为插入导致出现了满阶的情况，如果出现则进行拆分节点
+        if len(child.values) >= self._m:
+            self._split(node, child)
         return node
 
+    def _insert_many(self, values):
+        """
+        批量插入，有序的批次沿树共享下降路径
+        1、按节点的值把批次切分给各孩子节点，每个节点只访问一次
+        2、叶子节点线性合并批次，溢出的节点一次拆分成多个节点
+        :param values: 有序且不重复的值列表
+        """
+        if not self._root:
+            self._root = BNode()
+        self._count += self.__put_many(self._root, values, 0, len(values))
+        # 根节点溢出时放到新的根节点下拆分，直到根节点不再溢出
+        while len(self._root.values) >= self._m:
+            root = BNode()
+            root.childs = [self._root]
+            root.size = self._root.size
+            self._split_many(root, 0)
+            self._root = root
+
+    def __put_many(self, node, values, lo, hi):
+        """
+        将有序值序列的[lo, hi)部分放置到子树中
+        :param node: 子树根节点
+        :param values: 有序且不重复的值列表
+        :return: 新增值的数量
+        """
+        if node.is_leaf():
+            return node.merge_values(values, lo, hi)
+        added = 0
+        end = hi
+        # 从右向左处理孩子节点，拆分产生的新节点不会影响左侧孩子节点的下标
+        for k in range(len(node.childs) - 1, -1, -1):
+            if k:
+                separator = node.values[k - 1]
+                start = bisect_right(values, separator, lo, end)
+            else:
+                start = lo
+            if start < end:
+                added += self.__put_many(node.childs[k], values, start, end)
+                if len(node.childs[k].values) >= self._m:
+                    self._split_many(node, k)
+            end = start
+            # 与当前节点的值相同时只重置关联的数据
+            if k and end > lo and values[end - 1] == separator:
+                node.datas[k - 1] = None
+                end -= 1
+        node.size += added
+        return added
+
+    def _split_many(self, parent, k):
+        """
+        将溢出的孩子节点一次拆分为多个节点，n个值共有n+1个孩子位置，按位置平分，分组之间的值上升到父节点
+        :param parent: 父节点
+        :param k: 溢出的孩子节点所在的下标
+        """
+        child = parent.childs[k]
+        values, datas, childs = child.values, child.datas, child.childs
+        n = len(values) + 1
+        parts = -(-n // self._m)
+        bounds = [n * i // parts for i in range(parts + 1)]
+        pieces = []
+        for i in range(1, parts):
+            piece = BNode()
+            piece.values = values[bounds[i]:bounds[i + 1] - 1]
+            piece.datas = datas[bounds[i]:bounds[i + 1] - 1]
+            piece.childs = childs[bounds[i]:bounds[i + 1]]
+            self._resize(piece)
+            pieces.append(piece)
+        # 分组之间的值上升到父节点，父节点的子树大小不变
+        parent.values[k:k] = [values[bound - 1] for bound in bounds[1:-1]]
+        parent.datas[k:k] = [datas[bound - 1] for bound in bounds[1:-1]]
+        parent.childs[k + 1:k + 1] = pieces
+        if self._stats is not None:
+            self._stats.splits += len(pieces)
+        del values[bounds[1] - 1:]
+        del datas[bounds[1] - 1:]
+        del childs[bounds[1]:]
+        self._resize(child)
+
     def _split(self, parent, child):
         """
         拆分节点
@@ -68,30 +152,38 @@ class BalanceTree(Tree):
         :param child: 当前拆分节点
         :return:
         """
+        if self._stats is not None:
+            self._stats.splits += 1
         # 寻找中间节点
         mid = len(child.values) // 2
         current_value = child.values[mid]
+        current_data = child.datas[mid]
         # 生成兄弟节点，此处为后继节点
         right = BNode()
-        # 拆分值
-        for k, v in enumerate(child.values[mid+1:]):
-            right.add_val(v)
-        # 拆分子节点
-        for k, c in enumerate(child.childs[mid+1:]):
-            right.add_child(c)
-        child.values = child.values[:mid]
-        child.childs = child.childs[:mid+1]
-
-        # 中间值的上升
+        # 拆分值和子节点
+        right.values = child.values[mid+1:]
+        right.datas = child.datas[mid+1:]
+        right.childs = child.childs[mid+1:]
+        del child.values[mid:]
+        del child.datas[mid:]
+        del child.childs[mid+1:]
+        self._resize(child)
+        self._resize(right)
+
+        # 中间值的上升，兄弟节点位于中间值的右侧，父节点的子树大小不变
         if parent:
-            parent.add_val(current_value)
-            parent.add_child(right)
+            k = parent.add_val(current_value)
+            parent.datas.insert(k, current_data)
+            parent.childs.insert(k + 1, right)
         else:
             # 当传入的parent为空时说明传入的是根节点
-            self._root = BNode()
-            self._root.add_val(current_value)
-            self._root.add_child(child)
-            self._root.add_child(right)
+            self._root = BNode(current_value, current_data)
+            self._root.childs = [child, right]
+            self._resize(self._root)
+
+    def _resize(self, node):
+        """根据节点的值和孩子节点重新计算子树大小"""
+        node.size = len(node.values) + sum(child.size for child in node.childs)
 
     def _search(self, value: int):
         """
@@ -101,40 +193,252 @@ class BalanceTree(Tree):
         """
         current = self._root
         while current:
-            for k, v in enumerate(current.values):
-                if value == v:
-                    return v
-                if value < v:
-                    if not current.is_leaf():
-                        current = current.childs[k]
-                    else:
-                        current = None
-                    break
+            values = current.values
+            k = bisect_left(values, value)
+            if k < len(values) and values[k] == value:
+                return values[k]
+            if not current.is_leaf():
+                current = current.childs[k]
             else:
-                if not current.is_leaf():
-                    current = current.childs[-1]
-                else:
-                    current = None
+                current = None
         return None
 
+    def _search_sorted(self, probes):
+        """
+        对有序的探测键共享下降路径：每个节点只处理区间内首尾探测键之间的值，
+        每个值把区间内的键分给它左侧的孩子节点，最后剩余的键交给最右侧的孩子节点
+        :param probes: 有序的探测键列表
+        :return: 与probes并列的_search结果列表
+        """
+        result = [None] * len(probes)
+        stack = [(self._root, 0, len(probes))]
+        while stack:
+            node, lo, hi = stack.pop()
+            values, childs = node.values, node.childs
+            start = bisect_left(values, probes[lo])
+            end = bisect_right(values, probes[hi - 1])
+            for k in range(start, end):
+                value = values[k]
+                i = bisect_left(probes, value, lo, hi)
+                if childs and lo < i:
+                    stack.append((childs[k], lo, i))
+                while i < hi and probes[i] == value:
+                    result[i] = value
+                    i += 1
+                lo = i
+            if childs and lo < hi:
+                stack.append((childs[end], lo, hi))
+        return result
+
+    def _get(self, key, default):
+        """
+        查询键关联的数据
+        :param key: 键
+        :param default: 键不存在时返回的默认值
+        :return: 关联的数据
+        """
+        current = self._root
+        while current:
+            values = current.values
+            k = bisect_left(values, key)
+            if k < len(values) and values[k] == key:
+                return current.datas[k]
+            if not current.is_leaf():
+                current = current.childs[k]
+            else:
+                current = None
+        return default
+
     def _mid_order(self, node, result):
         """B树中序遍历"""
         if node:
+            if node.is_leaf():
+                result.extend(node.values)
+                return result
             for k, v in enumerate(node.values):
-                if not node.is_leaf():
-                    result = self._mid_order(node.childs[k], result)
+                result = self._mid_order(node.childs[k], result)
                 result.append(v)
-            else:
-                if not node.is_leaf():
-                    result = self._mid_order(node.childs[-1], result)
+            result = self._mid_order(node.childs[-1], result)
         return result
 
+    def iter_in_order(self):
+        """
+        中序遍历生成器，栈中每层保存(节点, 下一个值的下标)，额外空间为树的高度
+        :return: 生成器，按升序返回值
+        """
+        stack = []
+        self._push_left(stack, self._root)
+        while stack:
+            entry = stack[-1]
+            node, k = entry
+            if node.is_leaf():
+                for value in node.values:
+                    yield value
+                stack.pop()
+            elif k < len(node.values):
+                yield node.values[k]
+                entry[1] = k + 1
+                self._push_left(stack, node.childs[k + 1])
+            else:
+                stack.pop()
+
+    def __iter__(self):
+        return self.iter_in_order()
+
+    def range(self, lo=None, hi=None):
+        """
+        范围扫描，按升序返回闭区间[lo, hi]内的值
+        沿二分查找的路径下降到lo的位置，栈中保存每个节点下一个要返回的值的下标，遇到大于hi的值即结束
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :return: 生成器
+        """
+        stack = []
+        node = self._root
+        while node:
+            k = 0 if lo is None else bisect_left(node.values, lo)
+            stack.append([node, k])
+            node = node.childs[k] if node.childs else None
+        while stack:
+            entry = stack[-1]
+            node, k = entry
+            if k >= len(node.values):
+                stack.pop()
+                continue
+            value = node.values[k]
+            if hi is not None and value > hi:
+                return
+            yield value
+            entry[1] = k + 1
+            if node.childs:
+                self._push_left(stack, node.childs[k + 1])
+
+    def __reversed__(self):
+        """按降序返回树中的值"""
+        stack = []
+        self._push_right(stack, self._root)
+        while stack:
+            entry = stack[-1]
+            node, k = entry
+            if node.is_leaf():
+                for value in reversed(node.values):
+                    yield value
+                stack.pop()
+            elif k > 0:
+                yield node.values[k - 1]
+                entry[1] = k - 1
+                self._push_right(stack, node.childs[k - 1])
+            else:
+                stack.pop()
+
+    @staticmethod
+    def _push_left(stack, node):
+        """沿最左侧的孩子节点下降，将经过的节点入栈"""
+        while node:
+            stack.append([node, 0])
+            node = node.childs[0] if node.childs else None
+
+    @staticmethod
+    def _push_right(stack, node):
+        """沿最右侧的孩子节点下降，将经过的节点入栈"""
+        while node:
+            stack.append([node, len(node.values)])
+            node = node.childs[-1] if node.childs else None
+
+    def _children(self, node):
+        """B树节点的孩子节点"""
+        return node.childs
+
+    def _count_fill(self, parent, k):
+        """统计一次修复是借值还是合并，与_fill_node的判定条件相同"""
+        brother = parent.childs[k + 1] if len(parent.childs) > k + 1 else parent.childs[k - 1]
+        if len(brother.values) > math.ceil(self._m / 2) - 1:
+            self._stats.borrows += 1
+        else:
+            self._stats.merges += 1
+
+    def _node_capacity(self):
+        return self._m - 1
+
+    def _count_visits(self, value):
+        """查询value时访问的节点数量，在索引节点中命中时提前结束"""
+        visits = 0
+        node = self._root
+        while node:
+            visits += 1
+            k = bisect_left(node.values, value)
+            if k < len(node.values) and node.values[k] == value:
+                break
+            node = node.childs[k] if node.childs else None
+        return visits
+
+    def _iter_depth(self):
+        """
+        中序遍历生成器，栈中保存的恰好是根节点到当前节点的路径，栈的深度即为节点深度
+        :return: 生成器，返回(值, 关联的数据, 所在节点的深度)
+        """
+        stack = []
+        self._push_left(stack, self._root)
+        while stack:
+            entry = stack[-1]
+            node, k = entry
+            depth = len(stack) - 1
+            if node.is_leaf():
+                for value, data in zip(node.values, node.datas):
+                    yield value, data, depth
+                stack.pop()
+            elif k < len(node.values):
+                yield node.values[k], node.datas[k], depth
+                entry[1] = k + 1
+                self._push_left(stack, node.childs[k + 1])
+            else:
+                stack.pop()
+
+    def _dump_params(self):
+        return {'m': self._m}
+
+    def _dump_items(self):
+        for value, data, depth in self._iter_depth():
+            yield value, data
+
+    def _dump_meta(self):
+        """结构元数据：按中序排列的每个值所在节点的深度"""
+        return self._pack_depths(array('I', (depth for value, data, depth in self._iter_depth())))
+
+    def _load_state(self, pairs, meta):
+        """
+        根据中序序列和深度恢复B树的结构
+        同一深度上相邻的值之间只隔着更深的值时属于同一个节点，出现更浅的值时更深的节点已完整
+        :param pairs: 按中序排列的(值, 关联的数据)列表
+        :param meta: _dump_meta导出的结构元数据
+        """
+        depths, offset = self._unpack_depths(meta, len(pairs))
+        # 每一层当前正在填充的节点
+        levels = []
+        for i, (value, data) in enumerate(pairs):
+            depth = depths[i]
+            del levels[depth + 1:]
+            # 左侧子树中的值先于祖先节点出现，沿途创建还不存在的节点
+            while len(levels) <= depth:
+                node = BNode()
+                if levels:
+                    levels[-1].childs.append(node)
+                levels.append(node)
+            levels[depth].values.append(value)
+            levels[depth].datas.append(data)
+        self._root = levels[0] if levels else None
+        for node in self.iter_post_order():
+            self._resize(node)
+        self._count = len(pairs)
+
     def _delete(self, value: int):
         """
         删除一个节点
         :param value:值
         :return: value
         """
+        if not self._root:
+            return
         self._root = self.__delete_node(self._root, value)
         if not self._root.values and self._root.childs:
             self._root = self._root.childs[0]
@@ -148,37 +452,35 @@ class BalanceTree(Tree):
         """
         if not node:
             return None
-        # 遍历节点值
-        for k, v in enumerate(node.values):
-            # 当前节点为叶子节点且值命中时直接删除掉
-            if node.is_leaf():
-                if value == v:
-                    del node.values[k]
-                    break
-            else:
-                if value == v:
-                    # 寻找当前节点的后继节点, 并把节点的第一个值赋值到当前节点
-                    # print('当前值数量：{},孩子节点数量：{}'.format(len(node.values), len(node.childs)))
-                    # print('当前node：{},孩子节点数量：{}'.format(node.values, node.childs))
-                    after_node = self.get_after_node(node.childs[k+1])
-                    node.values[k] = after_node.values[0]
-                    # 将当前后继节点的值替换为当前节点，然后以当前节点的兄弟节点为删除节点开始重新开始递归
-                    node.childs[k + 1] = self.__delete_node(node.childs[k+1], after_node.values[0])
-                    break
-                elif value < v:
-                    node.childs[k] = self.__delete_node(node.childs[k], value)
-                    break
+        k = bisect_left(node.values, value)
+        found = k < len(node.values) and node.values[k] == value
+        # 当前节点为叶子节点且值命中时直接删除掉，未命中说明在树中不存在
+        if node.is_leaf():
+            if found:
+                del node.values[k]
+                del node.datas[k]
+                node.size -= 1
+                self._count -= 1
+            return node
+        count = self._count
+        if found:
+            # 寻找当前节点的后继节点, 并把节点的第一个值赋值到当前节点
+            after_node = self.get_after_node(node.childs[k+1])
+            after_value = after_node.values[0]
+            node.values[k] = after_value
+            node.datas[k] = after_node.datas[0]
+            # 将当前后继节点的值替换为当前节点，然后以当前节点的兄弟节点为删除节点开始重新开始递归
+            k += 1
+            node.childs[k] = self.__delete_node(node.childs[k], after_value)
         else:
-            # 当前节点为叶子节点时放弃继续删除，说明在树中不存在
-            if not node.is_leaf():
-                node.childs[-1] = self.__delete_node(node.childs[-1], value)
-
-        # 1、判定当前节点是否因删除节点导致节点阶数小于限制的阶数,若小于则触发修复动作
-        # print('修复前：当前node：{},孩子节点数量：{}'.format(node.values, node.childs))
-        for k, child in enumerate(node.childs):
-            if len(child.values) < math.ceil(self._m/2)-1:
-                self._fill_node(node, child, k)
-        # print('修复后：当前node：{},孩子节点数量：{}'.format(node.values, node.childs))
+            node.childs[k] = self.__delete_node(node.childs[k], value)
+        # 删除了值时子树大小减一
+        if self._count != count:
+            node.size -= 1
+
+        # 1、判定孩子节点是否因删除节点导致节点阶数小于限制的阶数,若小于则触发修复动作
+        if len(node.childs[k].values) < math.ceil(self._m/2)-1:
+            self._fill_node(node, node.childs[k], k)
         return node
 
     def _fill_node(self, parent, child, k):
@@ -189,53 +491,104 @@ class BalanceTree(Tree):
         :param k: 孩子节点所在的下标
         :return:
         """
+        if self._stats is not None:
+            self._count_fill(parent, k)
         # 当前child是parent最后一个孩子时向前找，否则向后找
         if len(parent.childs) > k+1:
             brother = parent.childs[k+1]
             # 当兄弟节点的阶数大于限制阶数时，从兄弟节点借一个作为新的父节点，老的父节点下沉到失衡的节点
             if len(brother.values) > math.ceil(self._m/2) - 1:
-                child.add_val(parent.values[k])
+                child.values.append(parent.values[k])
+                child.datas.append(parent.datas[k])
                 parent.values[k] = brother.values[0]
+                parent.datas[k] = brother.datas[0]
                 if not brother.is_leaf():
-                    child.add_child(brother.childs[0])
+                    child.childs.append(brother.childs[0])
                     del brother.childs[0]
                 del brother.values[0]
+                del brother.datas[0]
             else:
-                # 当兄弟节点的阶数小于或等于阶数时，合并两个兄弟节点和父节点
-                for v in child.values:
-                    brother.add_val(v)
-                for c in child.childs:
-                    brother.add_child(c)
-                # 添加父节点值
-                brother.add_val(parent.values[k])
+                # 当兄弟节点的阶数小于或等于阶数时，合并两个兄弟节点和父节点，父节点值位于两者之间
+                brother.values[0:0] = child.values + [parent.values[k]]
+                brother.datas[0:0] = child.datas + [parent.datas[k]]
+                brother.childs[0:0] = child.childs
                 del parent.values[k]
+                del parent.datas[k]
                 del parent.childs[k]
         else:
             brother = parent.childs[k-1]
             # 当兄弟节点的阶数大于最小限制阶数时，从兄弟节点借一个作为新的父节点，老的父节点下沉到失衡的节点
             if len(brother.values) > math.ceil(self._m/2) - 1:
-                child.add_val(parent.values[-1])
+                child.values.insert(0, parent.values[-1])
+                child.datas.insert(0, parent.datas[-1])
                 parent.values[-1] = brother.values[-1]
+                parent.datas[-1] = brother.datas[-1]
                 if not brother.is_leaf():
-                    child.add_child(brother.childs[-1])
+                    child.childs.insert(0, brother.childs[-1])
                     del brother.childs[-1]
                 del brother.values[-1]
+                del brother.datas[-1]
             else:
                 # 当兄弟节点的阶数小于或等于阶数时，合并两个兄弟节点和父节点
-                # 注意：从兄弟借一个节点的前提为兄弟为叶子节点
-                for v in child.values:
-                    brother.add_val(v)
-                for c in child.childs:
-                    brother.add_child(c)
-                # 添加父节点值
-                brother.add_val(parent.values[-1])
+                brother.values.append(parent.values[-1])
+                brother.values.extend(child.values)
+                brother.datas.append(parent.datas[-1])
+                brother.datas.extend(child.datas)
+                brother.childs.extend(child.childs)
                 del parent.values[-1]
+                del parent.datas[-1]
                 del parent.childs[k]
+        # 借值或合并只在两个兄弟节点之间移动值，父节点的子树大小不变
+        self._resize(child)
+        self._resize(brother)
 
+    def _rank(self, key, inclusive):
+        """
+        根据子树大小自顶向下统计排名，左侧孩子节点整棵子树直接累加
+        :param key: 键
+        :param inclusive: 是否统计等于key的值
+        :return: 小于(或等于)key的值的数量
+        """
+        rank = 0
+        node = self._root
+        while node:
+            values = node.values
+            k = bisect_left(values, key)
+            for child in node.childs[:k]:
+                rank += child.size
+            rank += k
+            if k < len(values) and values[k] == key:
+                if node.childs:
+                    rank += node.childs[k].size
+                return rank + (1 if inclusive else 0)
+            node = node.childs[k] if node.childs else None
+        return rank
+
+    def _select(self, k):
+        """
+        根据子树大小自顶向下查找第k小的值
+        :param k: 下标，0 <= k < len(self)
+        :return: value
+        """
+        node = self._root
+        while node:
+            if node.is_leaf():
+                return node.values[k]
+            for i, child in enumerate(node.childs):
+                if k < child.size:
+                    node = child
+                    break
+                k -= child.size
+                if k == 0:
+                    return node.values[i]
+                k -= 1
+            else:
+                break
+        raise IndexError('select index out of range')
 
     def get_after_node(self, node):
         """返回后继节点节点"""
-        assert isinstance(node, Node)
+        assert isinstance(node, BNode)
         while not node.is_leaf():
             node = node.childs[0]
         return node
@@ -247,10 +600,9 @@ if __name__ == '__main__':
     start = time.time()
     result = [num for num in range(1, 10001)]
     random.seed(1)
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.insert(num)
-        result.remove(num)
     print(time.time()-start)
     start = time.time()
     print(binary_tree.search(100))
@@ -262,10 +614,9 @@ if __name__ == '__main__':
     result = [num for num in range(1, 10001)]
     random.seed(1)
     bar = tqdm.trange(len(mid))
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.delete(num)
-        result.remove(num)
         # print(num)
         # print(binary_tree.mid_order())
         bar.update()
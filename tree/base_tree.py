@@ -1,37 +1,58 @@
 import abc
+import copy
+import os
+import sys
+from array import array
+from bisect import bisect_left
+
+from tree.codec import Writer, Reader
+from tree.frozen_index import FrozenIndex
 
 
 class Node:
     """
-    节点对象
+    节点对象，只保留所有二叉树都会用到的字段，各树按需在子类中通过__slots__扩展
         value:值
-        prev:前驱节点
-        next:后继节点
+        data:值关联的数据
+        left:左孩子
+        right:右孩子
     """
-    def __init__(self, value):
+    __slots__ = ('value', 'data', 'left', 'right')
+
+    def __init__(self, value, data=None):
         """
         创建节点
         :param value:
+        :param data: 关联的数据
         """
         self.value = value
-        self.prev = None
-        self.next = None
+        self.data = data
         self.left = None
         self.right = None
-        self.parent = None
-        self.height = 1
-        self.is_red = True
+
+    def copy(self):
+        """
+        浅复制节点，孩子节点仍然共享，写时复制模式使用
+        :return: 新的节点
+        """
+        node = object.__new__(type(self))
+        node.value = self.value
+        node.data = self.data
+        node.left = self.left
+        node.right = self.right
+        return node
 
 
 class IntNode(Node):
     """
-    int类型节点对象
+    int类型节点对象，二叉搜索树使用
         value:值
-        prev:前驱节点
-        next:后继节点
+        data:值关联的数据
     """
-    def __init__(self, value: int):
-        super(IntNode, self).__init__(value)
+    __slots__ = ()
+
+    def __init__(self, value: int, data=None):
+        super(IntNode, self).__init__(value, data)
 
     def __str__(self):
         return str(self.value)
@@ -40,24 +61,129 @@ class IntNode(Node):
         return str(self.value)
 
 
-class TrieNode(Node):
+class AvlNode(IntNode):
     """
-    字典树类型节点对象
-    nodes:子节点列表
+    平衡二叉树节点对象
+        height:以当前节点为根的子树高度
+        size:以当前节点为根的子树中值的数量
+    """
+    __slots__ = ('height', 'size')
+
+    def __init__(self, value: int, data=None):
+        super(AvlNode, self).__init__(value, data)
+        self.height = 1
+        self.size = 1
+
+    def copy(self):
+        node = object.__new__(type(self))
+        node.value = self.value
+        node.data = self.data
+        node.left = self.left
+        node.right = self.right
+        node.height = self.height
+        node.size = self.size
+        return node
+
+
+class RedBlackNode(IntNode):
+    """
+    红黑树节点对象
+        is_red:是否为红色节点
+        size:以当前节点为根的子树中值的数量
+    """
+    __slots__ = ('is_red', 'size')
+
+    def __init__(self, value: int, data=None):
+        super(RedBlackNode, self).__init__(value, data)
+        self.is_red = True
+        self.size = 1
+
+    def copy(self):
+        node = object.__new__(type(self))
+        node.value = self.value
+        node.data = self.data
+        node.left = self.left
+        node.right = self.right
+        node.is_red = self.is_red
+        node.size = self.size
+        return node
+
+
+class TrieNode:
+    """
+    字典树类型节点对象，不限定字母表，孩子节点的存储方式随数量自适应：
+    孩子节点较少时以有序字符串chars和并列的元组nodes保存，超过WIDE个时改为以字符为键的dict，没有孩子节点时nodes为None
+    char:当前节点的字符
+    chars:孩子节点的字符按升序组成的字符串，nodes为dict时为None
+    nodes:孩子节点元组或dict
     count:经过当前节点的单词数量
     word_count:词频
+    best:以当前节点为根的子树中单词的最大词频
     is_end:当前节点是否为结束节点(单词结束)
-    char:当前节点的字符
     """
+    __slots__ = ('char', 'chars', 'nodes', 'count', 'word_count', 'best', 'is_end')
+
+    # 孩子节点超过该数量时改用dict
+    WIDE = 32
+
     def __init__(self, char):
-        self.nodes = [None for x in range(27)]
+        self.char = char if char else None
+        self.chars = ''
+        self.nodes = None
         self.count = 0
-        self.is_end = False
         self.word_count = 0
-        if char:
-            self.char = char
+        self.best = 0
+        self.is_end = False
+
+    def get(self, char):
+        """
+        获取字符对应的孩子节点
+        :param char: 字符
+        :return: 孩子节点，不存在时返回None
+        """
+        nodes = self.nodes
+        if nodes is None:
+            return None
+        chars = self.chars
+        if chars is None:
+            return nodes.get(char)
+        k = chars.find(char)
+        return nodes[k] if k >= 0 else None
+
+    def add(self, char):
+        """
+        添加字符对应的孩子节点，调用方保证该孩子节点不存在
+        :param char: 字符
+        :return: 新的孩子节点
+        """
+        node = TrieNode(char)
+        nodes = self.nodes
+        if nodes is None:
+            self.chars = char
+            self.nodes = (node,)
+        elif self.chars is None:
+            nodes[char] = node
         else:
-            self.char = None
+            chars = self.chars
+            k = bisect_left(chars, char)
+            self.chars = chars[:k] + char + chars[k:]
+            self.nodes = nodes[:k] + (node,) + nodes[k:]
+            if len(self.nodes) > self.WIDE:
+                self.nodes = dict(zip(self.chars, self.nodes))
+                self.chars = None
+        return node
+
+    def children(self):
+        """
+        按字符升序返回孩子节点
+        :return: 孩子节点序列
+        """
+        nodes = self.nodes
+        if nodes is None:
+            return ()
+        if self.chars is None:
+            return [nodes[char] for char in sorted(nodes)]
+        return nodes
 
     def __str__(self):
         return str(self.char)
@@ -66,21 +192,30 @@ class TrieNode(Node):
         return str(self.char)
 
 
-class BNode(Node):
+class BNode:
     """
-    int类型节点对象
-        value:值
-        prev:前驱节点
-        next:后继节点
+    B树/B+树节点对象，值与孩子节点以有序列表并列存放，通过二分查找定位
+        values:有序的值列表
+        datas:与values并列的关联数据列表(B+树只有叶子节点保存)
+        childs:孩子节点列表，childs[k]位于values[k]的左侧
+        left:左侧叶子节点(B+树)
+        right:右侧叶子节点(B+树)
+        size:以当前节点为根的子树中值的数量
     """
-    def __init__(self, value: int=None):
+    __slots__ = ('parent', 'values', 'datas', 'childs', 'left', 'right', 'size')
+
+    def __init__(self, value: int=None, data=None):
         self.parent = None
         self.values = []
+        self.datas = []
         self.childs = []
         self.left = None
         self.right = None
-        if value:
-            self.add_val(value)
+        self.size = 0
+        if value is not None:
+            self.values.append(value)
+            self.datas.append(data)
+            self.size = 1
 
     def is_leaf(self):
         """判定是否为空节点"""
@@ -89,28 +224,79 @@ class BNode(Node):
         return True
 
     def add_val(self, value: int):
-        """添加一个值"""
-        self.values.append(value)
-        self.values = sorted(self.values)
+        """添加一个值，并返回他的下标"""
+        k = bisect_left(self.values, value)
+        self.values.insert(k, value)
+        return k
 
-    def add_child(self, node: Node):
+    def add_child(self, node):
         """添加一个子节点"""
-        self.childs.append(node)
-        self.childs = sorted(self.childs, key=lambda n: n.values[0])
+        value = node.values[0]
+        low, high = 0, len(self.childs)
+        while low < high:
+            mid = (low + high) // 2
+            if self.childs[mid].values[0] < value:
+                low = mid + 1
+            else:
+                high = mid
+        self.childs.insert(low, node)
+
+    def merge_values(self, values, lo, hi):
+        """
+        将有序值序列的[lo, hi)部分线性合并到叶子节点中，已存在的值只重置关联的数据
+        :return: 新增值的数量
+        """
+        old_values, old_datas = self.values, self.datas
+        new_values, new_datas = [], []
+        i, n = 0, len(old_values)
+        for j in range(lo, hi):
+            value = values[j]
+            while i < n and old_values[i] < value:
+                new_values.append(old_values[i])
+                new_datas.append(old_datas[i])
+                i += 1
+            if i < n and old_values[i] == value:
+                i += 1
+            new_values.append(value)
+            new_datas.append(None)
+        new_values.extend(old_values[i:])
+        new_datas.extend(old_datas[i:])
+        self.values, self.datas = new_values, new_datas
+        self.size = len(new_values)
+        return len(new_values) - n
+
+    def remove_values(self, values, lo, hi):
+        """
+        从叶子节点中删除有序值序列[lo, hi)部分包含的值
+        :return: 删除值的数量
+        """
+        new_values, new_datas = [], []
+        j = lo
+        for value, data in zip(self.values, self.datas):
+            while j < hi and values[j] < value:
+                j += 1
+            if j < hi and values[j] == value:
+                continue
+            new_values.append(value)
+            new_datas.append(data)
+        removed = len(self.values) - len(new_values)
+        self.values, self.datas = new_values, new_datas
+        self.size = len(new_values)
+        return removed
 
     def del_value(self, value):
         """删除一个值，并返回他的下标"""
-        for k, v in enumerate(self.values):
-            if value == v:
-                del self.values[k]
-                return k
+        k = bisect_left(self.values, value)
+        if k < len(self.values) and self.values[k] == value:
+            del self.values[k]
+            return k
         return None
 
     def find_value(self, value):
         """查找一个值"""
-        for k, v in enumerate(self.values):
-            if v == value:
-                return k, v
+        k = bisect_left(self.values, value)
+        if k < len(self.values) and self.values[k] == value:
+            return k, self.values[k]
         return None, None
 
     def __str__(self):
@@ -120,13 +306,73 @@ class BNode(Node):
         return str(self.values)
 
 
+class SkipNode:
+    """
+    跳表节点对象，层数在创建时确定
+    最底层是双向链表，单独用prev/next保存，范围扫描只需沿next前进，不必经过列表下标
+        value:值
+        data:值关联的数据
+        prev:最底层的前驱节点，第一个节点为None
+        next:最底层的后继节点
+        forward:第2层及以上的后继节点列表，forward[j]为第j+2层
+        width:与forward并列，每层到后继节点之间跨过的值的数量(包含后继节点)，用于rank/select，最底层总是1，不保存
+    """
+    __slots__ = ('value', 'data', 'prev', 'next', 'forward', 'width')
+
+    def __init__(self, value, data=None, level=1):
+        self.value = value
+        self.data = data
+        self.prev = None
+        self.next = None
+        self.forward = [None] * (level - 1)
+        self.width = [1] * (level - 1)
+
+    def __str__(self):
+        return str(self.value)
+
+    def __repr__(self):
+        return str(self.value)
+
+
+class TreeStats:
+    """
+    树的运行统计计数器，只在Tree.enable_stats()开启后累计
+        rotations:旋转次数
+        splits:拆分出的新节点数量
+        merges:合并次数
+        borrows:从兄弟节点借值的次数
+        searches:search调用次数
+        visits:search访问的节点总数
+    """
+    __slots__ = ('rotations', 'splits', 'merges', 'borrows', 'searches', 'visits')
+
+    def __init__(self):
+        self.rotations = 0
+        self.splits = 0
+        self.merges = 0
+        self.borrows = 0
+        self.searches = 0
+        self.visits = 0
+
+
+_missing = object()
+
+DUMP_MAGIC = b'TREEDMP1'
+
+
 class Tree:
     """
     树的基类
     """
+    # 写时复制模式下本次写入新复制出的节点id，为None时未开启写时复制
+    _owned = None
+    # 运行统计计数器，为None时未开启统计，各处只需判断一次是否为None
+    _stats = None
+
     def __init__(self):
         self._root = None
-        pass
+        # 树中值的数量，由各树在插入新值和删除值时维护
+        self._count = 0
 
     def insert(self, value):
         """
@@ -135,14 +381,432 @@ class Tree:
         """
         self._insert(value)
 
+    def put(self, key, data):
+        """
+        插入一个键值对，键已存在时覆盖关联的数据
+        :param key: 键
+        :param data: 关联的数据
+        """
+        self._insert(key, data)
+
+    def get(self, key, default=None):
+        """
+        查询键关联的数据
+        :param key: 键
+        :param default: 键不存在时返回的默认值
+        :return: 关联的数据
+        """
+        return self._get(key, default)
+
+    def __getitem__(self, key):
+        data = self._get(key, _missing)
+        if data is _missing:
+            raise KeyError(key)
+        return data
+
+    def __setitem__(self, key, data):
+        self.put(key, data)
+
+    def insert_many(self, iterable):
+        """
+        批量插入，批次只排序去重一次，再按键的顺序交给各树处理
+        :param iterable: 值序列
+        """
+        values = sorted(set(iterable))
+        if values:
+            self._insert_many(values)
+
+    def delete_many(self, iterable):
+        """
+        批量删除，批次只排序去重一次，再按键的顺序交给各树处理
+        :param iterable: 值序列
+        """
+        values = sorted(set(iterable))
+        if values and self._count:
+            self._delete_many(values)
+
+    def snapshot(self):
+        """
+        获取写时复制模式下的快照，快照与树共享全部节点
+        之后对树的写入只会复制节点，不会修改快照中的节点，读线程可以不加锁地在快照上查询和遍历
+        快照本身也可以继续写入，写入同样只复制节点，与原来的树互不影响
+        :return: 与树同类型的对象
+        """
+        if self._owned is None:
+            raise ValueError('snapshot requires copy_on_write=True')
+        root = self._root
+        snapshot = copy.copy(self)
+        snapshot._root = root
+        snapshot._count = self.size(root)
+        snapshot._owned = set()
+        return snapshot
+
+    def freeze(self):
+        """
+        冻结为只读的数组索引，值按升序保存在类型化数组中，单个查询使用bisect，不需要跟随节点指针；
+        安装了NumPy时search_many/contains_many额外使用Eytzinger布局的副本批量下降，详见tree.frozen_index
+        索引与树互不影响，之后对树的修改不会反映到索引中
+        :return: FrozenIndex对象
+        """
+        return FrozenIndex(self._dump_items())
+
+    def dump(self, path):
+        """
+        保存为紧凑的二进制文件，值均通过tree.codec编码，值和关联的数据只能是None、bool、int、float、str或bytes，
+        其他类型抛出TypeError且不会留下不完整的文件
+        格式：魔数、树的类型、构造参数的数量及(参数名, 参数值)、值的数量及按中序排列的(值, 关联的数据)、
+        结构元数据的长度及内容、crc32
+        :param path: 文件路径
+        """
+        self._write_dump(path, len(self), self._dump_items())
+
+    def _write_dump(self, path, count, items):
+        """
+        写入dump文件，写入失败或写入的数量与count不一致时删除不完整的文件，不会留下无法加载的文件
+        :param path: 文件路径
+        :param count: 值的数量
+        :param items: 按中序排列的(值, 关联的数据)序列
+        """
+        params = self._dump_params()
+        try:
+            with open(path, 'wb') as f:
+                writer = Writer(f)
+                writer.write(DUMP_MAGIC)
+                writer.value(self._dump_kind())
+                writer.count(len(params))
+                for name in sorted(params):
+                    writer.value(name)
+                    writer.value(params[name])
+                writer.count(count)
+                written = 0
+                for value, data in items:
+                    writer.value(value)
+                    writer.value(data)
+                    written += 1
+                if written != count:
+                    raise ValueError('tree changed during dump: expected {} items, got {}'.format(count, written))
+                meta = self._dump_meta()
+                writer.count(len(meta))
+                writer.write(meta)
+                writer.close()
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        读取dump保存的文件，根据中序序列和结构元数据线性时间批量构建，不逐个插入
+        文件中只有标量类型的值，解码不会执行任何代码，无法识别的内容抛出ValueError
+        :param path: 文件路径
+        :param kwargs: 覆盖文件中保存的构造参数
+        :return: 树对象
+        """
+        params, pairs, meta = cls._read_dump(path)
+        params.update(kwargs)
+        tree = cls(**params)
+        tree._load_state(pairs, meta)
+        return tree
+
+    @classmethod
+    def _read_dump(cls, path):
+        """
+        读取并校验dump保存的文件
+        :param path: 文件路径
+        :return: (构造参数, (值, 关联的数据)列表, 结构元数据)
+        """
+        with open(path, 'rb') as f:
+            reader = Reader(f.read())
+        if reader.read(len(DUMP_MAGIC)) != DUMP_MAGIC:
+            raise ValueError('not a tree dump file: {}'.format(path))
+        kind = reader.value()
+        if kind != cls._dump_kind():
+            raise ValueError('dump of {} can not be loaded by {}'.format(kind, cls._dump_kind()))
+        params = {}
+        for _ in range(reader.count()):
+            name = reader.value()
+            params[name] = reader.value()
+        pairs = [(reader.value(), reader.value()) for _ in range(reader.count())]
+        meta = reader.read(reader.count())
+        return params, pairs, meta
+
+    @classmethod
+    def _dump_kind(cls):
+        """树的类型，不同类型的dump文件不能互相加载"""
+        return '{}.{}'.format(cls.__module__, cls.__qualname__)
+
+    def _dump_params(self):
+        """
+        重新创建树时需要的构造参数
+        :return: dict
+        """
+        return {}
+
+    def _dump_items(self):
+        """
+        按中序返回(值, 关联的数据)
+        :return: 生成器
+        """
+        for node in self.iter_in_order():
+            yield node.value, node.data
+
+    def _dump_meta(self):
+        """
+        二叉树的结构元数据：按中序排列的节点深度，以及各树通过_dump_flag定义的标记位
+        中序序列加上深度即可唯一确定树的形状
+        :return: bytes
+        """
+        depths = array('I')
+        flags = bytearray()
+        stack = []
+        node, depth = self._root, 0
+        while stack or node:
+            while node:
+                stack.append((node, depth))
+                node, depth = node.left, depth + 1
+            node, depth = stack.pop()
+            depths.append(depth)
+            flags.append(self._dump_flag(node))
+            node, depth = node.right, depth + 1
+        return self._pack_depths(depths) + bytes(flags)
+
+    def _dump_flag(self, node):
+        """节点的标记位，例如红黑树节点的颜色"""
+        return 0
+
+    def _load_state(self, pairs, meta):
+        """
+        根据中序序列和节点深度线性时间恢复二叉树的形状：深度最小的节点为根，栈中保存当前最右侧的路径
+        :param pairs: 按中序排列的(值, 关联的数据)列表
+        :param meta: _dump_meta导出的结构元数据
+        """
+        depths, offset = self._unpack_depths(meta, len(pairs))
+        flags = meta[offset:]
+        stack = []
+        last = None
+        for i, (value, data) in enumerate(pairs):
+            depth = depths[i]
+            node = self._load_node(value, data, flags[i])
+            # 栈中更深的节点都位于当前节点的左子树中
+            last = None
+            while stack and stack[-1][1] >= depth:
+                last = stack.pop()[0]
+                self._load_fix(last)
+            node.left = last
+            if stack:
+                stack[-1][0].right = node
+            stack.append((node, depth))
+        while stack:
+            last = stack.pop()[0]
+            self._load_fix(last)
+        self._root = last
+        self._count = len(pairs)
+
+    def _load_node(self, value, data, flag):
+        """
+        加载时创建节点
+        :param flag: _dump_flag导出的标记位
+        :return: 节点
+        """
+        return IntNode(value, data)
+
+    def _load_fix(self, node):
+        """加载时子树完整后修复节点的高度、子树大小等字段"""
+        pass
+
+    @staticmethod
+    def _pack_depths(depths):
+        """
+        编码深度列表，最大深度小于256时每个深度只占1字节
+        :param depths: array('I')
+        :return: bytes，类型码(1字节)+小端数组
+        """
+        typecode = 'B' if not depths or max(depths) < 256 else 'I'
+        packed = array(typecode, depths)
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        return typecode.encode() + packed.tobytes()
+
+    @staticmethod
+    def _unpack_depths(meta, count):
+        """
+        解码深度列表
+        :param meta: 结构元数据
+        :param count: 深度的数量
+        :return: (深度数组, 之后内容的起始位置)
+        """
+        if not count:
+            return array('I'), 0
+        depths = array(chr(meta[0]))
+        end = 1 + depths.itemsize * count
+        depths.frombytes(meta[1:end])
+        if sys.byteorder == 'big':
+            depths.byteswap()
+        return depths, end
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, value):
+        return self._search(value) is not None
+
+    def __iter__(self):
+        """按升序返回树中的值"""
+        for node in self.iter_in_order():
+            yield node.value
+
+    def __reversed__(self):
+        """按降序返回树中的值"""
+        stack = []
+        node = self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.right
+            node = stack.pop()
+            yield node.value
+            node = node.left
+
     def search(self, value):
         """
         查询一个节点
         :param value:值
         :return: Node对象
         """
+        if self._stats is not None:
+            self._stats.searches += 1
+            self._stats.visits += self._count_visits(value)
         return self._search(value)
 
+    def search_many(self, keys):
+        """
+        批量查询，探测键只排序一次，再按键的顺序交给各树做一次合并遍历，相邻的键共享下降路径
+        :param keys: 键序列
+        :return: 列表，每一项为search(key)的结果，与keys的顺序一致
+        """
+        keys = list(keys)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        result = [None] * len(keys)
+        if keys and self._count:
+            found = self._search_sorted([keys[i] for i in order])
+            for i, value in zip(order, found):
+                result[i] = value
+        return result
+
+    def contains_many(self, keys):
+        """
+        批量判定是否存在
+        :param keys: 键序列
+        :return: bool列表，与keys的顺序一致
+        """
+        return [value is not None for value in self.search_many(keys)]
+
+    def _search_sorted(self, probes):
+        """
+        对有序的探测键做一次合并遍历：每个节点把当前区间内的键按节点的值一分为二，分别交给左右子树，
+        每个节点最多访问一次，多个键共享同一段下降路径
+        :param probes: 有序的探测键列表，可以包含重复值
+        :return: 与probes并列的_search结果列表
+        """
+        result = [None] * len(probes)
+        stack = [(self._root, 0, len(probes))]
+        while stack:
+            node, lo, hi = stack.pop()
+            if node is None:
+                continue
+            value = node.value
+            i = bisect_left(probes, value, lo, hi)
+            j = i
+            while j < hi and probes[j] == value:
+                result[j] = node
+                j += 1
+            if lo < i:
+                stack.append((node.left, lo, i))
+            if j < hi:
+                stack.append((node.right, j, hi))
+        return result
+
+    def enable_stats(self):
+        """开启运行统计，计数器清零"""
+        self._stats = TreeStats()
+
+    def disable_stats(self):
+        """关闭运行统计"""
+        self._stats = None
+
+    def stats(self):
+        """
+        统计信息
+        计数器只在enable_stats()开启后累计，未开启时为None：
+            rotations:旋转次数  splits:拆分出的新节点数量  merges:合并次数  borrows:借值次数
+            searches:search调用次数  visits_per_search:平均每次search访问的节点数量
+        结构信息在调用时遍历整棵树计算：
+            height:高度  nodes:节点数量
+            fill_histogram:节点填充率直方图，第i项为填充率位于[i/10, (i+1)/10)的节点数量(满节点计入最后一项)，
+            只有节点容纳多个值的树统计，其他为None
+        :return: dict
+        """
+        stats = self._stats
+        height, nodes, histogram = self._structure_stats()
+        return {
+            'rotations': stats.rotations if stats else None,
+            'splits': stats.splits if stats else None,
+            'merges': stats.merges if stats else None,
+            'borrows': stats.borrows if stats else None,
+            'searches': stats.searches if stats else None,
+            'visits_per_search': stats.visits / stats.searches if stats and stats.searches else None,
+            'height': height,
+            'nodes': nodes,
+            'fill_histogram': histogram,
+        }
+
+    def _structure_stats(self):
+        """
+        按层遍历统计高度、节点数量和填充率直方图
+        :return: (高度, 节点数量, 填充率直方图)
+        """
+        capacity = self._node_capacity()
+        histogram = [0] * 10 if capacity else None
+        height = nodes = 0
+        level = [self._root_node()] if self._root else []
+        while level:
+            height += 1
+            nodes += len(level)
+            lower = []
+            for node in level:
+                if histogram is not None:
+                    histogram[min(len(node.values) * 10 // capacity, 9)] += 1
+                lower.extend(self._children(node))
+            level = lower
+        return height, nodes, histogram
+
+    def _root_node(self):
+        """根节点对象，按层遍历的起点"""
+        return self._root
+
+    def _node_capacity(self):
+        """
+        每个节点最多容纳的值的数量，用于统计填充率
+        :return: 二叉树返回None
+        """
+        return None
+
+    def _count_visits(self, value):
+        """
+        查询value时访问的节点数量，只在开启统计时调用
+        :param value: 值
+        :return: 节点数量
+        """
+        visits = 0
+        node = self._root
+        while node:
+            visits += 1
+            if node.value == value:
+                break
+            node = node.left if node.value > value else node.right
+        return visits
+
     def delete(self, value):
         """
         查询一个节点
@@ -151,12 +815,68 @@ class Tree:
         """
         return self._delete(value)
 
+    def rank(self, key):
+        """
+        排名，即树中小于key的值的数量
+        :param key: 键，不要求在树中存在
+        :return: 数量
+        """
+        return self._rank(key, False)
+
+    def select(self, k):
+        """
+        第k小的值(从0开始)，支持负数下标
+        :param k: 下标
+        :return: value
+        """
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError('select index out of range')
+        return self._select(k)
+
+    def count_between(self, lo, hi):
+        """
+        统计闭区间[lo, hi]内值的数量
+        :param lo: 下界
+        :param hi: 上界
+        :return: 数量
+        """
+        if lo > hi:
+            return 0
+        return self._rank(hi, True) - self._rank(lo, False)
+
+    def range(self, lo=None, hi=None):
+        """
+        范围扫描，按升序返回闭区间[lo, hi]内的值
+        中序遍历时跳过小于lo的节点及其左子树，遇到大于hi的节点即结束，只访问区间内的节点和两条边界路径
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :return: 生成器
+        """
+        stack = []
+        node = self._root
+        while stack or node:
+            while node:
+                if lo is not None and node.value < lo:
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if hi is not None and node.value > hi:
+                return
+            yield node.value
+            node = node.right
+
     def pre_order(self):
         """
         先序遍历
         :return: Node对象列表
         """
-        pass
+        return list(self.iter_pre_order())
 
     def mid_order(self):
         """
@@ -171,13 +891,65 @@ class Tree:
         后续遍历
         :return: Node对象列表
         """
-        pass
+        return list(self.iter_post_order())
+
+    def iter_in_order(self):
+        """
+        中序遍历生成器，额外空间为树的高度
+        :return: 生成器
+        """
+        return self._iter_mid_order(self._root)
+
+    def iter_pre_order(self):
+        """
+        先序遍历生成器，栈中每层只保存一个孩子迭代器，额外空间为树的高度
+        :return: 生成器
+        """
+        if not self._root:
+            return
+        root = self._root_node()
+        yield root
+        stack = [iter(self._children(root))]
+        while stack:
+            for child in stack[-1]:
+                yield child
+                stack.append(iter(self._children(child)))
+                break
+            else:
+                stack.pop()
+
+    def iter_post_order(self):
+        """
+        后序遍历生成器，额外空间为树的高度
+        :return: 生成器
+        """
+        if not self._root:
+            return
+        root = self._root_node()
+        stack = [(root, iter(self._children(root)))]
+        while stack:
+            node, childs = stack[-1]
+            for child in childs:
+                stack.append((child, iter(self._children(child))))
+                break
+            else:
+                stack.pop()
+                yield node
+
+    def _children(self, node):
+        """
+        获取节点的孩子节点，遍历时使用
+        :param node: 节点
+        :return: 孩子节点列表
+        """
+        return [child for child in (node.left, node.right) if child]
 
     @abc.abstractmethod
-    def _insert(self, value):
+    def _insert(self, value, data=None):
         """
         插入一个值
         :param value: 值
+        :param data: 关联的数据
         :return: value
         """
         pass
@@ -200,13 +972,149 @@ class Tree:
         """
         pass
 
+    def _insert_many(self, values):
+        """
+        批量插入，默认按键的顺序逐个插入
+        :param values: 有序且不重复的值列表
+        """
+        insert = self._insert
+        for value in values:
+            insert(value)
+
+    def _delete_many(self, values):
+        """
+        批量删除，默认按键的顺序逐个删除
+        :param values: 有序且不重复的值列表
+        """
+        delete = self._delete
+        for value in values:
+            delete(value)
+
+    def _prefer_rebuild(self, batch_size):
+        """
+        判定批量操作是否应重建整棵树，重建的代价与树的规模线性相关，逐个操作的代价与批次规模线性相关
+        :param batch_size: 批次规模
+        :return: bool
+        """
+        return batch_size * 4 >= self._count
+
+    @staticmethod
+    def _merge_values(pairs, values):
+        """
+        合并有序的(值, 关联的数据)序列和有序的插入值，与insert一致，已存在的值关联的数据被重置为None
+        :param pairs: 有序的(值, 关联的数据)序列
+        :param values: 有序且不重复的插入值列表
+        :return: 合并后的(值, 关联的数据)列表
+        """
+        result = []
+        append = result.append
+        i, n = 0, len(values)
+        for value, data in pairs:
+            while i < n and values[i] < value:
+                append((values[i], None))
+                i += 1
+            if i < n and values[i] == value:
+                append((value, None))
+                i += 1
+            else:
+                append((value, data))
+        for j in range(i, n):
+            append((values[j], None))
+        return result
+
+    def _get(self, key, default):
+        """
+        查询键关联的数据，默认通过_search返回的节点读取
+        :param key: 键
+        :param default: 键不存在时返回的默认值
+        :return: 关联的数据
+        """
+        node = self._search(key)
+        if node is None:
+            return default
+        return node.data
+
+    def _rank(self, key, inclusive):
+        """
+        根据子树大小自顶向下统计排名
+        :param key: 键
+        :param inclusive: 是否统计等于key的值
+        :return: 小于(或等于)key的值的数量
+        """
+        size = self.size
+        rank = 0
+        node = self._root
+        while node:
+            if key < node.value:
+                node = node.left
+            elif key > node.value:
+                rank += size(node.left) + 1
+                node = node.right
+            else:
+                return rank + size(node.left) + (1 if inclusive else 0)
+        return rank
+
+    def _select(self, k):
+        """
+        根据子树大小自顶向下查找第k小的值
+        :param k: 下标，0 <= k < len(self)
+        :return: value
+        """
+        size = self.size
+        node = self._root
+        while node:
+            left = size(node.left)
+            if k < left:
+                node = node.left
+            elif k > left:
+                k -= left + 1
+                node = node.right
+            else:
+                return node.value
+        raise IndexError('select index out of range')
+
     def _mid_order(self, node, result):
-        if node:
-            self._mid_order(node.left, result)
-            result.append(node)
-            self._mid_order(node.right, result)
+        result.extend(self._iter_mid_order(node))
         return result
 
+    def _iter_mid_order(self, node):
+        """
+        中序遍历生成器，使用显式栈代替递归，额外空间为树的高度
+        :param node: 开始节点
+        :return: 生成器，按中序返回Node对象
+        """
+        stack = []
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
+
+    def _own(self, node):
+        """
+        获取本次写入可以修改的节点
+        写时复制模式下节点可能被快照共享，本次写入还没有复制过的节点先复制一份，普通模式下直接返回节点本身
+        :param node: 节点
+        :return: 可以修改的节点
+        """
+        owned = self._owned
+        if owned is None or node is None or id(node) in owned:
+            return node
+        node = node.copy()
+        owned.add(id(node))
+        return node
+
+    def _publish(self, root):
+        """
+        发布新的根节点，根节点的替换是原子的，读线程看到的要么是写入前的树要么是写入后的树
+        :param root: 新的根节点
+        """
+        self._root = root
+        if self._owned:
+            self._owned.clear()
+
     def find_right_last_node(self, node):
         """
         寻找节点的前驱节点
@@ -237,15 +1145,20 @@ class Tree:
         :param node: 不平衡节点
         """
         assert isinstance(node, Node)
-        left = node.left
+        if self._stats is not None:
+            self._stats.rotations += 1
+        node = self._own(node)
+        left = self._own(node.left)
         right = left.right
         # 右旋
         left.right = node
         node.left = right
 
-        # 更新变动的两个节点的高度
+        # 更新变动的两个节点的高度和子树大小
         node.height = max(self.height(node.left), self.height(node.right)) + 1
         left.height = max(self.height(left.left), self.height(left.right)) + 1
+        left.size = node.size
+        node.size = self.size(node.left) + self.size(node.right) + 1
         # 返回旋转后的节点
         return left
 
@@ -255,15 +1168,20 @@ class Tree:
         :param node: 不平衡节点
         """
         assert isinstance(node, Node)
-        right = node.right
+        if self._stats is not None:
+            self._stats.rotations += 1
+        node = self._own(node)
+        right = self._own(node.right)
         left = right.left
         # 左
         right.left = node
         node.right = left
 
-        # 更新变动的两个节点的高度
+        # 更新变动的两个节点的高度和子树大小
         node.height = max(self.height(node.left), self.height(node.right)) + 1
         right.height = max(self.height(right.left), self.height(right.right)) + 1
+        right.size = node.size
+        node.size = self.size(node.left) + self.size(node.right) + 1
         # 返回旋转后的节点
         return right
 
@@ -278,6 +1196,17 @@ class Tree:
         else:
             return 0
 
+    def size(self, node):
+        """
+        获取子树中值的数量
+        :param node:
+        :return:
+        """
+        if node:
+            return node.size
+        else:
+            return 0
+
     def balance_factor(self, node):
         """
         获取平衡因子
@@ -0,0 +1,96 @@
+"""
+批量插入/删除/查询评测
+各树引擎分别用逐个插入(删除、查询)的循环和insert_many(delete_many、search_many)处理同一批随机键，统计每秒操作数
+用法：python -m tree.bench.batch [n ...]，默认n为10000和100000，可传入10000000等更大的规模
+"""
+import random
+import sys
+import time
+
+from tree.bench.engines import ENGINES, make_factory
+
+
+def measure_loop(factory, insert_keys, delete_keys):
+    """
+    统计逐个插入和删除的吞吐量
+    :param factory: 创建树对象的工厂函数
+    :param insert_keys: 插入的键
+    :param delete_keys: 删除的键
+    :return: (插入每秒操作数, 删除每秒操作数)
+    """
+    tree = factory()
+    insert = tree.insert
+    start = time.perf_counter()
+    for key in insert_keys:
+        insert(key)
+    insert_cost = time.perf_counter() - start
+    delete = tree.delete
+    start = time.perf_counter()
+    for key in delete_keys:
+        delete(key)
+    delete_cost = time.perf_counter() - start
+    return len(insert_keys) / insert_cost, len(delete_keys) / delete_cost
+
+
+def measure_batch(factory, insert_keys, delete_keys):
+    """
+    统计批量插入和删除的吞吐量，计时包含批次的排序
+    :param factory: 创建树对象的工厂函数
+    :param insert_keys: 插入的键
+    :param delete_keys: 删除的键
+    :return: (插入每秒操作数, 删除每秒操作数)
+    """
+    tree = factory()
+    start = time.perf_counter()
+    tree.insert_many(insert_keys)
+    insert_cost = time.perf_counter() - start
+    start = time.perf_counter()
+    tree.delete_many(delete_keys)
+    delete_cost = time.perf_counter() - start
+    return len(insert_keys) / insert_cost, len(delete_keys) / delete_cost
+
+
+def measure_search(factory, insert_keys, probes):
+    """
+    统计逐个查询和批量查询的吞吐量，批量查询的计时包含批次的排序和结果的还原
+    :param factory: 创建树对象的工厂函数
+    :param insert_keys: 插入的键
+    :param probes: 查询的键
+    :return: (逐个查询每秒操作数, 批量查询每秒操作数)
+    """
+    tree = factory()
+    tree.insert_many(insert_keys)
+    search = tree.search
+    start = time.perf_counter()
+    for key in probes:
+        search(key)
+    loop_cost = time.perf_counter() - start
+    start = time.perf_counter()
+    tree.search_many(probes)
+    batch_cost = time.perf_counter() - start
+    return len(probes) / loop_cost, len(probes) / batch_cost
+
+
+def main(sizes=(10000, 100000), seed=1):
+    rnd = random.Random(seed)
+    print('{:>8} {:>18} {:>14} {:>14} {:>14} {:>14} {:>14} {:>14}'.format(
+        'n', 'engine', 'loop insert', 'batch insert', 'loop delete', 'batch delete', 'loop search', 'batch search'))
+    for n in sizes:
+        insert_keys = list(range(n))
+        rnd.shuffle(insert_keys)
+        # 删除一半的键，批次规模与剩余的树规模相当
+        delete_keys = insert_keys[:n // 2]
+        rnd.shuffle(delete_keys)
+        # 约一半命中
+        probes = [rnd.randrange(2 * n) for _ in range(n)]
+        for name, module, cls, kwargs in ENGINES:
+            factory = make_factory(module, cls, kwargs)
+            loop_insert, loop_delete = measure_loop(factory, insert_keys, delete_keys)
+            batch_insert, batch_delete = measure_batch(factory, insert_keys, delete_keys)
+            loop_search, batch_search = measure_search(factory, insert_keys, probes)
+            print('{:>8} {:>18} {:>14.0f} {:>14.0f} {:>14.0f} {:>14.0f} {:>14.0f} {:>14.0f}'.format(
+                n, name, loop_insert, batch_insert, loop_delete, batch_delete, loop_search, batch_search))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or (10000, 100000))
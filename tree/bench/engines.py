@@ -0,0 +1,40 @@
+"""
+评测使用的树引擎列表
+"""
+import importlib
+
+
+# (名称, 模块路径, 类名, 构造参数)
+ENGINES = [
+    ('BinaryTree', 'tree.binary_tree.binary_search_tree', 'BinaryTree', {}),
+    ('AVL', 'tree.avl_binary_tree.avg_binary_tree', 'AverageBinaryTree', {}),
+    ('ArrayAVL', 'tree.avl_binary_tree.array_avg_binary_tree', 'ArrayAverageBinaryTree', {}),
+    ('RedBlack', 'tree.red_black_tree.red_black_tree', 'AverageBinaryTree', {}),
+    ('BTree(m=5)', 'tree.b_tree.balance_tree', 'BalanceTree', {'m': 5}),
+    ('BTree(m=64)', 'tree.b_tree.balance_tree', 'BalanceTree', {'m': 64}),
+    ('BPlusTree(m=5)', 'tree.b+_tree.balance_plus_tree', 'BalancePlusTree', {'m': 5}),
+    ('BPlusTree(m=64)', 'tree.b+_tree.balance_plus_tree', 'BalancePlusTree', {'m': 64}),
+    ('SkipList', 'tree.skip_list.skip_list', 'SkipList', {'seed': 1}),
+]
+
+
+def load_engine(module, name):
+    """
+    加载树引擎类，b+_tree不是合法的标识符，只能通过importlib导入
+    :param module: 模块路径
+    :param name: 类名
+    :return: 树的类型
+    """
+    return getattr(importlib.import_module(module), name)
+
+
+def make_factory(module, name, kwargs):
+    """
+    生成创建树对象的工厂函数
+    :param module: 模块路径
+    :param name: 类名
+    :param kwargs: 构造参数
+    :return: 工厂函数
+    """
+    cls = load_engine(module, name)
+    return lambda: cls(**kwargs)
@@ -0,0 +1,59 @@
+"""
+冻结索引查询评测
+各树引擎插入n个随机键后调用freeze()，分别统计树的search、冻结索引的search和search_many的每秒查询数
+安装了NumPy时search_many为向量化查询
+用法：python -m tree.bench.frozen [n]
+"""
+import random
+import sys
+import time
+
+from tree import frozen_index
+from tree.bench.engines import ENGINES, make_factory
+
+
+def measure(factory, keys, probes):
+    """
+    统计查询吞吐量
+    :param factory: 创建树对象的工厂函数
+    :param keys: 插入的键
+    :param probes: 查询的键
+    :return: (树search每秒查询数, 冻结索引search每秒查询数, search_many每秒查询数, 冻结耗时)
+    """
+    tree = factory()
+    tree.insert_many(keys)
+    search = tree.search
+    start = time.perf_counter()
+    for key in probes:
+        search(key)
+    tree_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frozen = tree.freeze()
+    freeze_cost = time.perf_counter() - start
+    search = frozen.search
+    start = time.perf_counter()
+    for key in probes:
+        search(key)
+    frozen_cost = time.perf_counter() - start
+    start = time.perf_counter()
+    frozen.search_many(probes)
+    many_cost = time.perf_counter() - start
+    n = len(probes)
+    return n / tree_cost, n / frozen_cost, n / many_cost, freeze_cost
+
+
+def main(n=100000, seed=1):
+    rnd = random.Random(seed)
+    keys = [2 * i for i in range(n)]
+    rnd.shuffle(keys)
+    probes = [rnd.randrange(2 * n) for _ in range(n)]
+    print('numpy：', 'yes' if frozen_index.np is not None else 'no')
+    print('{:>18} {:>14} {:>14} {:>14} {:>10}'.format('engine', 'tree ops/s', 'frozen ops/s', 'many ops/s', 'freeze(s)'))
+    for name, module, cls, kwargs in ENGINES:
+        tree_ops, frozen_ops, many_ops, freeze_cost = measure(make_factory(module, cls, kwargs), keys, probes)
+        print('{:>18} {:>14.0f} {:>14.0f} {:>14.0f} {:>10.3f}'.format(name, tree_ops, frozen_ops, many_ops, freeze_cost))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,40 @@
+"""
+内存占用评测
+使用tracemalloc统计各树引擎插入n个随机键后，平均每个键占用的字节数
+用法：python -m tree.bench.memory [n]
+"""
+import random
+import sys
+import tracemalloc
+
+from tree.bench.engines import ENGINES, make_factory
+
+
+def measure(factory, keys):
+    """
+    统计插入所有键后平均每个键占用的字节数
+    :param factory: 创建树对象的工厂函数
+    :param keys: 插入的键
+    :return: 每个键占用的字节数
+    """
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    tree = factory()
+    for key in keys:
+        tree.insert(key)
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return used / len(keys)
+
+
+def main(n=100000, seed=1):
+    # 键本身的内存不计入统计
+    keys = list(range(n))
+    random.Random(seed).shuffle(keys)
+    print('{:>18} {:>12}'.format('engine', 'bytes/key'))
+    for name, module, cls, kwargs in ENGINES:
+        print('{:>18} {:>12.1f}'.format(name, measure(make_factory(module, cls, kwargs), keys)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
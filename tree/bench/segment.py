@@ -0,0 +1,60 @@
+"""
+字典树分词评测
+随机生成词典和由词典中的单词与噪声字符拼接成的文本，比较截取子串反复查询的forward_split_content/backward_split_content
+与逐字符下降的forward_segment/backward_segment，统计每秒处理的字符数
+用法：python -m tree.bench.segment [文本长度 ...]，默认1000和5000，原有方法的耗时与文本长度的平方成正比
+"""
+import random
+import sys
+import time
+
+from tree.trie_tree.trie_tree import TrieTree
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def prepare(length, words=5000, seed=1):
+    """
+    生成词典和文本，文本中约90%的片段为词典中的单词
+    :param length: 文本长度
+    :param words: 词典中的单词数量
+    :return: (字典树, 文本)
+    """
+    rnd = random.Random(seed)
+    tree = TrieTree()
+    dictionary = [''.join(rnd.choice(ALPHABET) for _ in range(rnd.randint(2, 8))) for _ in range(words)]
+    tree.insert_many(dictionary)
+    parts = []
+    size = 0
+    while size < length:
+        part = rnd.choice(dictionary) if rnd.random() < 0.9 else rnd.choice(ALPHABET)
+        parts.append(part)
+        size += len(part)
+    return tree, ''.join(parts)[:length]
+
+
+def measure(method, content):
+    """
+    统计分词的吞吐量
+    :param method: 分词方法
+    :param content: 文本
+    :return: (每秒处理的字符数, 单词数量)
+    """
+    start = time.perf_counter()
+    count = sum(1 for _ in method(content))
+    return len(content) / (time.perf_counter() - start), count
+
+
+def main(lengths=(1000, 5000)):
+    print('{:>8} {:>24} {:>14} {:>8}'.format('length', 'method', 'chars/s', 'words'))
+    for length in lengths:
+        tree, content = prepare(length)
+        # 创建逆序字典树不计入逆向匹配的耗时
+        tree._reverse_root()
+        for name in ['forward_split_content', 'forward_segment', 'backward_split_content', 'backward_segment']:
+            chars, count = measure(getattr(tree, name), content)
+            print('{:>8} {:>24} {:>14.0f} {:>8}'.format(length, name, chars, count))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or (1000, 5000))
@@ -0,0 +1,108 @@
+"""
+并发读评测
+一个写线程持续随机插入/删除，多个读线程持续随机查询，统计读写吞吐量
+    lock:普通模式，读写都要获取同一把全局锁
+    cow:写时复制模式，写线程之间仍然互斥，读线程在snapshot()获取的快照上无锁查询
+用法：python -m tree.bench.snapshot [n] [秒数]
+"""
+import random
+import sys
+import threading
+import time
+
+from tree.bench.engines import load_engine
+
+ENGINES = [
+    ('AVL', 'tree.avl_binary_tree.avg_binary_tree', 'AverageBinaryTree'),
+    ('RedBlack', 'tree.red_black_tree.red_black_tree', 'AverageBinaryTree'),
+]
+
+# 读线程每查询多少次刷新一次快照
+REFRESH = 256
+
+
+def writer(tree, lock, n, stop, counter, seed):
+    """写线程：随机插入或删除[0, 2n)内的键"""
+    rnd = random.Random(seed)
+    ops = 0
+    while not stop.is_set():
+        key = rnd.randrange(2 * n)
+        with lock:
+            if rnd.random() < 0.5:
+                tree.insert(key)
+            else:
+                tree.delete(key)
+        ops += 1
+    counter.append(ops)
+
+
+def locked_reader(tree, lock, n, stop, counter, seed):
+    """读线程：每次查询都获取全局锁"""
+    rnd = random.Random(seed)
+    ops = 0
+    while not stop.is_set():
+        key = rnd.randrange(2 * n)
+        with lock:
+            tree.search(key)
+        ops += 1
+    counter.append(ops)
+
+
+def snapshot_reader(tree, lock, n, stop, counter, seed):
+    """读线程：在快照上无锁查询，定期刷新快照以看到新的写入"""
+    rnd = random.Random(seed)
+    ops = 0
+    while not stop.is_set():
+        snapshot = tree.snapshot()
+        search = snapshot.search
+        for _ in range(REFRESH):
+            search(rnd.randrange(2 * n))
+        ops += REFRESH
+    counter.append(ops)
+
+
+def measure(cls, cow, readers, n, seconds, seed=1):
+    """
+    统计读写吞吐量
+    :param cls: 树的类型
+    :param cow: 是否开启写时复制模式
+    :param readers: 读线程数量
+    :param n: 初始键的数量
+    :param seconds: 评测时长(秒)
+    :return: (读每秒操作数, 写每秒操作数)
+    """
+    rnd = random.Random(seed)
+    tree = cls(copy_on_write=cow)
+    tree.insert_many(rnd.sample(range(2 * n), n))
+    lock = threading.Lock()
+    stop = threading.Event()
+    reads, writes = [], []
+    reader = snapshot_reader if cow else locked_reader
+    threads = [threading.Thread(target=writer, args=(tree, lock, n, stop, writes, seed))]
+    threads += [threading.Thread(target=reader, args=(tree, lock, n, stop, reads, seed + i + 1))
+                for i in range(readers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    cost = time.perf_counter() - start
+    return sum(reads) / cost, sum(writes) / cost
+
+
+def main(n=100000, seconds=2.0, reader_counts=(1, 4, 8)):
+    print('{:>10} {:>6} {:>8} {:>14} {:>14}'.format('engine', 'mode', 'readers', 'read ops/s', 'write ops/s'))
+    for name, module, cls in ENGINES:
+        cls = load_engine(module, cls)
+        for readers in reader_counts:
+            for cow in (False, True):
+                read_ops, write_ops = measure(cls, cow, readers, n, seconds)
+                print('{:>10} {:>6} {:>8} {:>14.0f} {:>14.0f}'.format(
+                    name, 'cow' if cow else 'lock', readers, read_ops, write_ops))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 2.0)
@@ -0,0 +1,204 @@
+"""
+统一的微基准评测
+所有树引擎依次运行相同的负载，统计每秒操作数、p50/p99单次操作延迟和tracemalloc记录的内存峰值，结果可以写入JSON用于跟踪性能回归
+负载：
+    random:随机顺序插入n个键
+    sorted:升序插入n个键
+    zipf:按zipf分布插入n次，热点键被反复覆盖
+    lookup:n个随机键的树中查询n个随机键，约一半命中
+    delete:n个随机键的树中按随机顺序删除全部键
+    range:n个随机键的树中做范围扫描，每次返回约RANGE_WIDTH个值
+    mixed:n/2个随机键的树中执行n次操作，查询、插入、删除的比例为5:3:2
+延迟由每次操作前后的perf_counter计时，每秒操作数为操作次数除以延迟之和，不包含负载生成和计时循环本身的开销
+内存峰值在关闭计时的单独一轮中统计，包含预先构建的树
+用法：python -m tree.bench.suite [-n N] [--engines 名称 ...] [--workloads 负载 ...] [--output 文件] [--no-memory]
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from bisect import bisect_left
+from itertools import accumulate
+
+from tree.bench.engines import ENGINES, make_factory
+
+WORKLOADS = ['random', 'sorted', 'zipf', 'lookup', 'delete', 'range', 'mixed']
+
+# 范围扫描返回的值的数量(键的间隔为2时)
+RANGE_WIDTH = 100
+ZIPF_S = 1.1
+
+# 二叉搜索树在有序输入下退化为链表，插入为O(n²)
+SKIP = {('BinaryTree', 'sorted')}
+
+
+def zipf_keys(n, rnd, s=ZIPF_S):
+    """
+    生成n个服从zipf分布的键，排名为i的键出现的概率与1/i^s成正比，排名与键的对应关系随机
+    :return: 键列表
+    """
+    cum_weights = list(accumulate(1.0 / (i + 1) ** s for i in range(n)))
+    total = cum_weights[-1]
+    ranked = list(range(n))
+    rnd.shuffle(ranked)
+    return [ranked[bisect_left(cum_weights, rnd.random() * total)] for _ in range(n)]
+
+
+def prepare(workload, n, seed):
+    """
+    生成负载的输入，键统一取偶数，查询时奇数键必然不命中
+    :return: (预先插入的键, 操作列表[(操作名, 键)])
+    """
+    rnd = random.Random(seed)
+    keys = [2 * i for i in range(n)]
+    rnd.shuffle(keys)
+    if workload == 'random':
+        return [], [('insert', key) for key in keys]
+    if workload == 'sorted':
+        return [], [('insert', key) for key in sorted(keys)]
+    if workload == 'zipf':
+        return [], [('insert', 2 * key) for key in zipf_keys(n, rnd)]
+    if workload == 'lookup':
+        return keys, [('search', rnd.randrange(2 * n)) for _ in range(n)]
+    if workload == 'delete':
+        deletes = list(keys)
+        rnd.shuffle(deletes)
+        return keys, [('delete', key) for key in deletes]
+    if workload == 'range':
+        scans = max(n // RANGE_WIDTH, 1) * 10
+        return keys, [('range', rnd.randrange(2 * n)) for _ in range(scans)]
+    if workload == 'mixed':
+        ops = []
+        for _ in range(n):
+            x = rnd.random()
+            name = 'search' if x < 0.5 else 'insert' if x < 0.8 else 'delete'
+            ops.append((name, rnd.randrange(2 * n)))
+        return keys[:n // 2], ops
+    raise ValueError('unknown workload: {}'.format(workload))
+
+
+def bind(tree):
+    """
+    将操作名映射到树的方法
+    :return: dict
+    """
+    width = 2 * RANGE_WIDTH
+
+    def scan(key):
+        for _ in tree.range(key, key + width):
+            pass
+    return {'insert': tree.insert, 'search': tree.search, 'delete': tree.delete, 'range': scan}
+
+
+def build(factory, keys):
+    tree = factory()
+    for key in keys:
+        tree.insert(key)
+    return tree
+
+
+def run(factory, preload, ops):
+    """
+    执行一轮负载并记录每次操作的延迟
+    :return: 延迟列表(秒)
+    """
+    tree = build(factory, preload)
+    methods = bind(tree)
+    clock = time.perf_counter
+    latencies = []
+    append = latencies.append
+    for name, key in ops:
+        method = methods[name]
+        start = clock()
+        method(key)
+        append(clock() - start)
+    return latencies
+
+
+def peak_memory(factory, preload, ops):
+    """
+    统计一轮负载中tracemalloc记录的内存峰值，不计入输入数据本身
+    :return: 字节数
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    tree = build(factory, preload)
+    methods = bind(tree)
+    for name, key in ops:
+        methods[name](key)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peak
+
+
+def percentile(ordered, p):
+    """有序列表的p分位数(最近秩)"""
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+
+def measure(factory, workload, n, seed, memory=True):
+    """
+    运行一个引擎的一个负载
+    :return: 结果dict
+    """
+    preload, ops = prepare(workload, n, seed)
+    latencies = run(factory, preload, ops)
+    ordered = sorted(latencies)
+    result = {
+        'ops': len(ops),
+        'ops_per_sec': len(ops) / sum(latencies),
+        'p50_us': percentile(ordered, 0.50) * 1e6,
+        'p99_us': percentile(ordered, 0.99) * 1e6,
+        'peak_bytes': None,
+    }
+    if memory:
+        result['peak_bytes'] = peak_memory(factory, preload, ops)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m tree.bench.suite', description='树引擎统一微基准评测')
+    parser.add_argument('-n', type=int, default=100000, help='键的数量')
+    parser.add_argument('--engines', nargs='+', help='只评测指定的引擎，默认全部')
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='结果写入的JSON文件')
+    parser.add_argument('--no-memory', action='store_true', help='不统计内存峰值')
+    args = parser.parse_args(argv)
+
+    engines = [engine for engine in ENGINES if not args.engines or engine[0] in args.engines]
+    report = {
+        'n': args.n,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': [],
+    }
+    print('{:>16} {:>8} {:>12} {:>10} {:>10} {:>12}'.format(
+        'engine', 'workload', 'ops/s', 'p50(us)', 'p99(us)', 'peak(KiB)'))
+    for name, module, cls, kwargs in engines:
+        factory = make_factory(module, cls, kwargs)
+        for workload in args.workloads:
+            if (name, workload) in SKIP:
+                report['results'].append({'engine': name, 'workload': workload, 'skipped': True})
+                print('{:>16} {:>8} {:>12}'.format(name, workload, 'skipped'))
+                continue
+            result = measure(factory, workload, args.n, args.seed, not args.no_memory)
+            report['results'].append(dict(engine=name, workload=workload, **result))
+            peak = '-' if result['peak_bytes'] is None else '{:.0f}'.format(result['peak_bytes'] / 1024)
+            print('{:>16} {:>8} {:>12.0f} {:>10.2f} {:>10.2f} {:>12}'.format(
+                name, workload, result['ops_per_sec'], result['p50_us'], result['p99_us'], peak))
+            sys.stdout.flush()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    main()
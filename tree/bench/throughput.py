@@ -0,0 +1,48 @@
+"""
+插入/删除吞吐量评测
+各树引擎依次插入n个随机键，再按另一随机顺序删除全部键，统计每秒操作数
+用法：python -m tree.bench.throughput [n]
+"""
+import random
+import sys
+import time
+
+from tree.bench.engines import ENGINES, make_factory
+
+
+def measure(factory, insert_keys, delete_keys):
+    """
+    统计插入和删除的吞吐量
+    :param factory: 创建树对象的工厂函数
+    :param insert_keys: 插入顺序
+    :param delete_keys: 删除顺序
+    :return: (插入每秒操作数, 删除每秒操作数)
+    """
+    tree = factory()
+    insert = tree.insert
+    start = time.perf_counter()
+    for key in insert_keys:
+        insert(key)
+    insert_cost = time.perf_counter() - start
+    delete = tree.delete
+    start = time.perf_counter()
+    for key in delete_keys:
+        delete(key)
+    delete_cost = time.perf_counter() - start
+    return len(insert_keys) / insert_cost, len(delete_keys) / delete_cost
+
+
+def main(n=100000, seed=1):
+    rnd = random.Random(seed)
+    insert_keys = list(range(n))
+    rnd.shuffle(insert_keys)
+    delete_keys = list(insert_keys)
+    rnd.shuffle(delete_keys)
+    print('{:>18} {:>14} {:>14}'.format('engine', 'insert ops/s', 'delete ops/s'))
+    for name, module, cls, kwargs in ENGINES:
+        insert_ops, delete_ops = measure(make_factory(module, cls, kwargs), insert_keys, delete_keys)
+        print('{:>18} {:>14.0f} {:>14.0f}'.format(name, insert_ops, delete_ops))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
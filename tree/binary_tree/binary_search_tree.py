@@ -9,32 +9,37 @@ class BinaryTree(Tree):
     """
     def __init__(self):
         self._root = None
+        self._count = 0
 
-    def _insert(self, value: int):
+    def _insert(self, value: int, data=None):
         """
-        插入一个值
+        插入一个值，自顶向下寻找插入位置
         :param value: 值
+        :param data: 关联的数据
         :return: value
         """
-        self._root = self.__put(self._root, value)
-
-    def __put(self, node, new_value):
-        """
-        放置一个新的节点
-        :param node:
-        :param new_node:
-        :return: 新的根节点
-        """
-        # 先将新值插入
-        if node is None:
-            return IntNode(new_value)
-        if node.value > new_value:
-            node.left = self.__put(node.left, new_value)
-        elif node.value < new_value:
-            node.right = self.__put(node.right, new_value)
-        else:
-            node.value = new_value
-        return node
+        if self._root is None:
+            self._root = IntNode(value, data)
+            self._count += 1
+            return
+        node = self._root
+        while True:
+            if node.value > value:
+                if node.left is None:
+                    node.left = IntNode(value, data)
+                    self._count += 1
+                    return
+                node = node.left
+            elif node.value < value:
+                if node.right is None:
+                    node.right = IntNode(value, data)
+                    self._count += 1
+                    return
+                node = node.right
+            else:
+                node.value = value
+                node.data = data
+                return
 
     def _search(self, value: int):
         """
@@ -65,31 +70,71 @@ class BinaryTree(Tree):
         :param value:值
         :return: value
         """
-        self._root = self.__delete_node(self._root, value)
+        parent = None
+        node = self._root
+        while node and node.value != value:
+            parent = node
+            if node.value > value:
+                node = node.left
+            else:
+                node = node.right
+        if node is None:
+            return
+        self._count -= 1
+        if node.left and node.right:
+            # 使用前驱节点的值替换当前节点，并断开前驱节点
+            prev = self.find_right_last_node(node)
+            self.remove_prev_node(node)
+            node.value = prev.value
+            node.data = prev.data
+            return
+        # 最多只有一个孩子时，用孩子替换当前节点
+        child = node.left if node.left else node.right
+        if parent is None:
+            self._root = child
+        elif parent.left is node:
+            parent.left = child
+        else:
+            parent.right = child
+
+    def _insert_many(self, values):
+        """
+        批量插入，有序插入会使二叉搜索树退化为链表，因此按中间值优先的顺序插入有序批次
+        :param values: 有序且不重复的值列表
+        """
+        stack = [(0, len(values))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo < hi:
+                mid = (lo + hi) // 2
+                self._insert(values[mid])
+                stack.append((mid + 1, hi))
+                stack.append((lo, mid))
 
-    def __delete_node(self, node, value):
+    def _rank(self, key, inclusive):
         """
-        递归删除一个节点
-        :param node: 当前节点
-        :param value: 删除的值
-        :return:
+        二叉搜索树的节点不记录子树大小，按中序遍历统计排名
+        :param key: 键
+        :param inclusive: 是否统计等于key的值
+        :return: 小于(或等于)key的值的数量
         """
-        if node is None:
-            return None
-        if node.value > value:
-            node.left = self.__delete_node(node.left, value)
-        elif node.value < value:
-            node.right = self.__delete_node(node.right, value)
-        elif node.value == value:
-            if node.left and node.right:
-                prev = self.find_right_last_node(node)
-                self.remove_prev_node(node)
-                node.value = prev.value
-                return node
-            elif node.left:
-                return node.left
-            else:
-                return node.right
+        rank = 0
+        for node in self.iter_in_order():
+            if node.value > key or (node.value == key and not inclusive):
+                break
+            rank += 1
+        return rank
+
+    def _select(self, k):
+        """
+        二叉搜索树的节点不记录子树大小，按中序遍历查找第k小的值
+        :param k: 下标
+        :return: value
+        """
+        for i, node in enumerate(self.iter_in_order()):
+            if i == k:
+                return node.value
+        raise IndexError('select index out of range')
 
 
 if __name__ == '__main__':
@@ -98,10 +143,9 @@ if __name__ == '__main__':
     start = time.time()
     result = [num for num in range(1, 10001)]
     random.seed(1)
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.insert(num)
-        result.remove(num)
     print(time.time() - start)
     start = time.time()
     print(binary_tree.search(100))
@@ -113,10 +157,9 @@ if __name__ == '__main__':
     result = [num for num in range(1, 10001)]
     random.seed(1)
     bar = tqdm.trange(len(mid))
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.delete(num)
-        result.remove(num)
         # print(num)
         # print(binary_tree.mid_order())
         bar.update()
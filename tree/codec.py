@@ -0,0 +1,142 @@
+"""
+值的二进制编码，预写日志、检查点和树的持久化共用
+每个值以1字节的类型标记开头：
+    N:None  T/F:布尔值  q:int64  i:超出int64范围的整数(长度+有符号小端字节)
+    d:float64  s:utf-8字符串(长度+字节)  b:bytes(长度+字节)
+长度均为4字节小端无符号整数
+只支持以上标量类型，其他类型在编码时抛出TypeError；不使用pickle，解码来源不可信的文件不会执行其中的代码
+"""
+import struct
+import zlib
+
+INT = struct.Struct('<q')
+FLOAT = struct.Struct('<d')
+LENGTH = struct.Struct('<I')
+
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+
+def pack(value):
+    """
+    编码一个值
+    :param value: 值，类型必须为None、bool、int、float、str或bytes
+    :return: bytes
+    """
+    if value is None:
+        return b'N'
+    kind = type(value)
+    if kind is bool:
+        return b'T' if value else b'F'
+    if kind is int:
+        if _INT_MIN <= value <= _INT_MAX:
+            return b'q' + INT.pack(value)
+        raw = value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+        return b'i' + LENGTH.pack(len(raw)) + raw
+    if kind is float:
+        return b'd' + FLOAT.pack(value)
+    if kind is str:
+        raw = value.encode('utf-8')
+        return b's' + LENGTH.pack(len(raw)) + raw
+    if kind is bytes:
+        return b'b' + LENGTH.pack(len(value)) + value
+    raise TypeError('can not encode {} value, only None/bool/int/float/str/bytes are supported'.format(
+        kind.__name__))
+
+
+def unpack(buf, offset=0):
+    """
+    从offset处解码一个值
+    :param buf: bytes或memoryview
+    :param offset: 起始位置
+    :return: (值, 下一个值的起始位置)
+    """
+    tag = buf[offset]
+    offset += 1
+    if tag == 0x71:  # q
+        return INT.unpack_from(buf, offset)[0], offset + 8
+    if tag == 0x4e:  # N
+        return None, offset
+    if tag == 0x54:  # T
+        return True, offset
+    if tag == 0x46:  # F
+        return False, offset
+    if tag == 0x64:  # d
+        return FLOAT.unpack_from(buf, offset)[0], offset + 8
+    if tag not in (0x69, 0x73, 0x62):
+        raise ValueError('unknown value tag {!r} at {}'.format(chr(tag), offset - 1))
+    size = LENGTH.unpack_from(buf, offset)[0]
+    offset += 4
+    raw = bytes(buf[offset:offset + size])
+    if len(raw) != size:
+        raise ValueError('truncated value at {}'.format(offset - 5))
+    offset += size
+    if tag == 0x73:  # s
+        return raw.decode('utf-8'), offset
+    if tag == 0x62:  # b
+        return raw, offset
+    return int.from_bytes(raw, 'little', signed=True), offset
+
+
+class Writer:
+    """
+    带缓冲的顺序写入器，关闭时在末尾追加全部内容的crc32
+    """
+    def __init__(self, f, buffer_size=1 << 20):
+        self._f = f
+        self._buffer = bytearray()
+        self._buffer_size = buffer_size
+        self._crc = 0
+
+    def write(self, raw):
+        self._buffer += raw
+        if len(self._buffer) >= self._buffer_size:
+            self._flush()
+
+    def value(self, value):
+        """写入一个编码后的值"""
+        self.write(pack(value))
+
+    def count(self, count):
+        """写入一个长度或数量"""
+        self.write(INT.pack(count))
+
+    def close(self):
+        self._flush()
+        self._f.write(LENGTH.pack(self._crc))
+
+    def _flush(self):
+        self._crc = zlib.crc32(self._buffer, self._crc)
+        self._f.write(self._buffer)
+        self._buffer = bytearray()
+
+
+class Reader:
+    """
+    顺序读取器，创建时校验末尾的crc32
+    """
+    def __init__(self, raw):
+        if len(raw) < LENGTH.size:
+            raise ValueError('truncated data')
+        body = memoryview(raw)[:-LENGTH.size]
+        if zlib.crc32(body) != LENGTH.unpack_from(raw, len(raw) - LENGTH.size)[0]:
+            raise ValueError('checksum mismatch')
+        self._buf = body
+        self.offset = 0
+
+    def read(self, size):
+        """读取size个字节"""
+        raw = bytes(self._buf[self.offset:self.offset + size])
+        if len(raw) != size:
+            raise ValueError('truncated data at {}'.format(self.offset))
+        self.offset += size
+        return raw
+
+    def value(self):
+        """读取一个编码后的值"""
+        value, self.offset = unpack(self._buf, self.offset)
+        return value
+
+    def count(self):
+        """读取一个长度或数量"""
+        return INT.unpack(self.read(INT.size))[0]
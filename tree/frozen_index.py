@@ -0,0 +1,198 @@
+"""
+只读的数组索引，由Tree.freeze()生成
+树构建完成后不再修改、只需反复查询时，逐个节点跟随left/right指针下降每一层都可能缓存未命中，冻结后：
+    1、值按升序保存在连续的类型化数组中，单个查询使用bisect，比较循环在C中执行，不经过任何节点对象
+    2、批量查询search_many在安装了NumPy时使用Eytzinger(BFS)布局：下标1为根，下标k的左右孩子为2k和2k+1，
+    查询路径上前几层的值集中在数组开头，总能命中缓存；每一轮整批键各下降一层，循环只有一条k = 2k + (keys[k] < key)，
+    不需要按比较结果分支，最后根据k末尾连续的1还原出下界的位置；Eytzinger数组在第一次批量查询时创建
+    3、NumPy是可选依赖，未安装时不会创建Eytzinger数组，批量查询逐个使用bisect；
+    纯Python逐个键执行k = 2k + (keys[k] < key)的每一步都是解释器循环，比在C中执行的bisect更慢，因此不提供该路径
+值全部为int64范围内的整数时保存在array('q')中，全部为浮点数时保存在array('d')中，其他类型保存在普通列表中
+"""
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+
+def _typecode(values):
+    """
+    根据值的类型选择数组的类型码
+    :param values: 值列表
+    :return: 'q'、'd'，无法放入类型化数组时返回None
+    """
+    if not values:
+        return None
+    kinds = set(map(type, values))
+    if kinds == {int} and _INT_MIN <= values[0] and values[-1] <= _INT_MAX:
+        return 'q'
+    if kinds == {float}:
+        return 'd'
+    return None
+
+
+def eytzinger_order(n):
+    """
+    有序序列中第i个值在Eytzinger布局中的下标，即按中序遍历隐式完全二叉树1..n得到的下标序列
+    :param n: 值的数量
+    :return: 下标列表
+    """
+    order = []
+    stack = []
+    k = 1
+    while stack or k <= n:
+        while k <= n:
+            stack.append(k)
+            k *= 2
+        k = stack.pop()
+        order.append(k)
+        k = 2 * k + 1
+    return order
+
+
+class FrozenIndex:
+    """
+    不可修改的数组索引，提供与树相同的查询接口
+    """
+    __slots__ = ('_keys', '_datas', '_eytzinger', '_ranks')
+
+    def __init__(self, pairs):
+        """
+        :param pairs: 按值递增排列且不重复的(值, 关联的数据)序列
+        """
+        values, datas = [], []
+        for value, data in pairs:
+            if values and not values[-1] < value:
+                raise ValueError('FrozenIndex requires strictly ascending values, got {} after {}'.format(
+                    value, values[-1]))
+            values.append(value)
+            datas.append(data)
+        typecode = _typecode(values)
+        self._keys = array(typecode, values) if typecode else values
+        self._datas = datas
+        # Eytzinger布局的NumPy数组，以及其中每个下标对应的有序下标，第一次向量化查询时创建
+        self._eytzinger = None
+        self._ranks = None
+
+    def _find(self, key):
+        """
+        查找键在有序数组中的下标
+        :param key: 键
+        :return: 下标，不存在时返回-1
+        """
+        keys = self._keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return i
+        return -1
+
+    def search(self, key):
+        """
+        查询一个值
+        :param key: 键
+        :return: value，不存在时返回None
+        """
+        i = self._find(key)
+        return self._keys[i] if i >= 0 else None
+
+    def get(self, key, default=None):
+        """
+        查询键关联的数据
+        :param key: 键
+        :param default: 键不存在时返回的默认值
+        :return: 关联的数据
+        """
+        i = self._find(key)
+        return self._datas[i] if i >= 0 else default
+
+    def __getitem__(self, key):
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._datas[i]
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        """按升序返回值"""
+        return iter(self._keys)
+
+    def search_many(self, keys):
+        """
+        批量查询，结果与keys的顺序一致
+        :param keys: 键序列
+        :return: 列表，每一项为search(key)的结果
+        """
+        stored = self._keys
+        return [stored[i] if i >= 0 else None for i in self._find_many(keys)]
+
+    def contains_many(self, keys):
+        """
+        批量判定是否存在，结果与keys的顺序一致
+        :param keys: 键序列
+        :return: bool列表
+        """
+        return [i >= 0 for i in self._find_many(keys)]
+
+    def _find_many(self, keys):
+        """
+        批量查找键在有序数组中的下标
+        :param keys: 键序列
+        :return: 下标列表，不存在的键为-1
+        """
+        keys = list(keys)
+        found = self._vector_find(keys)
+        if found is not None:
+            return found
+        find = self._find
+        return [find(key) for key in keys]
+
+    def _vector_find(self, keys):
+        """
+        使用NumPy在Eytzinger布局上对整批键同时下降，每一轮所有键各下降一层，共log2(n)轮
+        键数组的类型必须与值数组完全一致：int64的值与float64的键比较会先把值转为float64，
+        超过2**53的整数会失去精度，得到与search不一致的结果
+        :param keys: 键列表
+        :return: 下标列表，未安装NumPy、值不在类型化数组中或键数组的类型与值数组不一致时返回None
+        """
+        if np is None or not isinstance(self._keys, array) or not keys:
+            return None
+        try:
+            probes = np.asarray(keys)
+        except (OverflowError, ValueError, TypeError):
+            return None
+        if probes.dtype != (np.int64 if self._keys.typecode == 'q' else np.float64):
+            return None
+        if self._eytzinger is None:
+            self._build_eytzinger()
+        eytzinger, n = self._eytzinger, len(self._keys)
+        k = np.ones(len(probes), dtype=np.int64)
+        for _ in range(n.bit_length()):
+            inside = k <= n
+            # 已经越过叶子的键读取下标0的占位值，结果被丢弃
+            k = np.where(inside, 2 * k + (eytzinger[np.where(inside, k, 0)] < probes), k)
+        # 去掉末尾连续的1和最后一个0即为下界，下标0表示所有值都小于该键
+        k //= (~k & (k + 1)) * 2
+        hit = (k > 0) & (eytzinger[k] == probes)
+        return np.where(hit, self._ranks[k], -1).tolist()
+
+    def _build_eytzinger(self):
+        """按Eytzinger顺序重排有序数组，下标0不使用"""
+        n = len(self._keys)
+        dtype = np.int64 if self._keys.typecode == 'q' else np.float64
+        order = np.array(eytzinger_order(n), dtype=np.int64)
+        eytzinger = np.zeros(n + 1, dtype=dtype)
+        eytzinger[order] = np.frombuffer(self._keys, dtype=dtype)
+        ranks = np.zeros(n + 1, dtype=np.int64)
+        ranks[order] = np.arange(n, dtype=np.int64)
+        self._eytzinger, self._ranks = eytzinger, ranks
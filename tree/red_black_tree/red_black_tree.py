@@ -1,4 +1,4 @@
-from tree.base_tree import Tree, IntNode, Node
+from tree.base_tree import Tree, RedBlackNode, Node
 import time
 import tqdm
 import random
@@ -6,63 +6,138 @@ import random
 class AverageBinaryTree(Tree):
     """
     红黑树
+    写时复制模式下，写入复制从根节点到修改位置的路径，以及变色、旋转涉及的兄弟节点，
+    替换根节点即完成发布，读线程通过snapshot()获取快照后无需加锁；写入方之间仍需互斥
     """
-    def __init__(self):
+    def __init__(self, copy_on_write=False):
+        """
+        :param copy_on_write: 是否开启写时复制(路径复制)模式
+        """
         self._root = None
+        self._count = 0
+        if copy_on_write:
+            self._owned = set()
 
-    def _insert(self, value: int):
+    def _insert(self, value: int, data=None):
         """
-        插入一个值
+        插入一个值，自顶向下记录路径，插入后自底向上逐个修复路径上的节点
         :param value: 值
+        :param data: 关联的数据
         :return: value
         """
-        self._root = self.__put(self._root, value)
+        path = []
+        node = self._root
+        while node:
+            if node.value > value:
+                path.append(node)
+                node = node.left
+            elif node.value < value:
+                path.append(node)
+                node = node.right
+            else:
+                break
+        if self._owned is not None:
+            path, node = self._copy_path(path, node, value)
+        if node is None:
+            node = RedBlackNode(value, data)
+            self._count += 1
+            # 新值位于路径上每个节点的子树中
+            for parent in path:
+                parent.size += 1
+        else:
+            node.value = value
+            node.data = data
+            node = self._balance(node)
+        root = self._fix_path(path, node, value)
         # 涂黑根节点
-        self._root.is_red = False
+        root.is_red = False
+        self._publish(root)
 
-    def __put(self, node, new_value):
+    def _copy_path(self, path, child, value):
         """
-        放置一个新的节点
-        :param node:
-        :param new_node:
+        写时复制：复制路径上的节点并把副本逐个链接起来，路径以外的子树仍然与旧树共享
+        每次写入只在修改前调用一次，此时路径上的节点都还没有被复制过
+        :param path: 根节点到子树父节点的路径
+        :param child: 路径末端的子树根节点，为None时不复制
+        :param value: 查找路径使用的值，用于判定子树挂在左侧还是右侧
+        :return: (由副本组成的路径, 子树根节点的副本)
+        """
+        owned = self._owned
+        copied = []
+        for node in path if child is None else path + [child]:
+            node = node.copy()
+            owned.add(id(node))
+            if copied:
+                parent = copied[-1]
+                if parent.value > value:
+                    parent.left = node
+                else:
+                    parent.right = node
+            copied.append(node)
+        if child is not None:
+            child = copied.pop()
+        return copied, child
+
+    def _fix_path(self, path, child, value):
+        """
+        自底向上将子树挂回父节点，并修复路径上每个节点的颜色和旋转
+        :param path: 根节点到子树父节点的路径
+        :param child: 新的子树根节点
+        :param value: 查找路径使用的值，用于判定子树挂在左侧还是右侧
         :return: 新的根节点
         """
-        # 先将新值插入
-        if node is None:
-            return IntNode(new_value)
-        if node.value > new_value:
-            node.left = self.__put(node.left, new_value)
-        elif node.value < new_value:
-            node.right = self.__put(node.right, new_value)
-        else:
-            node.value = new_value
+        while path:
+            node = path.pop()
+            if node.value > value:
+                node.left = child
+            else:
+                node.right = child
+            left, right = node.left, node.right
+            # 左右孩子都不是红色时不满足任何修复条件，跳过一次方法调用
+            if (left is None or not left.is_red) and (right is None or not right.is_red):
+                child = node
+            else:
+                child = self._balance(node)
+        return child
 
+    def _balance(self, node):
+        """
+        修复当前节点的颜色，并在需要时旋转
+        :param node: 节点
+        :return: 修复后的子树根节点
+        """
+        is_red = self.is_red
+        left, right = node.left, node.right
         # 当前节点的左节点为红色，右节点为红色
-        if self.is_red(node.left) and self.is_red(node.right):
+        if is_red(left) and is_red(right):
             # 此时满足插入节点是祖父节点的左子树上，插入节点的父节点和叔叔节点为红色，祖父为黑色
             # 此时进行颜色翻转，并把当前节点(祖父节点)作为新的插入节点进行递归处理
-            if self.is_red(node.left.left) or self.is_red(node.left.right):
+            if is_red(left.left) or is_red(left.right):
                 self.flip_color(node)
             # 此时满足插入节点是祖父节点的右子树上，插入节点的父节点和叔叔节点为红色，祖父为黑色
             # 此时进行颜色翻转，并把当前节点(祖父节点)作为新的插入节点进行递归处理
-            if self.is_red(node.right.left) or self.is_red(node.right.right):
+            if is_red(right.left) or is_red(right.right):
                 self.flip_color(node)
+        # 写时复制模式下变色会把孩子节点替换为副本
+        left, right = node.left, node.right
+        left_red, right_red = is_red(left), is_red(right)
         # 当前节点的左节点为红色，右节点为黑色
-        if self.is_red(node.left) and not self.is_red(node.right):
+        if left_red and not right_red:
             # 此时满足插入节点是祖父节点的左子树上，插入节点的父节点是红色，叔叔节点为黑色
-            if self.is_red(node.left.right):
+            if is_red(left.right):
                 # 如果插入节点为父节点的右子树，先左旋，旋转为插入节点为父节点的左节点
-                node.left = self.left_rotate(node.left)
-            if self.is_red(node.left.left):
+                node.left = self.left_rotate(left)
+            if is_red(node.left.left):
                 # 此时满足插入节点为父节点的左子树，将当前节点(祖父节点)进行右旋,父节点替换为当前节点
                 node = self.right_rotate(node)
+            return node
         # 当前节点右节点为红色，左节点为黑色
-        if self.is_red(node.right) and not self.is_red(node.left):
+        if right_red and not left_red:
             # 此时满足插入节点是祖父节点的右子树上，插入节点的父节点是红色，叔叔节点为黑色
-            if self.is_red(node.right.left):
+            if is_red(right.left):
                 # 如果插入节点为父节点的左子树，先右旋，旋转为插入节点为父节点的右节点
-                node.right = self.right_rotate(node.right)
-            if self.is_red(node.right.right):
+                node.right = self.right_rotate(right)
+            if is_red(node.right.right):
                 # 此时满足插入节点为父节点的右子树，将当前节点(祖父节点)进行左旋,父节点替换为当前节点
                 node = self.left_rotate(node)
         return node
@@ -79,38 +154,44 @@ class AverageBinaryTree(Tree):
 
     def left_rotate(self, node):
         """红黑树的左旋"""
-        right = node.right
+        if self._stats is not None:
+            self._stats.rotations += 1
+        node = self._own(node)
+        right = self._own(node.right)
         # 旋转
         node.right = right.left
         right.left = node
+        right.size = node.size
+        node.size = self.size(node.left) + self.size(node.right) + 1
         # 变色
         node.is_red = True
         right.is_red = False
-        # 更新高度
-        node.height = max(self.height(node.left), self.height(node.right)) + 1
-        right.height = max(self.height(right.left), self.height(right.right)) + 1
         return right
 
     def right_rotate(self, node):
         """红黑树右旋"""
-        left = node.left
+        if self._stats is not None:
+            self._stats.rotations += 1
+        node = self._own(node)
+        left = self._own(node.left)
         # 旋转
         node.left = left.right
         left.right = node
+        left.size = node.size
+        node.size = self.size(node.left) + self.size(node.right) + 1
         # 变色
         node.is_red = True
         left.is_red = False
-        # 更新高度
-        node.height = max(self.height(node.left), self.height(node.right)) + 1
-        left.height = max(self.height(left.left), self.height(left.right)) + 1
         return left
 
     def flip_color(self, node):
         """变色"""
         node.is_red = True
         if node.left:
+            node.left = self._own(node.left)
             node.left.is_red = False
         if node.right:
+            node.right = self._own(node.right)
             node.right.is_red = False
 
     def _search(self, value: int):
@@ -135,76 +216,109 @@ class AverageBinaryTree(Tree):
         1、删除节点为叶子节点
         2、删除节点有一个子节点
         3、删除节点有两个子节点
-        递归更新树的高度，并维持新的平衡
+        自底向上修复路径上节点的颜色，并维持新的平衡
         :param value:值
         :return: value
         """
-        self._root = self.__delete_node(self._root, value)
+        path = []
+        node = self._root
+        while node and node.value != value:
+            path.append(node)
+            if node.value > value:
+                node = node.left
+            else:
+                node = node.right
+        if node is None:
+            return
+        if self._owned is not None:
+            path, node = self._copy_path(path, node, value)
+        if node.left and node.right:
+            self._count -= 1
+            pre_node = self.find_right_last_node(node)
+            self.remove_prev_node(node)
+            node.value = pre_node.value
+            node.data = pre_node.data
+            node.size -= 1
+            child = node
+        else:
+            self._count -= 1
+            child = node.left if node.left else node.right
+        # 被摘除的节点位于路径上每个节点的子树中
+        for parent in path:
+            parent.size -= 1
+        self._publish(self._fix_path(path, child, value))
 
-    def __delete_node(self, node, value):
+    def _insert_many(self, values):
         """
-        递归删除一个节点
-        :param node: 当前节点
-        :param value: 删除的值
-        :return:
+        批量插入，批次相对树的规模较大时，将中序序列与批次线性合并后重建完全平衡的树，否则按键的顺序逐个插入
+        :param values: 有序且不重复的值列表
         """
-        if node is None:
+        if not self._prefer_rebuild(len(values)):
+            return super(AverageBinaryTree, self)._insert_many(values)
+        self._rebuild(self._merge_values(((node.value, node.data) for node in self.iter_in_order()), values))
+
+    def _delete_many(self, values):
+        """
+        批量删除，批次相对树的规模较大时，过滤中序序列后重建完全平衡的树，否则按键的顺序逐个删除
+        :param values: 有序且不重复的值列表
+        """
+        if not self._prefer_rebuild(len(values)):
+            return super(AverageBinaryTree, self)._delete_many(values)
+        removed = set(values)
+        self._rebuild([(node.value, node.data) for node in self.iter_in_order() if node.value not in removed])
+
+    def _rebuild(self, pairs):
+        """
+        根据有序的(值, 关联的数据)列表重建整棵树
+        前red_depth层为满二叉树并涂黑，最底层不满的节点涂红，所有路径的黑色节点数相同
+        :param pairs: 有序的(值, 关联的数据)列表
+        """
+        red_depth = (len(pairs) + 1).bit_length() - 1
+        root = self._build(pairs, 0, len(pairs), 0, red_depth)
+        if root:
+            root.is_red = False
+        self._publish(root)
+        self._count = len(pairs)
+
+    def _build(self, pairs, lo, hi, depth, red_depth):
+        """
+        以中间值为根递归构建完全平衡的子树
+        :return: 子树根节点
+        """
+        if lo >= hi:
             return None
-        if node.value > value:
-            node.left = self.__delete_node(node.left, value)
-        elif node.value < value:
-            node.right = self.__delete_node(node.right, value)
-        elif node.value == value:
-            if node.left and node.right:
-                pre_node = self.find_right_last_node(node)
-                self.remove_prev_node(node)
-                node.value = pre_node.value
-                return node
-            elif node.left:
-                return node.left
-            else:
-                return node.right
+        mid = (lo + hi) // 2
+        node = RedBlackNode(*pairs[mid])
+        node.is_red = depth >= red_depth
+        node.left = self._build(pairs, lo, mid, depth + 1, red_depth)
+        node.right = self._build(pairs, mid + 1, hi, depth + 1, red_depth)
+        node.size = hi - lo
+        return node
 
-        # 当前节点的左节点为红色，右节点为红色
-        if self.is_red(node.left) and self.is_red(node.right):
-            # 此时满足插入节点是祖父节点的左子树上，插入节点的父节点和叔叔节点为红色，祖父为黑色
-            # 此时进行颜色翻转，并把当前节点(祖父节点)作为新的插入节点进行递归处理
-            if self.is_red(node.left.left) or self.is_red(node.left.right):
-                self.flip_color(node)
-            # 此时满足插入节点是祖父节点的右子树上，插入节点的父节点和叔叔节点为红色，祖父为黑色
-            # 此时进行颜色翻转，并把当前节点(祖父节点)作为新的插入节点进行递归处理
-            if self.is_red(node.right.left) or self.is_red(node.right.right):
-                self.flip_color(node)
-            # 当前节点的左节点为红色，右节点为黑色
-        if self.is_red(node.left) and not self.is_red(node.right):
-            # 此时满足插入节点是祖父节点的左子树上，插入节点的父节点是红色，叔叔节点为黑色
-            if self.is_red(node.left.right):
-                # 如果插入节点为父节点的右子树，先左旋，旋转为插入节点为父节点的左节点
-                node.left = self.left_rotate(node.left)
-            if self.is_red(node.left.left):
-                # 此时满足插入节点为父节点的左子树，将当前节点(祖父节点)进行右旋,父节点替换为当前节点
-                node = self.right_rotate(node)
-            # 当前节点右节点为红色，左节点为黑色
-        if self.is_red(node.right) and not self.is_red(node.left):
-            # 此时满足插入节点是祖父节点的右子树上，插入节点的父节点是红色，叔叔节点为黑色
-            if self.is_red(node.right.left):
-                # 如果插入节点为父节点的左子树，先右旋，旋转为插入节点为父节点的右节点
-                node.right = self.right_rotate(node.right)
-            if self.is_red(node.right.right):
-                # 此时满足插入节点为父节点的右子树，将当前节点(祖父节点)进行左旋,父节点替换为当前节点
-                node = self.left_rotate(node)
+    def _dump_flag(self, node):
+        """保存节点颜色，1为红色"""
+        return 1 if node.is_red else 0
 
+    def _load_node(self, value, data, flag):
+        node = RedBlackNode(value, data)
+        node.is_red = bool(flag)
         return node
 
+    def _load_fix(self, node):
+        """根据孩子节点修复子树大小"""
+        node.size = self.size(node.left) + self.size(node.right) + 1
 
     def remove_prev_node(self, node):
         """删除前驱节点"""
         assert isinstance(node, Node)
-        current = node.left
+        own = self._own
+        current = node.left = own(node.left)
         parent = None
         while current.right:
+            # 前驱节点位于沿途节点的子树中
+            current.size -= 1
             parent = current
-            current = current.right
+            current = parent.right = own(current.right)
         # 当父节点为空时说明节点的前驱节点就是自己的左孩子
         if parent:
             parent.right = current.left
@@ -227,10 +341,9 @@ if __name__ == '__main__':
     start = time.time()
     result = [num for num in range(1, 10001)]
     random.seed(1)
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.insert(num)
-        result.remove(num)
     print(time.time() - start)
     start = time.time()
     print(binary_tree.search(100))
@@ -242,10 +355,9 @@ if __name__ == '__main__':
     result = [num for num in range(1, 10001)]
     random.seed(1)
     bar = tqdm.trange(len(mid))
-    while result:
-        num = random.choice(result)
+    random.shuffle(result)
+    for num in result:
         binary_tree.delete(num)
-        result.remove(num)
         # print(num)
         # print(binary_tree.mid_order())
         bar.update()
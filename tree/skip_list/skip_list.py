@@ -0,0 +1,475 @@
+from tree.base_tree import Tree, SkipNode
+import time
+import random
+
+
+class SkipList(Tree):
+    """
+    跳表，以多层有序链表代替树形结构，与各树引擎提供相同的接口
+    1、每个节点创建时以概率p逐层晋升，期望层数为1/(1-p)，查询从最高层开始逐层下降，期望访问O(log n)个节点
+    2、插入和删除只修改前驱节点的指针，不需要旋转、拆分或合并，写入开销稳定
+    3、范围扫描只需定位一次起点，之后沿最底层的双向链表顺序返回，支持降序扫描
+    4、上层指针记录跨过的值的数量(可索引跳表)，rank/select为O(log n)
+    跳表没有树形结构，先序/后序遍历不适用
+    """
+    def __init__(self, p=0.25, max_level=32, seed=None):
+        """
+        :param p: 节点晋升到上一层的概率，取值范围(0, 1)
+        :param max_level: 最大层数
+        :param seed: 随机层数使用的随机种子，为None时不固定
+        """
+        if not 0 < p < 1:
+            raise ValueError('p must be in (0, 1)')
+        if max_level < 1:
+            raise ValueError('max_level must be at least 1')
+        self._p = p
+        self._max_level = max_level
+        self._random = random.Random(seed).random
+        # 头节点不保存值，拥有全部层
+        self._head = SkipNode(None, level=max_level)
+        # 当前使用的层数
+        self._level = 1
+        self._root = None
+        self._count = 0
+
+    @classmethod
+    def from_sorted(cls, iterable, p=0.25, max_level=32, seed=None, with_data=False):
+        """
+        根据有序序列线性时间批量构建跳表，每层只保存当前最右侧的节点，不做任何查找
+        层数按位置确定而不是随机生成：第k个节点(从1开始)每被1/p整除一次就多一层，构建出的跳表是完全均衡的
+        :param iterable: 递增的值序列，可以是生成器，重复值会被忽略
+        :param p: 节点晋升到上一层的概率，之后插入的节点仍按该概率随机生成层数
+        :param max_level: 最大层数
+        :param seed: 随机种子
+        :param with_data: 为True时iterable中的元素为(值, 关联的数据)
+        :return: SkipList对象
+        """
+        tree = cls(p=p, max_level=max_level, seed=seed)
+        branch = max(int(round(1 / p)), 2)
+        head = tree._head
+        # 第2层及以上每层最右侧的节点及其位置
+        lasts = [head] * (max_level - 1)
+        positions = [0] * (max_level - 1)
+        last = head
+        prev = None
+        count = 0
+        top = 1
+        for item in iterable:
+            if with_data:
+                value, data = item
+            else:
+                value, data = item, None
+            if prev is not None:
+                if value == prev.value:
+                    continue
+                if value < prev.value:
+                    raise ValueError('from_sorted requires ascending input, got {} after {}'.format(value, prev.value))
+            count += 1
+            level, k = 1, count
+            while level < max_level and k % branch == 0:
+                k //= branch
+                level += 1
+            node = SkipNode(value, data, level)
+            node.prev = prev
+            last.next = node
+            last = node
+            for j in range(level - 1):
+                upper = lasts[j]
+                upper.forward[j] = node
+                upper.width[j] = count - positions[j]
+                lasts[j] = node
+                positions[j] = count
+            if level > top:
+                top = level
+            prev = node
+        tree._level = top
+        tree._count = count
+        return tree
+
+    def _random_level(self):
+        """
+        随机生成新节点的层数
+        :return: 层数
+        """
+        level = 1
+        rand, p = self._random, self._p
+        while level < self._max_level and rand() < p:
+            level += 1
+        return level
+
+    def _find_prev(self, value):
+        """
+        从最高层逐层下降，记录每一层最后一个小于value的节点及其位置(从1开始，头节点为0)
+        :param value: 值
+        :return: (最底层的前驱节点, 其位置, 上层的前驱节点列表, 上层前驱节点的位置列表)，上层列表的下标j对应第j+2层
+        """
+        top = self._level - 1
+        update = [None] * top
+        ranks = [0] * top
+        node = self._head
+        pos = 0
+        for j in range(top - 1, -1, -1):
+            nxt = node.forward[j]
+            while nxt is not None and nxt.value < value:
+                pos += node.width[j]
+                node = nxt
+                nxt = node.forward[j]
+            update[j] = node
+            ranks[j] = pos
+        nxt = node.next
+        while nxt is not None and nxt.value < value:
+            pos += 1
+            node = nxt
+            nxt = node.next
+        return node, pos, update, ranks
+
+    def _insert(self, value, data=None):
+        """
+        插入一个值，值已存在时覆盖关联的数据
+        :param value: 值
+        :param data: 关联的数据
+        """
+        prev, pos, update, ranks = self._find_prev(value)
+        node = prev.next
+        if node is not None and node.value == value:
+            node.data = data
+            return
+        level = self._random_level()
+        head = self._head
+        if level > self._level:
+            for j in range(self._level - 1, level - 1):
+                update.append(head)
+                ranks.append(0)
+            self._level = level
+        node = SkipNode(value, data, level)
+        node.next = prev.next
+        node.prev = prev if prev is not head else None
+        prev.next = node
+        if node.next is not None:
+            node.next.prev = node
+        # 新节点的位置
+        pos += 1
+        for j in range(level - 1):
+            upper = update[j]
+            node.forward[j] = upper.forward[j]
+            upper.forward[j] = node
+            # 原后继节点的位置后移一位
+            node.width[j] = ranks[j] + upper.width[j] + 1 - pos
+            upper.width[j] = pos - ranks[j]
+        # 更高层跨过新节点的指针
+        for j in range(level - 1, self._level - 1):
+            update[j].width[j] += 1
+        self._count += 1
+
+    def _insert_many(self, values):
+        """
+        批量插入，批次规模与跳表规模相当时合并后批量重建，否则逐个插入
+        :param values: 有序且不重复的值列表
+        """
+        if not self._prefer_rebuild(len(values)):
+            insert = self._insert
+            for value in values:
+                insert(value)
+            return
+        pairs = self._merge_values(self._dump_items(), values)
+        self._rebuild(pairs)
+
+    def _rebuild(self, pairs):
+        """
+        根据有序的(值, 关联的数据)序列重建，保留当前的参数和随机数生成器
+        :param pairs: 有序的(值, 关联的数据)序列
+        """
+        bulk = SkipList.from_sorted(pairs, p=self._p, max_level=self._max_level, with_data=True)
+        self._head, self._level, self._count = bulk._head, bulk._level, bulk._count
+
+    def _delete(self, value):
+        """
+        删除一个值
+        :param value: 值
+        """
+        prev, pos, update, ranks = self._find_prev(value)
+        node = prev.next
+        if node is None or node.value != value:
+            return
+        prev.next = node.next
+        if node.next is not None:
+            node.next.prev = node.prev
+        for j in range(self._level - 1):
+            upper = update[j]
+            if upper.forward[j] is node:
+                upper.width[j] += node.width[j] - 1
+                upper.forward[j] = node.forward[j]
+            else:
+                upper.width[j] -= 1
+        forward = self._head.forward
+        while self._level > 1 and forward[self._level - 2] is None:
+            self._level -= 1
+        self._count -= 1
+
+    def _search(self, value):
+        """
+        查询一个节点
+        :param value: 值
+        :return: SkipNode对象，不存在时返回None
+        """
+        node = self._head
+        for j in range(self._level - 2, -1, -1):
+            nxt = node.forward[j]
+            while nxt is not None and nxt.value < value:
+                node = nxt
+                nxt = node.forward[j]
+            # 在较高层遇到目标值时不必再下降
+            if nxt is not None and nxt.value == value:
+                return nxt
+        nxt = node.next
+        while nxt is not None and nxt.value < value:
+            nxt = nxt.next
+        if nxt is not None and nxt.value == value:
+            return nxt
+        return None
+
+    def _search_sorted(self, probes):
+        """
+        有序的探测键沿最底层链表归并，前进的步数超过一次下降的期望比较次数(每层约1/p次)时重新从最高层下降
+        :param probes: 有序的探测键列表
+        :return: 与probes并列的_search结果列表
+        """
+        result = [None] * len(probes)
+        limit = int(self._level / self._p)
+        node = self._ceiling(probes[0])
+        for i, probe in enumerate(probes):
+            steps = 0
+            while node is not None and node.value < probe:
+                if steps == limit:
+                    node = self._ceiling(probe)
+                    break
+                node = node.next
+                steps += 1
+            if node is None:
+                break
+            if node.value == probe:
+                result[i] = node
+        return result
+
+    def _ceiling(self, value):
+        """
+        第一个大于或等于value的节点
+        :return: SkipNode对象，不存在时返回None
+        """
+        node = self._head
+        for j in range(self._level - 2, -1, -1):
+            nxt = node.forward[j]
+            while nxt is not None and nxt.value < value:
+                node = nxt
+                nxt = node.forward[j]
+        nxt = node.next
+        while nxt is not None and nxt.value < value:
+            nxt = nxt.next
+        return nxt
+
+    def _floor(self, value=None):
+        """
+        最后一个小于或等于value的节点
+        :param value: 值，为None时返回最后一个节点
+        :return: SkipNode对象，不存在时返回None
+        """
+        node = self._head
+        for j in range(self._level - 2, -1, -1):
+            nxt = node.forward[j]
+            while nxt is not None and (value is None or nxt.value <= value):
+                node = nxt
+                nxt = node.forward[j]
+        nxt = node.next
+        while nxt is not None and (value is None or nxt.value <= value):
+            node = nxt
+            nxt = node.next
+        return node if node is not self._head else None
+
+    def seek(self, value=None, reverse=False):
+        """
+        游标，只下降一次，之后沿最底层链表逐个返回值
+        :param value: 起始值，升序时从第一个大于或等于value的值开始，降序时从最后一个小于或等于value的值开始，为None时从头(尾)开始
+        :param reverse: 是否降序
+        :return: 生成器
+        """
+        if not reverse:
+            node = self._head.next if value is None else self._ceiling(value)
+            while node is not None:
+                yield node.value
+                node = node.next
+        else:
+            node = self._floor(value)
+            while node is not None:
+                yield node.value
+                node = node.prev
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        范围扫描，返回闭区间[lo, hi]内的值
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :param reverse: 是否降序
+        :return: 生成器
+        """
+        if not reverse:
+            node = self._head.next if lo is None else self._ceiling(lo)
+            while node is not None:
+                value = node.value
+                if hi is not None and value > hi:
+                    return
+                yield value
+                node = node.next
+        else:
+            node = self._floor(hi)
+            while node is not None:
+                value = node.value
+                if lo is not None and value < lo:
+                    return
+                yield value
+                node = node.prev
+
+    def min(self):
+        """
+        最小值
+        :return: value，跳表为空时返回None
+        """
+        node = self._head.next
+        return node.value if node is not None else None
+
+    def max(self):
+        """
+        最大值
+        :return: value，跳表为空时返回None
+        """
+        node = self._floor()
+        return node.value if node is not None else None
+
+    def iter_in_order(self):
+        """
+        沿最底层链表按升序返回节点
+        :return: 生成器
+        """
+        node = self._head.next
+        while node is not None:
+            yield node
+            node = node.next
+
+    def __iter__(self):
+        return self.seek()
+
+    def __reversed__(self):
+        return self.seek(reverse=True)
+
+    def _mid_order(self, node, result):
+        """跳表中序遍历，即最底层链表"""
+        result.extend(self.iter_in_order())
+        return result
+
+    def _rank(self, key, inclusive):
+        """
+        逐层下降并累加跨过的值的数量
+        :param key: 键
+        :param inclusive: 是否统计等于key的值
+        :return: 小于(或等于)key的值的数量
+        """
+        node = self._head
+        rank = 0
+        for j in range(self._level - 2, -1, -1):
+            nxt = node.forward[j]
+            while nxt is not None and (nxt.value < key or inclusive and nxt.value == key):
+                rank += node.width[j]
+                node = nxt
+                nxt = node.forward[j]
+        nxt = node.next
+        while nxt is not None and (nxt.value < key or inclusive and nxt.value == key):
+            rank += 1
+            nxt = nxt.next
+        return rank
+
+    def _select(self, k):
+        """
+        逐层下降，跨过的值的数量不超过k+1时前进
+        :param k: 下标，0 <= k < len(self)
+        :return: value
+        """
+        target = k + 1
+        node = self._head
+        pos = 0
+        for j in range(self._level - 2, -1, -1):
+            nxt = node.forward[j]
+            while nxt is not None and pos + node.width[j] <= target:
+                pos += node.width[j]
+                node = nxt
+                nxt = node.forward[j]
+        while node is not None and pos < target:
+            pos += 1
+            node = node.next
+        if node is None or node is self._head:
+            raise IndexError('select index out of range')
+        return node.value
+
+    def _structure_stats(self):
+        """跳表的高度为使用的层数，节点数量即值的数量，不统计填充率"""
+        return (self._level if self._count else 0), self._count, None
+
+    def _count_visits(self, value):
+        """查询value时比较过的节点数量"""
+        visits = 0
+        node = self._head
+        for j in range(self._level - 2, -1, -1):
+            nxt = node.forward[j]
+            while nxt is not None:
+                visits += 1
+                if nxt.value >= value:
+                    break
+                node = nxt
+                nxt = node.forward[j]
+            if nxt is not None and nxt.value == value:
+                return visits
+        nxt = node.next
+        while nxt is not None:
+            visits += 1
+            if nxt.value >= value:
+                break
+            nxt = nxt.next
+        return visits
+
+    def _dump_params(self):
+        return {'p': self._p, 'max_level': self._max_level}
+
+    def _dump_meta(self):
+        """节点的层数是随机生成的，加载时按位置重新确定，不需要结构元数据"""
+        return b''
+
+    def _load_state(self, pairs, meta):
+        """通过from_sorted线性时间批量构建"""
+        self._rebuild(pairs)
+
+
+if __name__ == '__main__':
+    skip_list = SkipList(seed=1)
+    start = time.time()
+    result = [num for num in range(1, 10001)]
+    random.seed(1)
+    random.shuffle(result)
+    for num in result:
+        skip_list.insert(num)
+    print(time.time() - start)
+    print(skip_list.search(100), len(skip_list), skip_list.stats()['height'])
+    print('范围扫描：', list(skip_list.range(100, 110)))
+    print('降序扫描：', list(skip_list.range(100, 110, reverse=True)))
+    print('排名：', skip_list.rank(100), skip_list.select(99))
+    random.shuffle(result)
+    for num in result[:5000]:
+        skip_list.delete(num)
+    print('删除后：', len(skip_list), skip_list.min(), skip_list.max())
+
+    # 批量构建
+    start = time.time()
+    bulk_list = SkipList.from_sorted(range(1, 100001))
+    print('批量构建：', time.time() - start)
+    print(bulk_list.search(100), bulk_list.count_between(100, 2000))
+
+    # 键值对
+    bulk_list.put(100, 'record-100')
+    print('关联数据：', bulk_list[100], bulk_list.get(100001, 'missing'))
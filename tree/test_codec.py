@@ -0,0 +1,84 @@
+"""
+tree.codec的编解码测试
+用法：python -m pytest tree/test_codec.py
+"""
+import io
+import pickle
+import struct
+import unittest
+
+from tree.codec import pack, unpack, Writer, Reader
+
+VALUES = [None, True, False, 0, -1, 1 << 62, -(1 << 63), (1 << 63) - 1, 1 << 63, -(1 << 80), 1.5, -0.0,
+          '', 'abc', '高血压', b'', b'\x00\xff']
+
+
+class CodecTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        for value in VALUES:
+            raw = pack(value)
+            decoded, offset = unpack(raw)
+            self.assertEqual(decoded, value)
+            self.assertIs(type(decoded), type(value))
+            self.assertEqual(offset, len(raw))
+
+    def test_concatenated(self):
+        raw = b''.join(pack(value) for value in VALUES)
+        offset = 0
+        for value in VALUES:
+            decoded, offset = unpack(raw, offset)
+            self.assertEqual(decoded, value)
+        self.assertEqual(offset, len(raw))
+
+    def test_unknown_tag(self):
+        with self.assertRaises(ValueError):
+            unpack(b'z')
+
+    def test_unsupported_type(self):
+        for value in [(1, 'a'), {'k': [1, 2]}, [1], object(), 1j]:
+            with self.assertRaises(TypeError):
+                pack(value)
+
+    def test_rejects_pickle(self):
+        # 旧格式中的pickle标记不会被解码执行
+        raw = pickle.dumps((1, 'a'))
+        with self.assertRaises(ValueError):
+            unpack(b'p' + struct.pack('<I', len(raw)) + raw)
+
+    def test_truncated_value(self):
+        with self.assertRaises(ValueError):
+            unpack(pack('abcdef')[:-2])
+
+    def write(self, values, buffer_size=1 << 20):
+        f = io.BytesIO()
+        writer = Writer(f, buffer_size)
+        writer.count(len(values))
+        for value in values:
+            writer.value(value)
+        writer.close()
+        return f.getvalue()
+
+    def test_writer_reader(self):
+        # 缓冲区很小时每次写入都会刷新，crc32需要跨越多次刷新累计
+        for buffer_size in (1, 1 << 20):
+            reader = Reader(self.write(VALUES, buffer_size))
+            self.assertEqual([reader.value() for _ in range(reader.count())], VALUES)
+
+    def test_checksum(self):
+        raw = bytearray(self.write(VALUES))
+        raw[10] ^= 0xff
+        with self.assertRaises(ValueError):
+            Reader(bytes(raw))
+        with self.assertRaises(ValueError):
+            Reader(b'\x00')
+
+    def test_truncated_read(self):
+        reader = Reader(self.write([]))
+        self.assertEqual(reader.count(), 0)
+        with self.assertRaises(ValueError):
+            reader.read(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+各树引擎的一致性测试：同一组随机操作在所有引擎上执行，结果都必须与有序字典一致
+覆盖插入、键值对、删除、批量操作、批量查询、遍历、范围扫描、顺序统计、dump/load和freeze
+用法：python -m pytest tree/test_engines.py 或 python -m unittest tree.test_engines
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from bisect import bisect_left, bisect_right
+
+from tree.bench.engines import ENGINES, load_engine
+
+
+def random_ops(seed, n=600, universe=400):
+    """
+    生成随机操作序列
+    :return: [(操作, 参数)]
+    """
+    rnd = random.Random(seed)
+    ops = []
+    for _ in range(n):
+        roll = rnd.random()
+        if roll < 0.4:
+            ops.append(('insert', rnd.randrange(universe)))
+        elif roll < 0.6:
+            key = rnd.randrange(universe)
+            ops.append(('put', (key, 'data-{}'.format(rnd.randrange(1000)))))
+        elif roll < 0.85:
+            ops.append(('delete', rnd.randrange(universe)))
+        elif roll < 0.93:
+            ops.append(('insert_many', [rnd.randrange(universe) for _ in range(rnd.randrange(1, 60))]))
+        else:
+            ops.append(('delete_many', [rnd.randrange(universe) for _ in range(rnd.randrange(1, 60))]))
+    return ops
+
+
+def value_of(result):
+    """二叉树的search返回节点对象，其他树返回值"""
+    return getattr(result, 'value', result)
+
+
+def apply_ops(tree, expected, ops):
+    """
+    在树和参照字典上执行同一组操作，insert对已存在的键会把关联的数据重置为None
+    """
+    for op, arg in ops:
+        if op == 'insert':
+            tree.insert(arg)
+            expected[arg] = None
+        elif op == 'put':
+            tree.put(*arg)
+            expected[arg[0]] = arg[1]
+        elif op == 'delete':
+            tree.delete(arg)
+            expected.pop(arg, None)
+        elif op == 'insert_many':
+            tree.insert_many(arg)
+            for key in arg:
+                expected[key] = None
+        else:
+            tree.delete_many(arg)
+            for key in arg:
+                expected.pop(key, None)
+
+
+class EngineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def check_tree(self, name, tree, expected):
+        """校验树的全部读取接口与参照字典一致"""
+        keys = sorted(expected)
+        self.assertEqual(len(tree), len(keys), name)
+        self.assertEqual(list(tree), keys, name)
+        self.assertEqual(list(reversed(tree)), keys[::-1], name)
+        self.assertEqual([value_of(node) for node in tree.mid_order()], keys, name)
+        probes = list(range(-5, 410, 3))
+        self.assertEqual([value_of(tree.search(key)) for key in probes],
+                         [key if key in expected else None for key in probes], name)
+        self.assertEqual(tree.search_many(probes), [tree.search(key) for key in probes], name)
+        self.assertEqual(tree.contains_many(probes), [key in expected for key in probes], name)
+        for key in probes:
+            self.assertEqual(tree.get(key, 'missing'), expected.get(key, 'missing'), (name, key))
+        for lo, hi in [(None, None), (10, 50), (100, 100), (50, 10), (-10, 500)]:
+            inside = [key for key in keys if (lo is None or key >= lo) and (hi is None or key <= hi)]
+            self.assertEqual(list(tree.range(lo, hi)), inside, (name, lo, hi))
+        for key in probes:
+            self.assertEqual(tree.rank(key), bisect_left(keys, key), (name, key))
+        for lo, hi in [(10, 50), (0, 400), (33, 33), (50, 10)]:
+            self.assertEqual(tree.count_between(lo, hi), max(bisect_right(keys, hi) - bisect_left(keys, lo), 0),
+                             (name, lo, hi))
+        for k in range(-len(keys), len(keys)):
+            self.assertEqual(tree.select(k), keys[k], (name, k))
+        with self.assertRaises(IndexError):
+            tree.select(len(keys))
+
+    def test_random_ops(self):
+        for seed in range(3):
+            ops = random_ops(seed)
+            for name, module, cls, kwargs in ENGINES:
+                tree = load_engine(module, cls)(**kwargs)
+                expected = {}
+                apply_ops(tree, expected, ops)
+                self.check_tree(name, tree, expected)
+
+    def test_dump_load(self):
+        ops = random_ops(7)
+        for name, module, cls, kwargs in ENGINES:
+            engine = load_engine(module, cls)
+            tree = engine(**kwargs)
+            expected = {}
+            apply_ops(tree, expected, ops)
+            path = os.path.join(self.directory, 'tree.dump')
+            tree.dump(path)
+            loaded = engine.load(path)
+            self.check_tree(name, loaded, expected)
+            # 加载后的树可以继续写入
+            apply_ops(loaded, expected, random_ops(8, n=200))
+            self.check_tree(name, loaded, expected)
+
+    def test_dump_load_empty(self):
+        for name, module, cls, kwargs in ENGINES:
+            engine = load_engine(module, cls)
+            path = os.path.join(self.directory, 'empty.dump')
+            engine(**kwargs).dump(path)
+            loaded = engine.load(path)
+            self.assertEqual(len(loaded), 0, name)
+            self.assertEqual(list(loaded), [], name)
+
+    def test_dump_unsupported_data(self):
+        for name, module, cls, kwargs in ENGINES:
+            tree = load_engine(module, cls)(**kwargs)
+            tree.put(1, ('not', 'a', 'scalar'))
+            path = os.path.join(self.directory, 'tree.dump')
+            with self.assertRaises(TypeError):
+                tree.dump(path)
+            self.assertFalse(os.path.exists(path), name)
+
+    def test_load_other_kind(self):
+        (_, module, cls, kwargs), (_, other_module, other_cls, _) = ENGINES[0], ENGINES[-1]
+        path = os.path.join(self.directory, 'tree.dump')
+        load_engine(module, cls)(**kwargs).dump(path)
+        with self.assertRaises(ValueError):
+            load_engine(other_module, other_cls).load(path)
+
+    def test_freeze(self):
+        ops = random_ops(11)
+        for name, module, cls, kwargs in ENGINES:
+            tree = load_engine(module, cls)(**kwargs)
+            expected = {}
+            apply_ops(tree, expected, ops)
+            frozen = tree.freeze()
+            keys = sorted(expected)
+            self.assertEqual(list(frozen), keys, name)
+            probes = list(range(-5, 410))
+            self.assertEqual(frozen.search_many(probes), [frozen.search(key) for key in probes], name)
+            for key in probes:
+                self.assertEqual(frozen.get(key, 'missing'), expected.get(key, 'missing'), (name, key))
+            # 冻结后修改树不影响索引
+            tree.insert(1000)
+            self.assertNotIn(1000, frozen)
+
+
+if __name__ == '__main__':
+    unittest.main()
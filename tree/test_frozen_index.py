@@ -0,0 +1,125 @@
+"""
+tree.frozen_index的查询测试，安装了NumPy时search_many同时覆盖向量化路径和bisect路径
+用法：python -m pytest tree/test_frozen_index.py
+"""
+import random
+import unittest
+
+from tree import frozen_index
+from tree.frozen_index import FrozenIndex, eytzinger_order
+
+
+class FrozenIndexTestCase(unittest.TestCase):
+
+    def check_consistent(self, index, probes):
+        """search_many/contains_many必须与逐个search一致，NumPy可用时分别在两条路径上校验"""
+        expected = [index.search(key) for key in probes]
+        self.assertEqual(index.search_many(probes), expected)
+        self.assertEqual(index.contains_many(probes), [key in index for key in probes])
+        if frozen_index.np is not None:
+            np, frozen_index.np = frozen_index.np, None
+            try:
+                self.assertEqual(index.search_many(probes), expected)
+            finally:
+                frozen_index.np = np
+
+    def test_eytzinger_order(self):
+        for n in range(0, 70):
+            order = eytzinger_order(n)
+            self.assertEqual(sorted(order), list(range(1, n + 1)))
+            # 中序遍历隐式完全二叉树，左孩子2k排在k之前，右孩子2k+1排在k之后
+            position = {k: i for i, k in enumerate(order)}
+            for k in order:
+                if 2 * k <= n:
+                    self.assertLess(position[2 * k], position[k])
+                if 2 * k + 1 <= n:
+                    self.assertGreater(position[2 * k + 1], position[k])
+
+    def test_typecode(self):
+        self.assertEqual(FrozenIndex([(1, None), (2, None)])._keys.typecode, 'q')
+        self.assertEqual(FrozenIndex([(1.5, None), (2.5, None)])._keys.typecode, 'd')
+        self.assertIsInstance(FrozenIndex([(1, None), (2.5, None)])._keys, list)
+        self.assertIsInstance(FrozenIndex([('a', None), ('b', None)])._keys, list)
+        self.assertIsInstance(FrozenIndex([(1, None), (1 << 63, None)])._keys, list)
+
+    def test_lookup(self):
+        index = FrozenIndex([(k, 'data-{}'.format(k)) for k in range(0, 100, 2)])
+        self.assertEqual(len(index), 50)
+        self.assertEqual(list(index), list(range(0, 100, 2)))
+        self.assertEqual(index.search(10), 10)
+        self.assertIsNone(index.search(11))
+        self.assertEqual(index.get(10), 'data-10')
+        self.assertEqual(index.get(11, 'missing'), 'missing')
+        self.assertEqual(index[98], 'data-98')
+        with self.assertRaises(KeyError):
+            index[99]
+        self.assertNotIn(-1, index)
+
+    def test_requires_ascending(self):
+        with self.assertRaises(ValueError):
+            FrozenIndex([(2, None), (1, None)])
+        with self.assertRaises(ValueError):
+            FrozenIndex([(1, None), (1, None)])
+
+    def test_empty(self):
+        index = FrozenIndex([])
+        self.assertEqual(index.search_many([1, 2]), [None, None])
+        self.assertEqual(index.search_many([]), [])
+
+    def test_random_int(self):
+        rnd = random.Random(1)
+        for n in (1, 2, 3, 7, 8, 100, 1000):
+            keys = sorted(set(rnd.randrange(-1 << 63, 1 << 63) for _ in range(n)))
+            index = FrozenIndex([(key, None) for key in keys])
+            probes = [rnd.choice(keys) for _ in range(200)] + [rnd.randrange(-1 << 63, 1 << 63) for _ in range(200)]
+            probes += [keys[0] - 1, keys[-1] + 1, -1 << 63, (1 << 63) - 1]
+            self.check_consistent(index, probes)
+
+    def test_random_float(self):
+        rnd = random.Random(2)
+        keys = sorted(set(rnd.uniform(-1e6, 1e6) for _ in range(500)))
+        index = FrozenIndex([(key, None) for key in keys])
+        self.check_consistent(index, [rnd.choice(keys) for _ in range(200)] + [rnd.uniform(-1e6, 1e6) for _ in range(200)])
+        # 整数键与浮点数值比较
+        self.check_consistent(FrozenIndex([(k / 2, None) for k in range(10)]), [1, 2, 3, 1.5, 4.0])
+
+    def test_mixed_probe_types(self):
+        # 超过2**53的整数转为float64后失去精度，不能与int64的值混在一起向量化比较
+        index = FrozenIndex([((1 << 53) + 1, None)])
+        self.assertEqual(index.search_many([float(1 << 53)]), [None])
+        index = FrozenIndex([((1 << 62) + 1, None)])
+        self.assertEqual(index.search_many([(1 << 62) + 1, 1.5]), [(1 << 62) + 1, None])
+        index = FrozenIndex([(k, None) for k in range(0, 100, 2)])
+        self.check_consistent(index, [4, 1 << 63, 1 << 70, 5, 4.0, True, -1 << 64])
+
+    @unittest.skipIf(frozen_index.np is None, 'NumPy is not installed')
+    def test_vector_find(self):
+        rnd = random.Random(3)
+        for n in (1, 2, 3, 15, 16, 17, 1000):
+            keys = sorted(rnd.sample(range(-5000, 5000), n))
+            index = FrozenIndex([(key, None) for key in keys])
+            probes = list(range(-5005, 5005, 7)) + keys
+            found = index._vector_find(probes)
+            self.assertIsNotNone(found)
+            self.assertIsNotNone(index._eytzinger)
+            self.assertEqual(found, [index._find(key) for key in probes])
+        index = FrozenIndex([(k / 4, None) for k in range(100)])
+        probes = [k / 8 for k in range(-10, 900)]
+        self.assertEqual(index._vector_find(probes), [index._find(key) for key in probes])
+        # 键数组的类型与值数组不一致时回退到bisect
+        self.assertIsNone(index._vector_find([1, 2]))
+        self.assertIsNone(FrozenIndex([('a', None)])._vector_find(['a']))
+
+    def test_without_numpy(self):
+        np, frozen_index.np = frozen_index.np, None
+        try:
+            index = FrozenIndex([(k, None) for k in range(0, 100, 2)])
+            self.assertIsNone(index._vector_find([2, 4]))
+            self.assertEqual(index.search_many([2, 3, 4]), [2, None, 4])
+            self.assertIsNone(index._eytzinger)
+        finally:
+            frozen_index.np = np
+
+
+if __name__ == '__main__':
+    unittest.main()
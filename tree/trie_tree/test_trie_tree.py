@@ -0,0 +1,104 @@
+"""
+字典树测试：词频、前缀、按词频排序的前缀补全、分词和dump/load
+用法：python -m pytest tree/trie_tree/test_trie_tree.py
+"""
+import collections
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from tree.trie_tree.trie_tree import TrieTree
+
+
+def random_words(rnd, alphabet, n):
+    return [''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(1, 6))) for _ in range(n)]
+
+
+class TrieTreeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def build(self, seed, alphabet='abcd', n=500):
+        rnd = random.Random(seed)
+        tree = TrieTree()
+        counter = collections.Counter()
+        for word in random_words(rnd, alphabet, n):
+            tree.insert(word)
+            counter[word] += 1
+        return tree, counter
+
+    def test_words_and_prefix(self):
+        for alphabet in ('ab', 'abcdefghijklmnopqrstuvwxyz' * 2, '高血压糖尿病'):
+            tree, counter = self.build(1, alphabet)
+            self.assertEqual(len(tree), len(counter))
+            for word, count in counter.items():
+                self.assertTrue(tree.search(word))
+                self.assertEqual(tree.count_word(word), count)
+            for prefix in ['', alphabet[0], alphabet[:2]]:
+                self.assertEqual(sorted(tree.list_by_prefix(prefix)),
+                                 sorted(word for word in counter if word.startswith(prefix)))
+            probes = sorted(set(random_words(random.Random(2), alphabet, 200)))
+            self.assertEqual(tree.contains_many(probes), [word in counter for word in probes])
+
+    def test_top_k_by_prefix(self):
+        for alphabet in ('ab', 'abcdefg', '高血压糖'):
+            tree, counter = self.build(3, alphabet, 2000)
+            for prefix in ['', alphabet[0], alphabet[1] + alphabet[0], 'zz']:
+                completions = sorted(((word, count) for word, count in counter.items() if word.startswith(prefix)),
+                                     key=lambda item: (-item[1], item[0]))
+                for k in (0, 1, 5, 10, 10000):
+                    self.assertEqual(tree.top_k_by_prefix(prefix, k), completions[:k], (prefix, k))
+
+    def test_segment(self):
+        rnd = random.Random(4)
+        tree, counter = self.build(4, 'abc', 300)
+        for _ in range(50):
+            content = ''.join(rnd.choice('abcx ') for _ in range(rnd.randrange(0, 40)))
+            self.assertEqual([word for word, start, end in tree.forward_segment(content)],
+                             tree.forward_split_content(content))
+            self.assertEqual([word for word, start, end in tree.backward_segment(content)],
+                             tree.backward_split_content(content))
+            for word, start, end in tree.forward_segment(content):
+                self.assertEqual(content[start:end], word)
+
+    def test_iteration(self):
+        tree, counter = self.build(6, 'ab高')
+        words = sorted(counter)
+        self.assertEqual(list(tree), words)
+        self.assertEqual(list(reversed(tree)), words[::-1])
+        self.assertEqual(list(tree.range('ab', 'b')), [word for word in words if 'ab' <= word <= 'b'])
+        self.assertEqual(list(tree.range(hi='a高')), [word for word in words if word <= 'a高'])
+        self.assertEqual(list(tree.range()), words)
+        empty = TrieTree()
+        self.assertEqual(list(empty), [])
+        self.assertEqual(list(reversed(empty)), [])
+
+    def test_unsupported(self):
+        tree, counter = self.build(7)
+        word = next(iter(counter))
+        for call in (lambda: tree.put(word, 1), lambda: tree.get(word), lambda: tree[word],
+                     lambda: tree.rank(word), lambda: tree.select(0), lambda: tree.count_between('a', 'b')):
+            with self.assertRaises(TypeError):
+                call()
+        self.assertEqual(tree.count_word(word), counter[word])
+
+    def test_dump_load(self):
+        tree, counter = self.build(5, 'abc高')
+        path = os.path.join(self.directory, 'trie.dump')
+        tree.dump(path)
+        loaded = TrieTree.load(path)
+        self.assertEqual(len(loaded), len(counter))
+        for word, count in counter.items():
+            self.assertEqual(loaded.count_word(word), count)
+        self.assertEqual(loaded.top_k_by_prefix('a', 5), tree.top_k_by_prefix('a', 5))
+        self.assertEqual(sorted(loaded.list_by_prefix('')), sorted(counter))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,18 @@
-from tree.base_tree import Tree, IntNode, TrieNode
+from tree.base_tree import Tree, TrieNode
+import heapq
 import time
 
 
 class TrieTree(Tree):
     """
-    字典树
+    字典树，单词可以包含任意Unicode字符，节点只为实际存在的孩子节点分配空间
+    迭代和range按字符升序返回单词；只记录词频，不支持put/get和rank/select/count_between，调用时抛出TypeError
     """
     def __init__(self):
         self._root = TrieNode(None)
-        self.chars = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z', ' ']
-        self.char_to_index = {key: point for point, key in enumerate(self.chars)}
-        self.index_to_char = {point: key for point, key in enumerate(self.chars)}
+        self._count = 0
+        # 单词逆序构成的字典树，逆向匹配时创建，插入新单词后失效
+        self._reverse = None
 
     def _insert(self, word: str):
         """
@@ -26,20 +28,27 @@ class TrieTree(Tree):
         :param word:单词
         :return: 新的根节点
         """
+        self._reverse = None
         current = self._root
+        path = [current]
         for char in word:
-            point = self.char_to_index[char]
-            if current.nodes[point]:
-                # 经过的单词数量自增
-                current.nodes[point].count += 1
-                current = current.nodes[point]
-            else:
-                current.nodes[point] = TrieNode(char)
-                current.nodes[point].count = 1
-                current = current.nodes[point]
+            node = current.get(char)
+            if node is None:
+                node = current.add(char)
+            # 经过的单词数量自增
+            node.count += 1
+            current = node
+            path.append(current)
+        if not current.is_end:
+            self._count += 1
         current.is_end = True
         # 词频自增
         current.word_count += 1
+        # 词频只增不减，路径上各节点的最大词频只需与新的词频比较
+        word_count = current.word_count
+        for node in path:
+            if node.best < word_count:
+                node.best = word_count
 
     def _search(self, word: str):
         """
@@ -47,19 +56,170 @@ class TrieTree(Tree):
         :param word:值
         :return: value
         """
+        current = self._find_node(word)
+        # 判定最后一个字符对应的节点是否为单词结束节点
+        return current is not None and current.is_end
+
+    def _find_node(self, word):
+        """
+        沿单词逐个字符下降
+        :param word: 单词或前缀
+        :return: 最后一个字符对应的节点，不存在时返回None
+        """
         current = self._root
         for char in word:
-            # 比较前判断当前节点是否为空
-            if current:
-                point = self.char_to_index[char]
-                current = current.nodes[point]
+            current = current.get(char)
+            if current is None:
+                return None
+        return current
+
+    def contains_many(self, words):
+        """
+        批量判定单词是否出现过
+        :param words: 单词序列
+        :return: bool列表，与words的顺序一致
+        """
+        return [bool(found) for found in self.search_many(words)]
+
+    def _search_sorted(self, words):
+        """
+        有序的单词与前一个单词共享公共前缀，只需从公共前缀末尾的节点继续下降
+        :param words: 有序的单词列表
+        :return: 与words并列的bool列表
+        """
+        result = [False] * len(words)
+        # path[d]为前一个单词长度为d的前缀对应的节点，下降中断时只保存到中断之前
+        path = [self._root]
+        prev = ''
+        for i, word in enumerate(words):
+            limit = min(len(prev), len(word), len(path) - 1)
+            common = 0
+            while common < limit and prev[common] == word[common]:
+                common += 1
+            del path[common + 1:]
+            current = path[-1]
+            for char in word[common:]:
+                current = current.get(char)
+                if current is None:
+                    break
+                path.append(current)
             else:
-                return False
-        else:
-            # 正常结束后，判定当前节点是否为单次结束节点
-            if current and current.is_end:
-                return True
-        return False
+                result[i] = current.is_end
+            prev = word
+        return result
+
+    def insert_many(self, iterable):
+        """
+        批量插入单词，重复的单词需要计入词频，因此只排序不去重
+        :param iterable: 单词序列
+        """
+        for word in sorted(iterable):
+            self.__put(word)
+
+    def __contains__(self, word):
+        return self._search(word)
+
+    def __iter__(self):
+        """按升序返回树中的单词"""
+        for word, word_count in self._dump_items():
+            yield word
+
+    def __reversed__(self):
+        """按降序返回树中的单词，孩子节点按字符降序展开，单词在以其为前缀的单词之后返回"""
+        stack = [(self._root, '', False)]
+        while stack:
+            current, prefix, expanded = stack.pop()
+            if expanded:
+                if current.is_end:
+                    yield prefix
+                continue
+            stack.append((current, prefix, True))
+            for node in current.children():
+                stack.append((node, prefix + node.char, False))
+
+    def range(self, lo=None, hi=None):
+        """
+        范围扫描，按升序返回闭区间[lo, hi]内的单词
+        :param lo: 下界，为None时不限制
+        :param hi: 上界，为None时不限制
+        :return: 生成器
+        """
+        for word in self:
+            if lo is not None and word < lo:
+                continue
+            if hi is not None and word > hi:
+                return
+            yield word
+
+    def put(self, key, data):
+        raise TypeError('TrieTree stores word counts only, put is not supported')
+
+    def _get(self, key, default):
+        raise TypeError('TrieTree stores word counts only, use count_word instead of get')
+
+    def rank(self, key):
+        raise TypeError('TrieTree does not maintain subtree sizes, rank is not supported')
+
+    def select(self, k):
+        raise TypeError('TrieTree does not maintain subtree sizes, select is not supported')
+
+    def count_between(self, lo, hi):
+        raise TypeError('TrieTree does not maintain subtree sizes, count_between is not supported')
+
+    def _children(self, node):
+        """字典树节点的孩子节点"""
+        return node.children()
+
+    def _count_visits(self, word):
+        """查询单词时访问的节点数量，包括根节点"""
+        visits = 1
+        current = self._root
+        for char in word:
+            current = current.get(char)
+            if current is None:
+                break
+            visits += 1
+        return visits
+
+    def _dump_items(self):
+        """
+        深度优先返回(单词, 词频)
+        :return: 生成器
+        """
+        stack = [(self._root, '')]
+        while stack:
+            current, prefix = stack.pop()
+            if current.is_end:
+                yield prefix, current.word_count
+            for node in reversed(current.children()):
+                stack.append((node, prefix + node.char))
+
+    def _dump_meta(self):
+        """节点结构由单词本身确定，不需要结构元数据"""
+        return b''
+
+    def _load_state(self, pairs, meta):
+        """
+        按(单词, 词频)恢复字典树，经过节点的单词数量按词频累加
+        :param pairs: (单词, 词频)列表
+        :param meta: 结构元数据
+        """
+        self._reverse = None
+        for word, word_count in pairs:
+            current = self._root
+            if current.best < word_count:
+                current.best = word_count
+            for char in word:
+                node = current.get(char)
+                if node is None:
+                    node = current.add(char)
+                current = node
+                current.count += word_count
+                if current.best < word_count:
+                    current.best = word_count
+            current.is_end = True
+            current.word_count = word_count
+        self._count = len(pairs)
 
     def count_word(self, word: str):
         """
@@ -67,18 +227,9 @@ class TrieTree(Tree):
         :param word:
         :return:
         """
-        current = self._root
-        for char in word:
-            # 比较前判断当前节点是否为空
-            if current:
-                point = self.char_to_index[char]
-                current = current.nodes[point]
-            else:
-                return 0
-        else:
-            # 正常结束后，判定当前节点是否为单次结束节点
-            if current.is_end:
-                return current.word_count
+        current = self._find_node(word)
+        if current is not None and current.is_end:
+            return current.word_count
         return 0
 
     def list_by_prefix(self, prefix):
@@ -86,19 +237,40 @@ class TrieTree(Tree):
         根据前缀找到所有单词
         :param prefix: 前缀
         """
-        current = self._root
+        current = self._find_node(prefix)
+        if current is None:
+            return []
         result = []
-        for char in prefix:
-            if current:
-                point = self.char_to_index[char]
-                current = current.nodes[point]
-            else:
-                return []
-        else:
-            # 正常结束代表找到了指定的前缀
-            if current.is_end:
-                result.append(prefix)
-            self.list(current, prefix, result)
+        if current.is_end:
+            result.append(prefix)
+        self.list(current, prefix, result)
+        return result
+
+    def top_k_by_prefix(self, prefix, k=10):
+        """
+        按词频从高到低返回以prefix开头的前k个单词，词频相同时按单词升序
+        每个节点保存子树中的最大词频，从前缀对应的节点开始按最大词频优先搜索：
+        堆顶为单词时，堆中剩余的节点和单词的词频都不会更高，可以直接输出；
+        只会展开通向结果单词的路径及路径上节点的孩子节点，耗时与前缀下的单词数量无关
+        :param prefix: 前缀
+        :param k: 数量
+        :return: [(单词, 词频)]列表
+        """
+        current = self._find_node(prefix)
+        result = []
+        if current is None or k <= 0:
+            return result
+        # (负的词频, 单词或前缀, 0为单词/1为节点, 节点)，词频相同时单词排在以其为前缀的节点之前
+        heap = [(-current.best, prefix, 1, current)]
+        while heap and len(result) < k:
+            score, word, kind, node = heapq.heappop(heap)
+            if not kind:
+                result.append((word, -score))
+                continue
+            if node.is_end:
+                heapq.heappush(heap, (-node.word_count, word, 0, None))
+            for child in node.children():
+                heapq.heappush(heap, (-child.best, word + child.char, 1, child))
         return result
 
     def list(self, current, prefix, result):
@@ -109,11 +281,10 @@ class TrieTree(Tree):
         :param result: 结果
         :return:
         """
-        for node in current.nodes:
-            if node:
-                if node.is_end:
-                    result.append(prefix + node.char)
-                self.list(node, prefix + node.char, result)
+        for node in current.children():
+            if node.is_end:
+                result.append(prefix + node.char)
+            self.list(node, prefix + node.char, result)
 
     def forward_split_content(self, content):
         """
@@ -161,6 +332,74 @@ class TrieTree(Tree):
 
         return result
 
+    def forward_segment(self, content):
+        """
+        最大正向匹配分词，与forward_split_content的结果相同
+        从每个起点逐个字符沿字典树下降，记住最后经过的单词结束节点，无法继续下降时即得到最长的单词，
+        每个起点只下降一次，不需要截取子串反复查询，耗时与文本长度乘以最长单词的长度成正比
+        :param content: 文本
+        :return: 生成器，每次返回(单词, 起始位置, 结束位置)，不属于任何单词的字符被跳过
+        """
+        root = self._root
+        n = len(content)
+        start = 0
+        while start < n:
+            current = root
+            end = 0
+            for i in range(start, n):
+                current = current.get(content[i])
+                if current is None:
+                    break
+                if current.is_end:
+                    end = i + 1
+            if end:
+                yield content[start:end], start, end
+                start = end
+            else:
+                start += 1
+
+    def backward_segment(self, content):
+        """
+        最大逆向匹配分词，与backward_split_content的结果相同
+        在单词逆序构成的字典树上从每个结束位置向左逐个字符下降，记住最后经过的单词结束节点
+        :param content: 文本
+        :return: 生成器，从右向左每次返回(单词, 起始位置, 结束位置)，不属于任何单词的字符被跳过
+        """
+        root = self._reverse_root()
+        end = len(content)
+        while end > 0:
+            current = root
+            start = -1
+            for i in range(end - 1, -1, -1):
+                current = current.get(content[i])
+                if current is None:
+                    break
+                if current.is_end:
+                    start = i
+            if start >= 0:
+                yield content[start:end], start, end
+                end = start
+            else:
+                end -= 1
+
+    def _reverse_root(self):
+        """
+        单词逆序构成的字典树的根节点，只记录单词结束位置，不统计词频
+        :return: TrieNode对象
+        """
+        if self._reverse is None:
+            root = TrieNode(None)
+            for word, word_count in self._dump_items():
+                current = root
+                for char in reversed(word):
+                    node = current.get(char)
+                    if node is None:
+                        node = current.add(char)
+                    current = node
+                current.is_end = True
+            self._reverse = root
+        return self._reverse
+
 
 if __name__ == '__main__':
     binary_tree = TrieTree()
@@ -183,8 +422,24 @@ if __name__ == '__main__':
     # 获取以指定前缀开始的单词
     print(binary_tree.list_by_prefix('a'))
     print(binary_tree.list_by_prefix('b'))
+    # 按词频获取前k个以指定前缀开始的单词
+    assert binary_tree.top_k_by_prefix('b', 2) == [('bcd', 3), ('b', 1)]
+    print(binary_tree.top_k_by_prefix('a', 3))
 
     # 分词
     print(binary_tree.search('abc'))
     print('最大正向匹配：', binary_tree.forward_split_content('abc a abcd hiikh'))
     print('最大逆向匹配：', binary_tree.backward_split_content('abc a abcd hiikh'))
+
+    # 任意Unicode字符
+    chinese_tree = TrieTree()
+    for word in ['高血压', '高血压病', '高血糖', '糖尿病', '糖尿病肾病']:
+        chinese_tree.insert(word)
+    assert chinese_tree.search('高血压') is True
+    assert chinese_tree.search('高血') is False
+    print(chinese_tree.list_by_prefix('高血'))
+
+    # 逐字符匹配分词，同时返回单词在文本中的位置
+    text = '糖尿病肾病患者的高血压病'
+    print('最大正向匹配：', list(chinese_tree.forward_segment(text)))
+    print('最大逆向匹配：', list(chinese_tree.backward_segment(text)))